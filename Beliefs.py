@@ -0,0 +1,106 @@
+from CompactGameState import CARDS, CARD_CODES, COPIES_PER_CARD
+from Player import ACTION_TO_CARD
+
+
+# Characters that may block each action ('block_<action>' entries of ACTION_TO_CARD)
+BLOCKING_CARDS = {
+    'foreign_aid': (CARD_CODES[ACTION_TO_CARD['block_foreign_aid']],),
+    'steal': (CARD_CODES[ACTION_TO_CARD['block_steal']], CARD_CODES[ACTION_TO_CARD['block_steal_ambassador']]),
+    'assassinate': (CARD_CODES[ACTION_TO_CARD['block_assassinate']],)
+}
+CLAIMED_CARD = {action: CARD_CODES[card] for action, card in ACTION_TO_CARD.items()
+                if card is not None and not action.startswith('block')}
+
+
+class BeliefTracker:
+    """
+    Per-player probability distribution over which character a card in that
+    player's hand is, updated in place from each logged event. Attach it to
+    a GameState or CompactGameState and it is called on every log_action,
+    log_challenge and log_block, so it never rescans the log; an update
+    touches the five probabilities of one player.
+
+    The prior is the deck composition minus the observer's own cards. A
+    claimed character (action or block) is weighted against bluff_rate for
+    every other character, a lost challenge rules the claimed character out
+    and a won one counts as one more claim.
+    """
+
+    def __init__(self, observer=None, bluff_rate=0.3):
+        self.observer = observer  # Player whose own cards are excluded from the prior
+        self.bluff_rate = bluff_rate
+        self.beliefs = {}  # player name -> list of probabilities in CARDS order
+
+    def attach(self, game_state):
+        game_state.add_listener(self)
+        return self
+
+    def prior(self):
+        counts = [COPIES_PER_CARD] * len(CARDS)
+        if self.observer is not None:
+            for card in self.observer.cards:
+                counts[CARD_CODES[card]] -= 1
+        total = sum(counts)
+        return [count / total for count in counts]
+
+    def belief(self, player_name):
+        belief = self.beliefs.get(player_name)
+        if belief is None:
+            belief = self.beliefs[player_name] = self.prior()
+        return belief
+
+    # -- reads --
+
+    def probability(self, player_name, card):
+        """Probability that a card in the player's hand is this character."""
+        belief = self.beliefs.get(player_name)
+        return belief[CARD_CODES[card]] if belief is not None else self.prior()[CARD_CODES[card]]
+
+    def distribution(self, player_name):
+        """The player's distribution as {character: probability}."""
+        return dict(zip(CARDS, self.belief(player_name)))
+
+    def most_likely(self, player_name, count=1):
+        belief = self.belief(player_name)
+        return sorted(CARDS, key=lambda card: -belief[CARD_CODES[card]])[:count]
+
+    # -- updates --
+
+    def weigh(self, player_name, cards):
+        """Bayes update on "the player holds one of cards": other characters are scaled by bluff_rate."""
+        if self.observer is not None and player_name == self.observer.name:
+            return
+        belief = self.belief(player_name)
+        total = 0.0
+        for code in range(len(belief)):
+            if code not in cards:
+                belief[code] *= self.bluff_rate
+            total += belief[code]
+        if total > 0:
+            for code in range(len(belief)):
+                belief[code] /= total
+
+    def on_action(self, player_name, action, outcome):
+        claimed = CLAIMED_CARD.get(action)
+        if claimed is not None and outcome != 'challenge_failed':
+            self.weigh(player_name, (claimed,))
+
+    def on_challenge(self, challenger, challenged, action, result, success):
+        claimed = CLAIMED_CARD.get(action)
+        if claimed is None or (self.observer is not None and challenged == self.observer.name):
+            return
+        belief = self.belief(challenged)
+        if result == 'bluff':
+            # Caught without the card: the remaining card is anything but the claimed character
+            belief[claimed] = 0.0
+            total = sum(belief)
+            for code in range(len(belief)):
+                belief[code] = belief[code] / total if total > 0 else 0.0
+        elif result == 'truth':
+            # Shown card: kept by a two-card hand, reshuffled by a one-card hand, which the event does not say
+            self.weigh(challenged, (claimed,))
+
+    def on_block(self, blocker, blocked, action, result, success):
+        cards = BLOCKING_CARDS.get(action)
+        if cards:
+            self.weigh(blocker, cards)
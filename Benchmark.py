@@ -0,0 +1,318 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from GameManagement import Game
+from GameState import GameState
+from CompactGameState import CompactGameState
+from Bots import RandomBot, HeuristicBot
+from AIAgent import AIAgent
+from LLMCache import ResponseCache
+from LLMClient import LLMClientManager, get_llm_client_manager, set_llm_client_manager
+from Simulation import simulate
+
+DEFAULT_RESULTS = 'benchmark_results.json'
+DEFAULT_BASELINE = 'benchmark_baseline.json'
+DEFAULT_TOLERANCE = 0.15  # Relative change past which a metric counts as a regression
+LOWER, HIGHER = 'lower', 'higher'  # Which direction is better for a metric
+ACTIONS = ('income', 'foreign_aid', 'tax', 'steal', 'exchange', 'assassinate', 'coup')
+LOG_SIZES = (0, 16, 64, 256, 1024)
+
+
+def best_time(function, number, repeat=5):
+    """Seconds per call of function, best of repeat runs of number calls each."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def metric(value, unit, better=LOWER):
+    return {'value': round(value, 4), 'unit': unit, 'better': better}
+
+
+def reversible_game(players=3, coins=10, seed=0):
+    """Dealt game of bots with coins each, set up so moves can be applied and undone."""
+    # The deal and every bot's choices draw from the game's own generator, as in play_headless_game
+    rng = random.Random(seed)
+    game = Game([], headless=True, rng=rng)
+    game.players = [(RandomBot if seat % 2 == 0 else HeuristicBot)(f"Player{seat + 1}", None, game) for seat in range(players)]
+    for player in game.players:
+        player.rng = rng
+    game.deal_initial_cards()
+    for player in game.players:
+        player.coins = coins
+    game.attach_journal()  # Left attached, so the benchmarks can undo what they play
+    return game
+
+
+# -- benchmarks, each returning {metric name: metric} --
+
+def bench_actions(scale):
+    """ActionHandler.handle_action per action, reactions included; each move is undone through the journal."""
+    results = {}
+    for action in ACTIONS:
+        game = reversible_game()
+        actor = game.players[game.turn_manager.current_turn]
+        target = next(player for player in game.players if player is not actor)
+        journal = game.journal
+
+        def play():
+            journal.begin_move()
+            game.action_handler.handle_action(action, actor, target)
+            journal.undo()
+
+        seconds = best_time(play, max(1, int(2000 * scale)))
+        results[f'{action}_us'] = metric(seconds * 1e6, 'us')
+    return results
+
+
+def bench_reactions(scale):
+    """ChallengeHandler.resolve_challenge and resolve_block, undone after each call."""
+    game = reversible_game()
+    acting, blocking = game.players[0], game.players[1]
+    journal = game.journal
+    calls = {
+        'challenge_us': lambda: game.challenge_handler.resolve_challenge(acting, 'tax'),
+        'block_us': lambda: game.challenge_handler.resolve_block(acting, blocking, 'foreign_aid')
+    }
+    results = {}
+    for name, call in calls.items():
+        def resolve():
+            journal.begin_move()
+            call()
+            journal.undo()
+
+        results[name] = metric(best_time(resolve, max(1, int(2000 * scale))) * 1e6, 'us')
+    return results
+
+
+def bench_games(scale):
+    """Complete headless games between scripted bots, with both game state backends."""
+    results = {}
+    games = max(1, int(200 * scale))
+    for label, compact_state in (('compact', True), ('dict', False)):
+        best = None
+        for _ in range(3):
+            start = time.perf_counter()
+            played = simulate(games, [RandomBot, HeuristicBot, RandomBot], seed=0, compact_state=compact_state)
+            elapsed = time.perf_counter() - start
+            if best is None or elapsed < best[0]:
+                best = (elapsed, sum(result['turns'] for result in played))
+        results[f'{label}_games_per_s'] = metric(games / best[0], 'games/s', HIGHER)
+        results[f'{label}_turns_per_s'] = metric(best[1] / best[0], 'turns/s', HIGHER)
+    return results
+
+
+def bench_public_state(scale):
+    """get_public_game_state as the retained event log grows."""
+    results = {}
+    for state_class in (GameState, CompactGameState):
+        for size in LOG_SIZES:
+            state = state_class(log_capacity=max(size, 1))
+            for seat in range(4):
+                state.add_player(f"Player{seat + 1}")
+            for index in range(size):
+                state.log_action(f"Player{index % 4 + 1}", ACTIONS[index % len(ACTIONS)], 'success')
+            seconds = best_time(state.get_public_game_state, max(1, int(2000 * scale)))
+            results[f'{state_class.__name__}_{size}_events_us'] = metric(seconds * 1e6, 'us')
+    return results
+
+
+def bench_prompts(scale):
+    """AIAgent.create_prompt per decision type and parse_response on typical replies."""
+    game = reversible_game()
+    agent = AIAgent("Agent", None, game, response_cache=ResponseCache())
+    for index in range(40):
+        game.game_state.log_action(f"Player{index % 3 + 1}", ACTIONS[index % len(ACTIONS)], 'success')
+    game_state = game.game_state.get_public_game_state()
+    number = max(1, int(500 * scale))
+    results = {}
+    for decision_type, info in (('action_decision', None),
+                                ('challenge_decision', {'acting_player': 'Player1', 'action': 'tax'}),
+                                ('block_decision', {'action': 'steal'})):
+        seconds = best_time(lambda: agent.create_prompt(game_state, decision_type, info), number)
+        results[f'create_prompt_{decision_type}_us'] = metric(seconds * 1e6, 'us')
+    replies = (('action_decision', "Given my coins I will take tax this turn, claiming the Duke."),
+               ('challenge_decision', "I don't think a challenge is worth it here: no challenge."),
+               ('block_decision', "Block. I claim the Captain."))
+    for decision_type, reply in replies:
+        seconds = best_time(lambda: agent.parse_response(decision_type, reply), number * 10)
+        results[f'parse_response_{decision_type}_us'] = metric(seconds * 1e6, 'us')
+    return results
+
+
+class MockCompletionServer:
+    """
+    Local stand-in for an OpenAI-compatible /v1/completions endpoint that
+    answers every request with reply after delay seconds, so the LLM path
+    (prompt, client, HTTP round trip, parsing) can be timed without a model.
+    """
+
+    def __init__(self, reply=" tax", delay=0.0, port=0):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # Keep-alive, like the real API
+            disable_nagle_algorithm = True  # Headers and body go out as separate writes
+
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                if server.delay:
+                    time.sleep(server.delay)
+                prompt_tokens = len(str(request.get('prompt', '')).split())
+                body = json.dumps({
+                    'id': 'cmpl-mock', 'object': 'text_completion', 'created': int(time.time()),
+                    'model': request.get('model', 'mock'),
+                    'choices': [{'text': server.reply, 'index': 0, 'logprobs': None, 'finish_reason': 'stop'}],
+                    'usage': {'prompt_tokens': prompt_tokens, 'completion_tokens': 1, 'total_tokens': prompt_tokens + 1}
+                }).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.reply = reply
+        self.delay = delay
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/v1"
+        threading.Thread(target=self.httpd.serve_forever, name='MockCompletionServer', daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def bench_llm(scale, delay=0.0):
+    """
+    AIAgent decisions end to end against MockCompletionServer: choose_action
+    (prompt, request, parse) and the bare query_gpt round trip, with a
+    cache that never hits so every call goes over the wire.
+    """
+    server = MockCompletionServer(delay=delay)
+    previous = get_llm_client_manager()
+    manager = LLMClientManager(api_key='mock', base_url=server.url, max_retries=0)
+    set_llm_client_manager(manager)
+    try:
+        game = reversible_game()
+        agent = AIAgent("Agent", None, game, response_cache=ResponseCache(max_memory_entries=0))
+        prompt = agent.create_prompt(game.game_state.get_public_game_state(), 'action_decision')
+        agent.query_gpt(prompt)  # Warms the client and its connection
+        calls = max(5, int(200 * scale))
+        results = {}
+        for name, call in (('choose_action', lambda: agent.choose_action(game.game_state)),
+                           ('query_gpt', lambda: agent.query_gpt(prompt))):
+            latencies = []
+            for _ in range(calls):
+                start = time.perf_counter()
+                call()
+                latencies.append(time.perf_counter() - start)
+            results[f'{name}_p50_ms'] = metric(percentile(latencies, 0.5) * 1e3, 'ms')
+            results[f'{name}_p95_ms'] = metric(percentile(latencies, 0.95) * 1e3, 'ms')
+        return results
+    finally:
+        set_llm_client_manager(previous)
+        manager.close()
+        server.close()
+
+
+BENCHMARKS = {
+    'actions': bench_actions,
+    'reactions': bench_reactions,
+    'games': bench_games,
+    'public_state': bench_public_state,
+    'prompts': bench_prompts,
+    'llm': bench_llm
+}
+
+
+def run(names=None, scale=1.0):
+    """Runs the named benchmarks (all by default) and returns the results document."""
+    results = {}
+    for name in names or BENCHMARKS:
+        for metric_name, value in BENCHMARKS[name](scale).items():
+            results[f'{name}.{metric_name}'] = value
+    return {
+        'meta': {'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'python': platform.python_version(),
+                 'platform': platform.platform(), 'processor': platform.processor(), 'cpus': os.cpu_count(),
+                 'scale': scale},
+        'results': results
+    }
+
+
+def compare(current, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Rows of (metric, baseline value, current value, relative change,
+    regressed) for every metric in both documents. A change counts as a
+    regression when it is worse than tolerance in the metric's direction.
+    """
+    rows = []
+    for name, result in current['results'].items():
+        base = baseline['results'].get(name)
+        if base is None or not base['value']:
+            continue
+        change = result['value'] / base['value'] - 1
+        regressed = change > tolerance if result['better'] == LOWER else change < -tolerance
+        rows.append((name, base['value'], result['value'], change, regressed))
+    return rows
+
+
+def save(document, path):
+    with open(path, 'w') as results_file:
+        json.dump(document, results_file, indent=2)
+
+
+def load(path):
+    with open(path) as results_file:
+        return json.load(results_file)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the game engine and the AI pipeline.")
+    parser.add_argument('benchmarks', nargs='*', help=f"Benchmarks to run, of {', '.join(BENCHMARKS)} (all by default)")
+    parser.add_argument('--scale', type=float, default=1.0, help="Multiplies iteration counts; 0.1 for a quick run")
+    parser.add_argument('--out', default=DEFAULT_RESULTS)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="Results to compare against, if the file exists")
+    parser.add_argument('--save-baseline', action='store_true', help="Store this run as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args()
+    unknown = set(args.benchmarks) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    document = run(args.benchmarks, args.scale)
+    save(document, args.out)
+    regressions = 0
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        for name, base, value, change, regressed in compare(document, load(args.baseline), args.tolerance):
+            regressions += regressed
+            print(f"{name:55} {base:12.4f} -> {value:12.4f} {change:+7.1%}{'  REGRESSION' if regressed else ''}")
+    else:
+        for name, result in document['results'].items():
+            print(f"{name:55} {result['value']:12.4f} {result['unit']}")
+    if args.save_baseline:
+        save(document, args.baseline)
+        print(f"Saved baseline to {args.baseline}")
+    print(f"Results written to {args.out}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
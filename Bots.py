@@ -0,0 +1,52 @@
+from Player import Player
+from DecisionBackends import RandomBackend, HeuristicBackend, affordable_actions
+
+
+class RandomBot(Player):
+    """
+    Non-interactive player that picks uniformly among the moves it can afford.
+    Takes the same (name, character, game) arguments as AIAgent so the headless
+    runners can build either one. Its decisions come from the class's backend,
+    the same one AIAgent(backend='random') uses.
+    """
+
+    backend = RandomBackend()
+
+    def __init__(self, name, character=None, game=None):
+        super().__init__(name, character, verbose=False)
+        self.game = game
+
+    def affordable_actions(self):
+        """Actions this player has the coins for."""
+        return affordable_actions(self)
+
+    def choose_action(self, game_state):
+        return self.backend.choose_action(self, game_state)
+
+    def choose_target(self, game):
+        return self.backend.choose_target(self, self.get_available_targets(game))
+
+    def wants_to_challenge(self, acting_player, action):
+        return self.backend.wants_to_challenge(self, acting_player, action)
+
+    def wants_to_block(self, acting_player, action):
+        return self.backend.wants_to_block(self, acting_player, action)
+
+    def choose_exchange_cards(self, num_cards_to_exchange):
+        return self.backend.choose_exchange_cards(self, num_cards_to_exchange)
+
+    def send_message(self, game_state=None):
+        return ''
+
+    def react_to_move(self, action, message, game_state):
+        return ''
+
+
+class HeuristicBot(RandomBot):
+    """
+    Scripted player that plays its real cards: coups as soon as it can, then
+    assassinates, taxes or steals with the characters it holds, and only
+    challenges a claim when it holds two copies of the claimed character.
+    """
+
+    backend = HeuristicBackend()
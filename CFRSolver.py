@@ -0,0 +1,283 @@
+import argparse
+import math
+import os
+import random
+import struct
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from FastGame import (FastGame, PHASE_ACTION, PHASE_BLOCK, PHASE_OVER, CLAIMED_CARD, ASSASSINATE, REACT, NO_SEAT,
+                      action_move)
+from CFRStrategy import (NUM_INFOSETS, WIDTH, NO_CLAIM, BLOCK_CLAIMS, DIMENSIONS, DEFAULT_TABLE_PATH, StrategyTable,
+                         infoset_index, legal_slots)
+
+CHECKPOINT_MAGIC = b'CFRC'
+CHECKPOINT_VERSION = 1
+# Header, abstraction dimensions and WIDTH, then iterations, the generator state and the two tables
+CHECKPOINT_HEADER = struct.Struct('<4sHH')
+RNG_STATE = struct.Struct('<Q625Id')  # iterations, Mersenne Twister words and position, gauss_next (NaN for None)
+
+
+class CFRSolver:
+    """
+    Monte Carlo CFR with probing for two-player games on FastGame, over the
+    CFRStrategy abstraction. Each iteration deals a game and walks it for one
+    traversing seat: the other seat and chance are sampled on-policy, as in
+    external sampling, and at each of the traverser's decisions every legal
+    move is valued, the explored one by continuing the walk and the others by
+    one on-policy probe to the end of the game. Games are far too long for
+    external sampling's full branching, and probes keep the variance well
+    below outcome sampling's importance weights.
+
+    Games still running after max_plies moves score the card difference.
+    Regrets and strategy sums are flat arrays indexed by infoset * WIDTH +
+    slot, the layout of the table file, so root-parallel rounds can be merged
+    by adding the workers' deltas.
+    """
+
+    def __init__(self, seed=None, epsilon=0.3, max_plies=200):
+        self.rng = random.Random(seed)
+        self.epsilon = epsilon
+        self.max_plies = max_plies
+        self.regrets = array('d', bytes(8 * NUM_INFOSETS * WIDTH))
+        self.strategy_sums = array('d', bytes(8 * NUM_INFOSETS * WIDTH))
+        self.iterations = 0
+
+    def current_strategy(self, base, slots):
+        """Regret matching over the legal slots."""
+        regrets = self.regrets
+        positive = [max(regrets[base + slot], 0.0) for slot in slots]
+        total = sum(positive)
+        if total > 0:
+            return [value / total for value in positive]
+        return [1.0 / len(slots)] * len(slots)
+
+    def sample(self, probabilities):
+        pick = self.rng.random()
+        for position, probability in enumerate(probabilities):
+            pick -= probability
+            if pick < 0:
+                return position
+        return len(probabilities) - 1
+
+    def iterate(self, iterations):
+        for _ in range(iterations):
+            traverser = self.iterations % 2
+            self.walk(FastGame.deal(2, self.rng), traverser, [NO_CLAIM, NO_CLAIM], [])
+            self.iterations += 1
+
+    # -- game steps --
+
+    def utility(self, game, seat):
+        if game.phase == PHASE_OVER:
+            return 1.0 if game.winner() == seat else -1.0
+        return (len(game.hands[seat]) - len(game.hands[1 - seat])) / 2.0
+
+    def locate(self, game, claims):
+        """Table base offset and legal slots of the decider's information set."""
+        seat = game.decider
+        opponent = 1 - seat
+        decision = (game.phase, None if game.phase == PHASE_ACTION else game.action)
+        index = infoset_index(decision, game.coins[seat], game.coins[opponent], game.hands[seat],
+                              len(game.hands[opponent]), claims[opponent])
+        return index * WIDTH, legal_slots(decision, game.coins[seat])
+
+    def step(self, game, slot, claims, turn_claims):
+        """Plays slot and returns the claims each seat has seen; a turn's claims are seen once it is logged."""
+        seat = game.decider
+        opponent = 1 - seat
+        if game.phase == PHASE_ACTION:
+            turn_claims = [(seat, CLAIMED_CARD.get(slot, NO_CLAIM))]
+            if slot == ASSASSINATE:
+                turn_claims.append((opponent, BLOCK_CLAIMS[ASSASSINATE]))  # The engine always blocks it
+            game.apply(action_move(slot, opponent), self.rng)
+        else:
+            if game.phase == PHASE_BLOCK and slot == REACT:
+                turn_claims = turn_claims + [(seat, BLOCK_CLAIMS[game.action])]
+            game.apply(slot, self.rng)
+        if game.phase == PHASE_OVER or game.action == NO_SEAT:
+            claims = list(claims)
+            for claimant, card in turn_claims:
+                claims[claimant] = card
+            turn_claims = []
+        return claims, turn_claims
+
+    # -- traversal --
+
+    def walk(self, game, traverser, claims, turn_claims):
+        """Updates the traverser's regrets along one sampled game and returns its estimated value."""
+        while game.phase != PHASE_OVER and game.plies < self.max_plies and game.decider != traverser:
+            base, slots = self.locate(game, claims)
+            strategy = self.current_strategy(base, slots)
+            sums = self.strategy_sums
+            for position, slot in enumerate(slots):
+                sums[base + slot] += strategy[position]
+            claims, turn_claims = self.step(game, slots[self.sample(strategy)], claims, turn_claims)
+        if game.phase == PHASE_OVER or game.plies >= self.max_plies:
+            return self.utility(game, traverser)
+
+        base, slots = self.locate(game, claims)
+        strategy = self.current_strategy(base, slots)
+        uniform = self.epsilon / len(slots)
+        explored = self.sample([uniform + (1 - self.epsilon) * probability for probability in strategy])
+        values = []
+        for position, slot in enumerate(slots):
+            child = game.copy()
+            child_claims, child_turn_claims = self.step(child, slot, claims, turn_claims)
+            if position == explored:
+                values.append(self.walk(child, traverser, child_claims, child_turn_claims))
+            else:
+                values.append(self.probe(child, traverser, child_claims, child_turn_claims))
+        value = sum(probability * move_value for probability, move_value in zip(strategy, values))
+        regrets = self.regrets
+        for position, slot in enumerate(slots):
+            regrets[base + slot] += values[position] - value
+        return value
+
+    def probe(self, game, traverser, claims, turn_claims):
+        """Plays both seats' current strategies to the end and returns the traverser's utility."""
+        while game.phase != PHASE_OVER and game.plies < self.max_plies:
+            base, slots = self.locate(game, claims)
+            claims, turn_claims = self.step(game, slots[self.sample(self.current_strategy(base, slots))],
+                                            claims, turn_claims)
+        return self.utility(game, traverser)
+
+    # -- results --
+
+    def average_strategy(self):
+        """Normalized strategy sums for every information set, all zero where none were accumulated."""
+        probabilities = [0.0] * (NUM_INFOSETS * WIDTH)
+        sums = self.strategy_sums
+        for base in range(0, NUM_INFOSETS * WIDTH, WIDTH):
+            total = sum(sums[base:base + WIDTH])
+            if total > 0:
+                for slot in range(WIDTH):
+                    probabilities[base + slot] = sums[base + slot] / total
+        return probabilities
+
+    def reached_infosets(self):
+        sums = self.strategy_sums
+        return sum(1 for base in range(0, NUM_INFOSETS * WIDTH, WIDTH) if any(sums[base:base + WIDTH]))
+
+    def save(self, path=DEFAULT_TABLE_PATH):
+        """Writes the average strategy as a table file for CFRBot; the solver cannot resume from it."""
+        StrategyTable.write(path, self.average_strategy())
+
+    def save_checkpoint(self, path):
+        """
+        Writes everything a solve needs to continue (regrets, strategy sums,
+        iteration count and generator state) to path, atomically, so a
+        solve killed mid-write still has its previous checkpoint.
+        """
+        version, words, gauss = self.rng.getstate()
+        temporary = f"{path}.tmp"
+        with open(temporary, 'wb') as checkpoint:
+            checkpoint.write(CHECKPOINT_HEADER.pack(CHECKPOINT_MAGIC, CHECKPOINT_VERSION, len(DIMENSIONS)))
+            checkpoint.write(struct.pack(f'<{len(DIMENSIONS)}HH', *DIMENSIONS, WIDTH))
+            checkpoint.write(RNG_STATE.pack(self.iterations, *words, math.nan if gauss is None else gauss))
+            self.regrets.tofile(checkpoint)
+            self.strategy_sums.tofile(checkpoint)
+            checkpoint.flush()
+            os.fsync(checkpoint.fileno())
+        os.replace(temporary, path)
+
+    @classmethod
+    def load_checkpoint(cls, path, epsilon=0.3, max_plies=200):
+        """A solver continuing from save_checkpoint's file, exactly where it stopped."""
+        solver = cls(epsilon=epsilon, max_plies=max_plies)
+        with open(path, 'rb') as checkpoint:
+            magic, version, num_dimensions = CHECKPOINT_HEADER.unpack(checkpoint.read(CHECKPOINT_HEADER.size))
+            if magic != CHECKPOINT_MAGIC or version != CHECKPOINT_VERSION:
+                raise ValueError(f"{path} is not a version {CHECKPOINT_VERSION} solver checkpoint")
+            layout = struct.unpack(f'<{num_dimensions}HH', checkpoint.read(2 * num_dimensions + 2))
+            if layout != DIMENSIONS + (WIDTH,):
+                raise ValueError(f"{path} was solved for a different abstraction")
+            iterations, *words, gauss = RNG_STATE.unpack(checkpoint.read(RNG_STATE.size))
+            solver.iterations = iterations
+            solver.rng.setstate((3, tuple(words), None if math.isnan(gauss) else gauss))
+            for table in (solver.regrets, solver.strategy_sums):
+                del table[:]
+                table.fromfile(checkpoint, NUM_INFOSETS * WIDTH)
+        return solver
+
+
+def solve_round(regrets, strategy_sums, iterations, seed, epsilon, max_plies, first_iteration):
+    """Worker entry point: runs iterations from the shared tables and returns the deltas."""
+    solver = CFRSolver(seed, epsilon, max_plies)
+    solver.regrets = array('d', regrets)
+    solver.strategy_sums = array('d', strategy_sums)
+    solver.iterations = first_iteration
+    solver.iterate(iterations)
+    regret_delta = array('d', (new - old for new, old in zip(solver.regrets, regrets)))
+    sums_delta = array('d', (new - old for new, old in zip(solver.strategy_sums, strategy_sums)))
+    return regret_delta, sums_delta
+
+
+def solve(iterations, seed=0, workers=1, round_iterations=2000, epsilon=0.3, max_plies=200, progress=None, solver=None):
+    """
+    Runs the solver until it has done iterations in all, in rounds of
+    round_iterations per worker; with workers > 1 each round runs in that
+    many processes from the same tables and their regret and strategy
+    deltas are added up. Pass a solver (e.g. from load_checkpoint) to
+    continue its run instead of starting from seed.
+    """
+    if solver is None:
+        solver = CFRSolver(seed, epsilon, max_plies)
+    if workers <= 1:
+        while solver.iterations < iterations:
+            solver.iterate(min(round_iterations, iterations - solver.iterations))
+            if progress:
+                progress(solver)
+        return solver
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while solver.iterations < iterations:
+            per_worker = max(min(round_iterations, (iterations - solver.iterations) // workers), 1)
+            futures = [pool.submit(solve_round, solver.regrets, solver.strategy_sums, per_worker,
+                                   solver.rng.getrandbits(32), epsilon, max_plies, worker)
+                       for worker in range(workers)]
+            for future in futures:
+                regret_delta, sums_delta = future.result()
+                for offset, delta in enumerate(regret_delta):
+                    if delta:
+                        solver.regrets[offset] += delta
+                for offset, delta in enumerate(sums_delta):
+                    if delta:
+                        solver.strategy_sums[offset] += delta
+            solver.iterations += per_worker * workers
+            if progress:
+                progress(solver)
+    return solver
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Solve the two-player game with MCCFR and write a strategy table.")
+    parser.add_argument('--iterations', type=int, default=200000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--out', default=DEFAULT_TABLE_PATH)
+    parser.add_argument('--checkpoint', default=None, help="Solver state written every round (default: OUT.ckpt)")
+    parser.add_argument('--resume', action='store_true', help="Continue from --checkpoint up to --iterations in all")
+    args = parser.parse_args()
+    checkpoint_path = args.checkpoint or f"{args.out}.ckpt"
+
+    solver = None
+    if args.resume:
+        solver = CFRSolver.load_checkpoint(checkpoint_path)
+        print(f"Resuming from {checkpoint_path} at {solver.iterations} iterations")
+    start = time.perf_counter()
+    first = solver.iterations if solver else 0
+
+    def progress(solver):
+        print(f"{solver.iterations} iterations, {solver.reached_infosets()} information sets reached, "
+              f"{(solver.iterations - first) / (time.perf_counter() - start):.0f} iterations/s")
+        # The table is playable at any point; the checkpoint lets --resume pick up from here
+        solver.save(args.out)
+        solver.save_checkpoint(checkpoint_path)
+
+    solve(args.iterations, args.seed, args.workers, progress=progress, solver=solver)
+    print(f"Strategy table written to {args.out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,228 @@
+import mmap
+import os
+import random
+import struct
+from CompactGameState import CARD_CODES, ACTION_CODES
+from DecisionBackends import DecisionBackend, HeuristicBackend, register_backend
+from Bots import RandomBot
+from FastGame import (CARD_VALUE, CLAIMED_CARD, PHASE_ACTION, PHASE_CHALLENGE, PHASE_BLOCK, PHASE_BLOCK_CHALLENGE,
+                      DUKE, CAPTAIN, CONTESSA, FOREIGN_AID, TAX, ASSASSINATE, STEAL, EXCHANGE, COUP, REACT)
+
+
+# Abstraction of a two-player decision. Every dimension is small, so an
+# information set is one mixed-radix index into a flat table.
+DECISIONS = [
+    (PHASE_ACTION, None),
+    (PHASE_CHALLENGE, TAX), (PHASE_CHALLENGE, EXCHANGE),
+    (PHASE_BLOCK, FOREIGN_AID), (PHASE_BLOCK, STEAL),
+    (PHASE_BLOCK_CHALLENGE, FOREIGN_AID), (PHASE_BLOCK_CHALLENGE, STEAL), (PHASE_BLOCK_CHALLENGE, ASSASSINATE)
+]
+DECISION_INDEX = {decision: index for index, decision in enumerate(DECISIONS)}
+COIN_BUCKETS = [0, 0, 1, 2, 2, 3, 3, 4, 4, 4]  # By coins 0-9; 10 and over is bucket 5. Edges at 3 and 7 keep legality exact.
+NUM_COIN_BUCKETS = 6
+HANDS = [(card,) for card in range(5)] + [(first, second) for first in range(5) for second in range(first, 5)]
+HAND_INDEX = {hand: index for index, hand in enumerate(HANDS)}
+NO_CLAIM = 5  # Claim bucket when the opponent's latest event claimed no character
+DIMENSIONS = (len(DECISIONS), NUM_COIN_BUCKETS, NUM_COIN_BUCKETS, len(HANDS), 2, NO_CLAIM + 1)
+NUM_INFOSETS = 1
+for radix in DIMENSIONS:
+    NUM_INFOSETS *= radix
+WIDTH = 7  # Action slots per information set: actions in ACTION_CODES order, or PASS/REACT
+
+BLOCK_CLAIMS = {FOREIGN_AID: DUKE, STEAL: CAPTAIN, ASSASSINATE: CONTESSA}
+DEFAULT_TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cfr_strategy.bin')
+MAGIC = b'CFRS'
+VERSION = 1
+
+
+def coin_bucket(coins):
+    return COIN_BUCKETS[coins] if coins < 10 else NUM_COIN_BUCKETS - 1
+
+
+def infoset_index(decision, own_coins, opponent_coins, hand, opponent_cards, claim):
+    """Mixed-radix index of an abstract information set; hand is a list of card codes."""
+    index = DECISION_INDEX[decision]
+    index = index * NUM_COIN_BUCKETS + coin_bucket(own_coins)
+    index = index * NUM_COIN_BUCKETS + coin_bucket(opponent_coins)
+    index = index * len(HANDS) + HAND_INDEX[tuple(sorted(hand)[:2])]
+    index = index * 2 + (min(opponent_cards, 2) - 1)
+    return index * (NO_CLAIM + 1) + claim
+
+
+def legal_slots(decision, coins):
+    """Table slots the decider may use."""
+    if decision[0] != PHASE_ACTION:
+        return [0, 1]
+    slots = [0, 1, TAX, STEAL, EXCHANGE]
+    if coins >= 3:
+        slots.append(ASSASSINATE)
+    if coins >= 7:
+        slots.append(COUP)
+    return slots
+
+
+class StrategyTable:
+    """
+    Solved strategy in a compact binary file: a header with the abstraction's
+    dimensions, then WIDTH quantized probabilities (one byte each, summing to
+    about 255) per information set. The file is memory-mapped read-only, so
+    every player in every process shares the same pages and a lookup is one
+    slice at a computed offset.
+    """
+
+    header = struct.Struct('<4sHH')
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as table_file:
+            self.data = mmap.mmap(table_file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, num_dimensions = self.header.unpack_from(self.data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} strategy table")
+        offset = self.header.size
+        dimensions = struct.unpack_from(f'<{num_dimensions}H', self.data, offset)
+        offset += 2 * num_dimensions
+        width, = struct.unpack_from('<H', self.data, offset)
+        if dimensions != DIMENSIONS or width != WIDTH:
+            raise ValueError(f"{path} was solved for a different abstraction")
+        self.offset = offset + 2
+
+    @staticmethod
+    def write(path, probabilities):
+        """Writes NUM_INFOSETS * WIDTH probabilities (floats in [0, 1]) as a table file."""
+        body = bytearray(NUM_INFOSETS * WIDTH)
+        for index in range(NUM_INFOSETS):
+            base = index * WIDTH
+            for slot in range(WIDTH):
+                body[base + slot] = min(255, int(round(probabilities[base + slot] * 255)))
+        with open(path, 'wb') as table_file:
+            table_file.write(StrategyTable.header.pack(MAGIC, VERSION, len(DIMENSIONS)))
+            table_file.write(struct.pack(f'<{len(DIMENSIONS)}HH', *DIMENSIONS, WIDTH))
+            table_file.write(body)
+
+    def weights(self, index):
+        start = self.offset + index * WIDTH
+        return self.data[start:start + WIDTH]
+
+    def sample(self, index, slots, rng=random):
+        """Draws a slot from the stored strategy, uniformly if the set was never reached in solving."""
+        weights = self.weights(index)
+        total = sum(weights[slot] for slot in slots)
+        if total == 0:
+            return rng.choice(slots)
+        pick = rng.random() * total
+        for slot in slots:
+            pick -= weights[slot]
+            if pick < 0:
+                return slot
+        return slots[-1]
+
+    def close(self):
+        self.data.close()
+
+
+_open_tables = {}
+
+
+def open_table(path=DEFAULT_TABLE_PATH):
+    """One shared mapping per table file in this process."""
+    path = os.path.abspath(path)
+    if path not in _open_tables:
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No strategy table at {path}; solve one with: python CFRSolver.py --out {path}")
+        _open_tables[path] = StrategyTable(path)
+    return _open_tables[path]
+
+
+def close_table(path=DEFAULT_TABLE_PATH):
+    """Unmaps a table open_table shared, e.g. before the file is replaced or deleted."""
+    table = _open_tables.pop(os.path.abspath(path), None)
+    if table is not None:
+        table.close()
+
+
+def latest_claim(events, opponent_name):
+    """Character claimed in the opponent's latest logged action or block, or NO_CLAIM."""
+    for entry in reversed(events):
+        if entry.get('player') == opponent_name:
+            return CLAIMED_CARD.get(ACTION_CODES.get(entry.get('action')), NO_CLAIM)
+        if entry.get('blocker') == opponent_name:
+            return BLOCK_CLAIMS.get(ACTION_CODES.get(entry.get('action')), NO_CLAIM)
+    return NO_CLAIM
+
+
+class CFRBackend(DecisionBackend):
+    """
+    Plays a CFR-solved two-player strategy: each decision is abstracted to
+    its table index (coin buckets, own hand, opponent's card count and latest
+    claim) and answered by sampling the stored strategy, so serving costs a
+    table lookup. Games with more than two seats fall back to the heuristics.
+    """
+
+    name = 'cfr'
+
+    def __init__(self, table=None):
+        self.table = table if isinstance(table, StrategyTable) else open_table(table or DEFAULT_TABLE_PATH)
+        self.fallback = HeuristicBackend()
+        self.pending_action = None
+
+    def opponent(self, player):
+        players = player.game.players if player.game else []
+        opponents = [seat_player for seat_player in players if seat_player is not player]
+        return opponents[0] if len(opponents) == 1 else None
+
+    def decide(self, player, opponent, decision):
+        hand = [CARD_CODES[card] for card in player.cards]
+        events = player.game.game_state.get_public_game_state()['actions_log']
+        index = infoset_index(decision, player.coins, opponent.coins, hand, len(opponent.cards),
+                              latest_claim(events, opponent.name))
+        return self.table.sample(index, legal_slots(decision, player.coins), player.rng)
+
+    def choose_action(self, player, game_state):
+        opponent = self.opponent(player)
+        if opponent is None or not opponent.cards:
+            self.pending_action = self.fallback.choose_action(player, game_state)
+        else:
+            self.pending_action = list(ACTION_CODES)[self.decide(player, opponent, (PHASE_ACTION, None))]
+        return self.pending_action
+
+    def choose_target(self, player, valid_targets):
+        return self.fallback.choose_target(player, valid_targets)
+
+    def wants_to_challenge(self, player, acting_player, action):
+        opponent = self.opponent(player)
+        if opponent is None or not player.has_cards():
+            return self.fallback.wants_to_challenge(player, acting_player, action)
+        if action == 'block':
+            # Only the actor is asked about a block, so the blocked action is our own pending one
+            decision = (PHASE_BLOCK_CHALLENGE, ACTION_CODES.get(self.pending_action))
+        else:
+            decision = (PHASE_CHALLENGE, ACTION_CODES.get(action))
+        if decision not in DECISION_INDEX:
+            return False
+        return self.decide(player, opponent, decision) == REACT
+
+    def wants_to_block(self, player, acting_player, action):
+        opponent = self.opponent(player)
+        if opponent is None or not player.has_cards():
+            return self.fallback.wants_to_block(player, acting_player, action)
+        decision = (PHASE_BLOCK, ACTION_CODES.get(action))
+        if decision not in DECISION_INDEX:
+            return False
+        return self.decide(player, opponent, decision) == REACT
+
+    def choose_exchange_cards(self, player, num_cards_to_exchange):
+        # Returned cards come back in reverse, so the most wanted card ends up first and is lost last
+        ranked = sorted(player.cards, key=lambda card: CARD_VALUE[CARD_CODES[card]])
+        return ranked[:num_cards_to_exchange]
+
+
+register_backend('cfr', CFRBackend)
+
+
+class CFRBot(RandomBot):
+    """Non-interactive player on a memory-mapped CFR strategy table; takes (name, character, game)."""
+
+    def __init__(self, name, character=None, game=None, table_path=DEFAULT_TABLE_PATH):
+        super().__init__(name, character, game)
+        self.backend = CFRBackend(open_table(table_path))
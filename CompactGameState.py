@@ -0,0 +1,217 @@
+from array import array
+from types import MappingProxyType
+from EventLog import EventLog, DEFAULT_CAPACITY, EVENT_ACTION, EVENT_TURN_CHANGE, EVENT_CHALLENGE, EVENT_BLOCK
+
+
+# Integer codes shared by the compact engines. Card codes index the 15-card deck
+# composition, action codes follow ActionHandler.valid_actions plus 'block'.
+CARDS = ['Duke', 'Assassin', 'Captain', 'Ambassador', 'Contessa']
+COPIES_PER_CARD = 3
+CARD_CODES = {card: code for code, card in enumerate(CARDS)}
+ACTIONS = ['income', 'foreign_aid', 'coup', 'tax', 'assassinate', 'steal', 'exchange', 'block']
+ACTION_CODES = {action: code for code, action in enumerate(ACTIONS)}
+OUTCOMES = ['success', 'blocked', 'challenge_failed', 'insufficient_coins', 'no_target', 'invalid',
+            'unspecified', 'challenged', 'unchallenged', 'completed', 'error', 'bluff', 'truth']
+
+UNKNOWN_CARD = -1  # Hand slot whose card was only reported as a count
+MAX_HAND = 4
+UNKNOWN_HANDS = [array('b', [UNKNOWN_CARD] * count) for count in range(MAX_HAND + 1)]
+
+
+class CompactGameState:
+    """
+    Drop-in replacement for GameState that keeps per-player fields in flat
+    arrays indexed by seat and the actions log as an EventLog of fixed-width
+    integer records. Names, actions and outcomes are interned once, so the hot
+    update_* and log_* calls never build dicts; the dict views returned by
+    get_game_state and get_public_game_state are decoded on demand.
+
+    It trades speed for size: GameState stores a reference to each new
+    hand, while update_player_cards encodes every card into its slot, about
+    0.6us against 0.2-0.3us a call. Full games come out a few percent
+    slower than with GameState, so the simulators only use it on request.
+    """
+
+    __slots__ = ('player_index', 'player_names', 'coins', 'influence', 'hand_size', 'hands',
+                 'events', 'deck_size', 'winner', 'current_turn', 'listeners', 'journal',
+                 'muted')
+
+    def __init__(self, log_capacity=DEFAULT_CAPACITY, spill_path=None):
+        self.player_index = {}
+        self.player_names = []
+        self.coins = array('i')
+        self.influence = array('b')
+        self.hand_size = array('b')
+        self.hands = array('b')  # MAX_HAND slots per player
+        self.events = EventLog(log_capacity, spill_path, strings=ACTIONS + OUTCOMES)
+        self.deck_size = 0
+        self.winner = None
+        self.current_turn = 0
+        self.listeners = []
+        self.journal = None  # MoveJournal recording player views while Game.apply runs
+        self.muted = False  # Set while Game.apply runs: its events are neither logged nor passed to listeners
+
+    def add_listener(self, listener):
+        """Registers an object with on_action, on_challenge and on_block methods."""
+        self.listeners.append(listener)
+
+    def _player(self, player_name):
+        index = self.player_index.get(player_name)
+        if index is None:
+            index = self.player_index[player_name] = len(self.player_names)
+            self.player_names.append(player_name)
+            self.coins.append(2)
+            self.influence.append(2)
+            self.hand_size.append(0)
+            self.hands.extend([UNKNOWN_CARD] * MAX_HAND)
+        return index
+
+    def add_player(self, player_name):
+        # Initialize (or reset) state for a player
+        index = self._player(player_name)
+        self.coins[index] = 2  # Starting coins
+        self.influence[index] = 2
+        self.hand_size[index] = 0
+
+    def ensure_player_initialized(self, player_name):
+        self._player(player_name)
+
+    def log_action(self, player_name, action, outcome):
+        if self.muted:
+            return
+        self.events.append(EVENT_ACTION, player_name, None, action, outcome)
+        for listener in self.listeners:
+            listener.on_action(player_name, action, outcome)
+
+    def log_turn_change(self, player_name):
+        if self.muted:
+            return
+        self.events.append(EVENT_TURN_CHANGE, player_name)
+
+    def set_winner(self, winner_name):
+        self.winner = winner_name
+
+    def log_challenge(self, challenger, challenged, action, result, success):
+        if self.muted:
+            return
+        self.events.append(EVENT_CHALLENGE, challenger, challenged, action, result, success)
+        for listener in self.listeners:
+            listener.on_challenge(challenger, challenged, action, result, success)
+
+    def log_block(self, blocker, blocked, action, result, success):
+        if self.muted:
+            return
+        self.events.append(EVENT_BLOCK, blocker, blocked, action, result, success)
+        for listener in self.listeners:
+            listener.on_block(blocker, blocked, action, result, success)
+
+    def log_influence_change(self, player_name, influence_change):
+        index = self.player_index.get(player_name)
+        if index is None:
+            index = self._player(player_name)
+        if self.journal is not None:
+            self.journal.player_view(self, player_name)
+        self.influence[index] += influence_change
+
+    def update_player_coins(self, player_name, coin_change):
+        index = self.player_index.get(player_name)
+        if index is None:
+            index = self._player(player_name)
+        if self.journal is not None:
+            self.journal.player_view(self, player_name)
+        self.coins[index] += coin_change
+
+    def update_player_cards(self, player_name, new_cards):
+        # Accepts a hand or, like CardManager.distribute_cards passes, just a card count.
+        # Unlike GameState, which keeps a reference to the list, every card is encoded and
+        # written into its slot here, so this call stays a few times slower than the dict one
+        index = self.player_index.get(player_name)
+        if index is None:
+            index = self._player(player_name)
+        if self.journal is not None:
+            self.journal.player_view(self, player_name)
+        slot = index * MAX_HAND
+        if isinstance(new_cards, int):
+            count = new_cards
+            if count > MAX_HAND:
+                raise ValueError(f"{player_name} cannot hold {count} cards")
+            self.hands[slot:slot + count] = UNKNOWN_HANDS[count]
+        else:
+            count = len(new_cards)
+            if count > MAX_HAND:
+                raise ValueError(f"{player_name} cannot hold {count} cards")
+            hands = self.hands
+            for card in new_cards:
+                hands[slot] = CARD_CODES[card]
+                slot += 1
+        self.hand_size[index] = count
+
+    def save_player(self, player_name):
+        index = self.player_index[player_name]
+        base = index * MAX_HAND
+        return self.coins[index], self.influence[index], self.hand_size[index], self.hands[base:base + MAX_HAND]
+
+    def restore_player(self, player_name, saved):
+        index = self.player_index[player_name]
+        base = index * MAX_HAND
+        self.coins[index], self.influence[index], self.hand_size[index], self.hands[base:base + MAX_HAND] = saved
+
+    def update_deck_size(self, size):
+        self.deck_size = size
+
+    def player_cards(self, player_name):
+        index = self.player_index[player_name]
+        base = index * MAX_HAND
+        return [None if code == UNKNOWN_CARD else CARDS[code] for code in self.hands[base:base + self.hand_size[index]]]
+
+    def recent_actions(self, count):
+        """Decodes only the last count events."""
+        return self.events.recent(count)
+
+    @property
+    def actions_log(self):
+        """Every event of the game, oldest first, spilled ones included."""
+        return self.events.history()
+
+    def close(self):
+        """Releases the event log's spill file once the game is over."""
+        self.events.close()
+
+    def _players_state(self):
+        return {
+            name: {
+                'coins': self.coins[index],
+                'cards': self.player_cards(name),
+                'influence': self.influence[index]
+            }
+            for name, index in self.player_index.items()
+        }
+
+    @property
+    def players_state(self):
+        # Decoded from the arrays on every access, so it is read-only: a write
+        # would land in a throwaway dict. Change players through the update methods.
+        return MappingProxyType({name: MappingProxyType(state) for name, state in self._players_state().items()})
+
+    def get_game_state(self):
+        return {
+            "actions_log": self.actions_log,
+            "players_state": self._players_state(),
+            "deck_size": self.deck_size,
+            "winner": self.winner
+        }
+
+    def get_public_game_state(self):
+        public_state = {
+            "actions_log": self.recent_actions(7),
+            "players_state": {},
+            "deck_size": self.deck_size,
+            "winner": self.winner
+        }
+        for player, index in self.player_index.items():
+            public_state["players_state"][player] = {
+                "coins": self.coins[index],
+                "influence": self.influence[index],
+                "card_count": self.hand_size[index]  # Only include card count
+            }
+        return public_state
@@ -0,0 +1,190 @@
+import itertools
+from Player import ACTION_TO_CARD
+
+
+def affordable_actions(player):
+    """Actions the player has the coins for."""
+    actions = ['income', 'foreign_aid', 'tax', 'steal', 'exchange']
+    if player.coins >= 3:
+        actions.append('assassinate')
+    if player.coins >= 7:
+        actions.append('coup')
+    return actions
+
+
+class DecisionBackend:
+    """
+    Decides for a player without knowing how the player is seated: every
+    method gets the player it decides for, so one backend class can drive an
+    AIAgent or a bot, and agents with different backends can share a game.
+    Offline backends only read the player's cards and coins and the public
+    player list, so a decision takes microseconds and needs no network.
+    """
+
+    name = 'backend'
+    reacts_concurrently = False  # Offline answers are faster than a thread hand-off
+
+    def choose_action(self, player, game_state):
+        raise NotImplementedError
+
+    def choose_target(self, player, valid_targets):
+        raise NotImplementedError
+
+    def choose_exchange_cards(self, player, num_cards_to_exchange):
+        return player.rng.sample(player.cards, min(num_cards_to_exchange, len(player.cards)))
+
+    def wants_to_challenge(self, player, acting_player, action):
+        raise NotImplementedError
+
+    def wants_to_block(self, player, acting_player, action):
+        raise NotImplementedError
+
+    def send_message(self, player, game_state):
+        return ''
+
+    def make_decision(self, player, game_state, decision_type, additional_info=None):
+        """Answers a prompt-style decision in the vocabulary parse_response produces."""
+        additional_info = additional_info or {}
+        if decision_type == 'action_decision':
+            return self.choose_action(player, game_state)
+        if decision_type == 'challenge_decision':
+            challenged = self.wants_to_challenge(player, additional_info.get('acting_player'), additional_info.get('action'))
+            return 'challenge' if challenged else 'no_challenge'
+        if decision_type == 'block_decision':
+            blocked = self.wants_to_block(player, additional_info.get('acting_player'), additional_info.get('action'))
+            return 'block' if blocked else 'no_block'
+        return None
+
+
+class RandomBackend(DecisionBackend):
+    """Uniform over the affordable actions; challenges and blocks at fixed rates."""
+
+    name = 'random'
+    challenge_rate = 0.2
+    block_rate = 0.3
+
+    def choose_action(self, player, game_state):
+        return player.rng.choice(affordable_actions(player))
+
+    def choose_target(self, player, valid_targets):
+        return player.rng.choice(valid_targets) if valid_targets else None
+
+    def wants_to_challenge(self, player, acting_player, action):
+        return player.has_cards() and player.rng.random() < self.challenge_rate
+
+    def wants_to_block(self, player, acting_player, action):
+        return player.has_cards() and player.rng.random() < self.block_rate
+
+
+class HeuristicBackend(RandomBackend):
+    """
+    Plays its real cards: coups as soon as it can, then assassinates, taxes or
+    steals with the characters it holds, and only challenges a claim when it
+    holds two copies of the claimed character. It gives up an assassination
+    or a steal once its last attempt at it was blocked, and never exchanges:
+    the engine draws back the very cards an exchange returns.
+    """
+
+    name = 'heuristic'
+
+    def choose_action(self, player, game_state):
+        if player.coins >= 7:
+            return 'coup'
+        if 'Assassin' in player.cards and player.coins >= 3 and not self.last_attempt_blocked(player, 'assassinate'):
+            return 'assassinate'
+        if 'Duke' in player.cards:
+            return 'tax'
+        if ('Captain' in player.cards and self.richest_opponent_coins(player) >= 2
+                and not self.last_attempt_blocked(player, 'steal')):
+            return 'steal'
+        return 'income'
+
+    def last_attempt_blocked(self, player, action):
+        """Whether the player's last action of this kind still in the event log was blocked."""
+        if not player.game:
+            return False
+        for event in reversed(player.game.game_state.events.retained()):
+            if event.get('player') == player.name and event['action'] == action:
+                return event['outcome'] == 'blocked'
+        return False
+
+    def richest_opponent_coins(self, player):
+        targets = player.get_available_targets(player.game) if player.game else []
+        return max((opponent.coins for opponent in targets), default=0)
+
+    def choose_target(self, player, valid_targets):
+        if not valid_targets:
+            return None
+        # Go after whoever is closest to winning: most influence, then most coins
+        return max(valid_targets, key=lambda opponent: (len(opponent.cards), opponent.coins))
+
+    def wants_to_challenge(self, player, acting_player, action):
+        required_card = ACTION_TO_CARD.get(action)
+        return player.has_cards() and required_card is not None and player.cards.count(required_card) >= 2
+
+    def wants_to_block(self, player, acting_player, action):
+        if action == 'foreign_aid':
+            return 'Duke' in player.cards
+        if action == 'steal':
+            return 'Captain' in player.cards or 'Ambassador' in player.cards
+        if action == 'assassinate':
+            return 'Contessa' in player.cards
+        return False
+
+
+class ScriptedBackend(DecisionBackend):
+    """
+    Deterministic bot for load tests and reproducible CI games: cycles through
+    a fixed list of actions (unaffordable ones become income, and it coups
+    whenever it can), targets the first opponent, keeps the first cards on an
+    exchange, and gives fixed answers to challenges and blocks. Uses no
+    randomness at all, so it never disturbs a seeded game.
+    """
+
+    name = 'scripted'
+    default_script = ('tax', 'income', 'foreign_aid', 'steal')
+
+    def __init__(self, script=None, challenge=False, block=False):
+        self.script = tuple(script or self.default_script)
+        self.steps = itertools.cycle(self.script)
+        self.challenge = challenge
+        self.block = block
+
+    def choose_action(self, player, game_state):
+        if player.coins >= 7:
+            return 'coup'
+        action = next(self.steps)
+        return action if action in affordable_actions(player) else 'income'
+
+    def choose_target(self, player, valid_targets):
+        return valid_targets[0] if valid_targets else None
+
+    def choose_exchange_cards(self, player, num_cards_to_exchange):
+        return player.cards[:num_cards_to_exchange]
+
+    def wants_to_challenge(self, player, acting_player, action):
+        return self.challenge and player.has_cards()
+
+    def wants_to_block(self, player, acting_player, action):
+        return self.block and player.has_cards()
+
+
+BACKENDS = {
+    'random': RandomBackend,
+    'heuristic': HeuristicBackend,
+    'scripted': ScriptedBackend
+}
+
+
+def register_backend(name, factory):
+    """Registers a backend factory taking no arguments, e.g. a DecisionBackend subclass."""
+    BACKENDS[name] = factory
+
+
+def make_backend(backend):
+    """Returns a backend instance for a registered name, or the backend itself if it already is one."""
+    if isinstance(backend, str):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown decision backend: {backend}")
+        return BACKENDS[backend]()
+    return backend
@@ -0,0 +1,86 @@
+import re
+
+
+NEGATIONS = {'no', 'not', 'never', "don't", 'dont', "won't", 'wont'}
+
+# decision type -> (keyword, negative answer) for the yes/no decisions
+YES_NO_DECISIONS = {
+    'challenge_decision': ('challenge', 'no_challenge'),
+    'block_decision': ('block', 'no_block'),
+    'bluff_decision': ('bluff', 'no_bluff')
+}
+REACTION_KEYWORDS = ('challenge', 'block')
+
+
+class DecisionScanner:
+    """
+    Reads a completion word by word, as it streams in or all at once, and
+    settles the decision at the first keyword that decides it: the first valid
+    action for an action decision, or the first challenge/block/bluff keyword
+    (negated by a preceding "no", "not", ...) for a reaction. feed returns the
+    decision as soon as it is settled so a streaming caller can cancel the rest
+    of the generation; finish reads the last word and returns the decision, or
+    the decision type's default (None where the caller has its own fallback).
+    """
+
+    word_pattern = re.compile(r"[a-z_']+")
+
+    def __init__(self, decision_type, valid_actions):
+        self.decision_type = decision_type
+        self.valid_actions = valid_actions
+        self.buffer = ''
+        self.scanned = 0  # Buffer offset up to which complete words were read
+        self.previous_word = ''
+        self.decision = None
+
+    def feed(self, text):
+        """Adds streamed text; returns the decision once settled, else None."""
+        if self.decision is None:
+            self.buffer += text.lower()
+            for match in self.word_pattern.finditer(self.buffer, self.scanned):
+                if match.end() == len(self.buffer):
+                    break  # The word may continue in the next chunk
+                self.scanned = match.end()
+                if self.read_word(match.group(0)):
+                    break
+        return self.decision
+
+    def finish(self):
+        """Reads whatever is left and returns the final decision."""
+        if self.decision is None:
+            for match in self.word_pattern.finditer(self.buffer, self.scanned):
+                self.scanned = match.end()
+                if self.read_word(match.group(0)):
+                    break
+        if self.decision is None and self.decision_type in YES_NO_DECISIONS:
+            self.decision = YES_NO_DECISIONS[self.decision_type][1]
+        return self.decision
+
+    def read_word(self, word):
+        word = word.strip("'")
+        previous, self.previous_word = self.previous_word, word
+        if self.decision_type == 'action_decision':
+            if word in self.valid_actions:
+                self.decision = word
+            elif previous == 'foreign' and word == 'aid':
+                self.decision = 'foreign_aid'
+        elif self.decision_type in YES_NO_DECISIONS:
+            keyword, negative = YES_NO_DECISIONS[self.decision_type]
+            if word == negative:
+                self.decision = negative
+            elif word in (keyword, keyword + 's'):
+                self.decision = negative if previous in NEGATIONS else keyword
+        elif self.decision_type == 'reaction_decision':
+            for keyword in REACTION_KEYWORDS:
+                if word == 'no_' + keyword:
+                    self.decision = word
+                elif word in (keyword, keyword + 's'):
+                    self.decision = 'no_' + keyword if previous in NEGATIONS else keyword
+        return self.decision is not None
+
+
+def scan_decision(decision_type, text, valid_actions):
+    """Decision for a complete response, identical to what streaming it would settle on."""
+    scanner = DecisionScanner(decision_type, valid_actions)
+    scanner.feed(text)
+    return scanner.finish()
@@ -0,0 +1,122 @@
+import json
+import tempfile
+from array import array
+
+
+# Event records are EVENT_WIDTH consecutive shorts:
+# kind, first player, second player, action, result, success (-1 for None)
+EVENT_ACTION, EVENT_TURN_CHANGE, EVENT_CHALLENGE, EVENT_BLOCK = range(4)
+EVENT_WIDTH = 6
+SUCCESS_CODES = {None: -1, False: 0, True: 1}
+SUCCESS_VALUES = {-1: None, 0: False, 1: True}
+
+DEFAULT_CAPACITY = 64  # Events kept in memory; prompts read the last 5 to 7
+
+
+class EventLog:
+    """
+    Typed game event log: every event is one fixed-width record of interned
+    codes in a ring buffer of capacity records, so memory stays flat however
+    long a session runs. Once the ring is full each new event overwrites the
+    oldest one, which is first appended as a JSON line to spill_path, or
+    without one to an anonymous temporary file opened on the first overflow,
+    so history() can always read every event back in order. spill_path is
+    truncated when the log opens: one file holds one game. recent(count)
+    decodes only the last count records. close() releases the spill file.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, spill_path=None, strings=()):
+        self.capacity = capacity
+        self.records = array('h', [0]) * (capacity * EVENT_WIDTH)
+        self.total = 0  # Events ever logged; the newest is at slot (total - 1) % capacity
+        self.names = []
+        self.name_codes = {}
+        self.strings = list(strings)
+        self.string_codes = {value: code for code, value in enumerate(self.strings)}
+        self.spill_path = spill_path
+        self.spill_file = open(spill_path, 'w+') if spill_path else None
+        self.closed = False
+
+    def _intern(self, table, codes, value):
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(table)
+            table.append(value)
+        return code
+
+    def append(self, kind, first, second=None, action=None, result=None, success=None):
+        offset = (self.total % self.capacity) * EVENT_WIDTH
+        if self.total >= self.capacity:
+            spill_file = self.spill_file
+            if spill_file is None and not self.closed:
+                spill_file = self.spill_file = tempfile.TemporaryFile('w+')
+            if spill_file is not None:
+                spill_file.write(json.dumps(self.decode(offset)) + '\n')
+        names, name_codes = self.names, self.name_codes
+        strings, string_codes = self.strings, self.string_codes
+        records = self.records
+        records[offset] = kind
+        records[offset + 1] = self._intern(names, name_codes, first)
+        records[offset + 2] = -1 if second is None else self._intern(names, name_codes, second)
+        records[offset + 3] = -1 if action is None else self._intern(strings, string_codes, action)
+        records[offset + 4] = -1 if result is None else self._intern(strings, string_codes, result)
+        records[offset + 5] = SUCCESS_CODES[success]
+        self.total += 1
+
+    def __len__(self):
+        """Number of events still in memory."""
+        return min(self.total, self.capacity)
+
+    def decode(self, offset):
+        """The record at offset as the dict the game state has always logged."""
+        kind, first, second, action, result, success = self.records[offset:offset + EVENT_WIDTH]
+        names, strings = self.names, self.strings
+        if kind == EVENT_ACTION:
+            return {"player": names[first], "action": strings[action], "outcome": strings[result]}
+        if kind == EVENT_TURN_CHANGE:
+            return {"turn_change_to": names[first]}
+        roles = ("challenger", "challenged") if kind == EVENT_CHALLENGE else ("blocker", "blocked")
+        return {
+            roles[0]: names[first],
+            roles[1]: names[second],
+            "action": strings[action],
+            "result": strings[result],
+            "success": SUCCESS_VALUES[success]
+        }
+
+    def recent(self, count):
+        """Decodes only the last count events, oldest first."""
+        count = min(count, len(self))
+        capacity = self.capacity
+        return [self.decode(((self.total - count + position) % capacity) * EVENT_WIDTH) for position in range(count)]
+
+    def retained(self):
+        return self.recent(len(self))
+
+    def history(self):
+        """Every logged event: the spilled ones from the file, then the retained ones."""
+        events = []
+        spill_file = self.spill_file
+        if spill_file is not None:
+            spill_file.flush()
+            spill_file.seek(0)
+            events.extend(json.loads(line) for line in spill_file if line.strip())
+            spill_file.seek(0, 2)  # Back to the end for the next spill
+        elif self.spill_path is not None:
+            events.extend(read_spill(self.spill_path))
+        return events + self.retained()
+
+    def close(self):
+        """Closes the spill file; a temporary one is deleted, and only the retained events remain."""
+        self.closed = True
+        if self.spill_file is not None:
+            self.spill_file.close()
+            self.spill_file = None
+
+
+def read_spill(path):
+    """Yields the events an EventLog spilled to path, oldest first."""
+    with open(path) as spill:
+        for line in spill:
+            if line.strip():
+                yield json.loads(line)
@@ -0,0 +1,309 @@
+from CompactGameState import CARDS, ACTIONS, COPIES_PER_CARD
+
+
+# Integer codes in CompactGameState's CARDS and ACTIONS order
+DUKE, ASSASSIN, CAPTAIN, AMBASSADOR, CONTESSA = range(len(CARDS))
+INCOME, FOREIGN_AID, COUP, TAX, ASSASSINATE, STEAL, EXCHANGE = range(ACTIONS.index('block'))
+CLAIMED_CARD = {TAX: DUKE, ASSASSINATE: ASSASSIN, STEAL: CAPTAIN, EXCHANGE: AMBASSADOR}
+BLOCKING_CARDS = {FOREIGN_AID: (DUKE,), STEAL: (CAPTAIN, AMBASSADOR), ASSASSINATE: (CONTESSA,)}
+TARGETED_ACTIONS = (COUP, ASSASSINATE, STEAL)
+FULL_DECK = [card for card in range(len(CARDS)) for _ in range(COPIES_PER_CARD)]
+
+# How much a player wants to keep each card, most wanted first in an exchanged hand
+CARD_VALUE = {DUKE: 4, CAPTAIN: 3, ASSASSIN: 2, CONTESSA: 1, AMBASSADOR: 0}
+
+PHASE_ACTION, PHASE_CHALLENGE, PHASE_BLOCK, PHASE_BLOCK_CHALLENGE, PHASE_OVER = range(5)
+PASS, REACT = 0, 1  # Moves in the reaction phases
+# Public result of a move whose effect depends on hidden cards
+NO_OUTCOME, OUTCOME_TRUTH, OUTCOME_BLUFF = range(3)
+NO_SEAT = -1
+
+
+def action_move(action, target=0):
+    """Packs an action and its target seat into one move code."""
+    return action | target << 3
+
+
+def move_action(move):
+    return move & 7
+
+
+def move_target(move):
+    return move >> 3
+
+
+class FastGame:
+    """
+    Compact model of a game for search: integer cards, coins and hands per
+    seat, and an explicit phase machine in which every question the engine
+    asks a player (action and target, challenge, block, challenge of a
+    block) is one decision of one seat. The rules follow GameManagement as
+    it plays, including its quirks: the last card in hand is the one lost,
+    a challenged block is never a bluff (so the challenger loses a card)
+    yet the block then fails and the action goes ahead, assassinations
+    always meet a block, reactions are polled in seat order and exchanges
+    only reorder the hand. legal_moves, apply and rollout_move never allocate more than
+    a short list, so a search can play thousands of games per second.
+    """
+
+    __slots__ = ('hands', 'coins', 'deck', 'num_players', 'turn', 'phase', 'decider',
+                 'action', 'target', 'responder', 'blocker', 'plies')
+
+    def __init__(self, hands, coins, deck, turn=0):
+        self.hands = hands
+        self.coins = coins
+        self.deck = deck
+        self.num_players = len(hands)
+        self.turn = turn
+        self.phase = PHASE_ACTION
+        self.decider = turn
+        self.action = NO_SEAT
+        self.target = NO_SEAT
+        self.responder = NO_SEAT
+        self.blocker = NO_SEAT
+        self.plies = 0
+        if self.is_over():
+            self.phase = PHASE_OVER
+
+    @classmethod
+    def deal(cls, num_players, rng):
+        deck = list(FULL_DECK)
+        rng.shuffle(deck)
+        hands = [[deck.pop(), deck.pop()] for _ in range(num_players)]
+        return cls(hands, [2] * num_players, deck)
+
+    def copy(self):
+        game = FastGame.__new__(FastGame)
+        game.hands = [list(hand) for hand in self.hands]
+        game.coins = list(self.coins)
+        game.deck = list(self.deck)
+        game.num_players = self.num_players
+        game.turn = self.turn
+        game.phase = self.phase
+        game.decider = self.decider
+        game.action = self.action
+        game.target = self.target
+        game.responder = self.responder
+        game.blocker = self.blocker
+        game.plies = self.plies
+        return game
+
+    def alive(self, seat):
+        return bool(self.hands[seat])
+
+    def alive_seats(self):
+        return [seat for seat in range(self.num_players) if self.hands[seat]]
+
+    def is_over(self):
+        return sum(1 for hand in self.hands if hand) <= 1
+
+    def winner(self):
+        seats = self.alive_seats()
+        return seats[0] if len(seats) == 1 else NO_SEAT
+
+    def public_key(self):
+        """Everything the table can see, which identifies an information set in the search tree."""
+        return (self.phase, self.turn, self.decider, self.action, self.target, self.responder, self.blocker,
+                tuple(self.coins), tuple(len(hand) for hand in self.hands), len(self.deck))
+
+    # -- moves --
+
+    def legal_moves(self):
+        if self.phase == PHASE_ACTION:
+            seat = self.turn
+            coins = self.coins[seat]
+            moves = [INCOME, FOREIGN_AID, TAX]
+            hand = self.hands[seat]
+            if hand != sorted(hand, key=CARD_VALUE.get, reverse=True):
+                # Exchanging only reorders the hand, so once it is in order it would just pass the turn
+                moves.append(EXCHANGE)
+            for target in range(self.num_players):
+                if target != seat and self.hands[target]:
+                    moves.append(action_move(STEAL, target))
+                    if coins >= 3:
+                        moves.append(action_move(ASSASSINATE, target))
+                    if coins >= 7:
+                        moves.append(action_move(COUP, target))
+            return moves
+        if self.phase == PHASE_OVER:
+            return []
+        return [PASS, REACT]
+
+    def apply(self, move, rng):
+        """Plays the decider's move and returns its public outcome."""
+        self.plies += 1
+        outcome = NO_OUTCOME
+        phase = self.phase
+        if phase == PHASE_ACTION:
+            self.start_action(move_action(move), move_target(move))
+        elif phase == PHASE_CHALLENGE:
+            if move == REACT:
+                outcome = self.resolve_challenge(rng)
+            else:
+                self.poll_next(PHASE_CHALLENGE)
+        elif phase == PHASE_BLOCK:
+            if move == REACT:
+                self.blocker = self.responder
+                self.phase = PHASE_BLOCK_CHALLENGE
+                self.decider = self.turn
+            else:
+                self.poll_next(PHASE_BLOCK)
+        elif phase == PHASE_BLOCK_CHALLENGE:
+            if move == REACT:
+                self.challenge_block()
+            else:
+                self.end_turn()  # The block stands
+        if self.phase != PHASE_OVER and self.is_over():
+            self.phase = PHASE_OVER
+        return outcome
+
+    def start_action(self, action, target):
+        seat = self.turn
+        self.action = action
+        self.target = target if action in TARGETED_ACTIONS else NO_SEAT
+        if action == INCOME:
+            self.coins[seat] += 1
+            self.end_turn()
+        elif action == COUP:
+            self.coins[seat] -= 7
+            self.lose_influence(target)
+            self.end_turn()
+        elif action == ASSASSINATE:
+            # The engine asks the assassin straight away whether to challenge the target's block
+            self.coins[seat] -= 3
+            self.blocker = target
+            self.phase = PHASE_BLOCK_CHALLENGE
+            self.decider = seat
+        else:
+            self.responder = NO_SEAT
+            self.poll_next(PHASE_BLOCK if action in (FOREIGN_AID, STEAL) else PHASE_CHALLENGE)
+
+    def poll_next(self, phase):
+        """Asks the next living opponent in seat order, or carries out the action once all have passed."""
+        for seat in range(self.responder + 1, self.num_players):
+            if seat != self.turn and self.hands[seat]:
+                self.phase = phase
+                self.responder = self.decider = seat
+                return
+        self.carry_out()
+        self.end_turn()
+
+    def resolve_challenge(self, rng):
+        seat = self.turn
+        claimed = CLAIMED_CARD[self.action]
+        hand = self.hands[seat]
+        if claimed not in hand:
+            self.lose_influence(seat)
+            self.end_turn()
+            return OUTCOME_BLUFF
+        self.lose_influence(self.responder)
+        if len(hand) < 2:
+            # Shown card goes back into the deck, a replacement is drawn, then one more card
+            hand.remove(claimed)
+            self.deck.append(claimed)
+            rng.shuffle(self.deck)
+            self.draw(seat)
+            self.draw(seat)
+        self.carry_out()
+        self.end_turn()
+        return OUTCOME_TRUTH
+
+    def challenge_block(self):
+        # A block never counts as a bluff, so the challenger loses a card and the blocker may draw,
+        # but ChallengeHandler.resolve_block still reports the block as failed: the action goes ahead
+        self.lose_influence(self.turn)
+        if len(self.hands[self.blocker]) < 2:
+            self.draw(self.blocker)
+        if self.action == ASSASSINATE:
+            self.lose_influence(self.target)
+            self.end_turn()
+        else:
+            self.responder = self.blocker
+            self.blocker = NO_SEAT
+            self.poll_next(PHASE_BLOCK)
+
+    def carry_out(self):
+        seat = self.turn
+        action = self.action
+        if action == TAX:
+            self.coins[seat] += 3
+        elif action == FOREIGN_AID:
+            self.coins[seat] += 2
+        elif action == STEAL:
+            stolen = min(self.coins[self.target], 2)
+            self.coins[seat] += stolen
+            self.coins[self.target] -= stolen
+        elif action == EXCHANGE:
+            self.hands[seat].sort(key=CARD_VALUE.get, reverse=True)
+
+    def lose_influence(self, seat):
+        if self.hands[seat]:
+            self.hands[seat].pop()
+
+    def draw(self, seat):
+        if self.deck:
+            self.hands[seat].append(self.deck.pop())
+
+    def end_turn(self):
+        self.action = self.target = self.responder = self.blocker = NO_SEAT
+        self.phase = PHASE_ACTION
+        for step in range(1, self.num_players + 1):
+            seat = (self.turn + step) % self.num_players
+            if self.hands[seat]:
+                self.turn = self.decider = seat
+                return
+
+    # -- playouts --
+
+    def rollout_move(self, rng):
+        """Fast default policy: plays its cards, coups when it can, and reacts mostly honestly."""
+        seat = self.decider
+        hand = self.hands[seat]
+        phase = self.phase
+        if phase == PHASE_ACTION:
+            targets = [target for target in range(self.num_players) if target != seat and self.hands[target]]
+            coins = self.coins[seat]
+            if coins >= 7:
+                return action_move(COUP, rng.choice(targets))
+            if ASSASSIN in hand and coins >= 3 and rng.random() < 0.7:
+                return action_move(ASSASSINATE, rng.choice(targets))
+            if DUKE in hand and rng.random() < 0.7:
+                return TAX
+            if CAPTAIN in hand and rng.random() < 0.6:
+                return action_move(STEAL, max(targets, key=self.coins.__getitem__))
+            pick = rng.random()
+            if pick < 0.35:
+                return INCOME
+            if pick < 0.6:
+                return FOREIGN_AID
+            if pick < 0.85:
+                return TAX
+            return action_move(STEAL, rng.choice(targets))
+        if phase == PHASE_CHALLENGE:
+            # Holding copies of the claimed card makes the claim less likely to be true
+            held = hand.count(CLAIMED_CARD[self.action])
+            if held >= 2:
+                return REACT
+            return REACT if rng.random() < (0.15 if held else 0.03) else PASS
+        if phase == PHASE_BLOCK:
+            if any(card in hand for card in BLOCKING_CARDS[self.action]):
+                return REACT if rng.random() < 0.9 else PASS
+            return REACT if rng.random() < 0.1 else PASS
+        return REACT if rng.random() < 0.05 else PASS
+
+    def rewards(self):
+        """1 for the winner; unfinished games are split by influence, then coins."""
+        winner = self.winner()
+        if winner != NO_SEAT:
+            return [1.0 if seat == winner else 0.0 for seat in range(self.num_players)]
+        strength = [len(hand) * 4 + min(coins, 10) * 0.25 if hand else 0.0
+                    for hand, coins in zip(self.hands, self.coins)]
+        total = sum(strength) or 1.0
+        return [value / total for value in strength]
+
+    def rollout(self, rng, max_plies=200):
+        """Plays the default policy to the end (or max_plies more moves) and returns the rewards."""
+        limit = self.plies + max_plies
+        while self.phase != PHASE_OVER and self.plies < limit:
+            self.apply(self.rollout_move(rng), rng)
+        return self.rewards()
@@ -0,0 +1,273 @@
+import argparse
+import json
+import os
+import time
+from array import array
+import numpy as np
+from CompactGameState import ACTIONS, OUTCOMES, CARDS, CARD_CODES
+from EventLog import EVENT_ACTION, EVENT_TURN_CHANGE, EVENT_CHALLENGE, EVENT_BLOCK
+from GameRecord import GameArchive
+
+
+KINDS = {'action': EVENT_ACTION, 'turn_change': EVENT_TURN_CHANGE, 'challenge': EVENT_CHALLENGE, 'block': EVENT_BLOCK}
+SUCCESS_CODES = {None: -1, False: 0, True: 1}
+MAX_SEATS = 6
+NO_SEED = -2 ** 63
+
+# Column name -> (array typecode, numpy dtype). Seats, agents and counts are -1 where unknown.
+EVENT_COLUMNS = {
+    'game': ('I', np.uint32),
+    'kind': ('b', np.int8),
+    'first': ('b', np.int8),  # Seat of the actor, challenger or blocker
+    'second': ('b', np.int8),  # Seat of the challenged or blocked player
+    'action': ('b', np.int8),
+    'result': ('h', np.int16),
+    'success': ('b', np.int8),
+    'first_coins': ('h', np.int16),
+    'first_cards': ('b', np.int8),
+    'second_coins': ('h', np.int16),
+    'second_cards': ('b', np.int8),
+    'first_agent': ('h', np.int16),
+    'second_agent': ('h', np.int16),
+    'claim': ('b', np.int8),  # Character claimed, by CARDS code
+    'hand': ('b', np.int8),  # Claimant's hand at the claim, one bit per character held (1 << CARDS code)
+    'hand_cards': ('b', np.int8),  # Cards in that hand
+    'bluff': ('b', np.int8)  # 1 when the claimant did not hold the claimed character, 0 when they did
+}
+GAME_COLUMNS = {
+    'seed': ('q', np.int64),
+    'first_event': ('Q', np.uint64),
+    'num_events': ('I', np.uint32),
+    'num_players': ('b', np.int8),
+    'winner': ('b', np.int8),
+    'turns': ('I', np.uint32)
+}
+GAME_COLUMNS.update({f'agent_{seat}': ('h', np.int16) for seat in range(MAX_SEATS)})
+FLUSH_EVENTS = 1 << 20  # Buffered events per column file write while building
+
+
+def build_index(archive_paths, directory):
+    """
+    Decodes every record of the archives once and writes the index to
+    directory: one raw little-endian file per event column and per game
+    column, plus index.json with the row counts and the string tables the
+    codes refer to. Columns are written in chunks, so building needs little
+    memory whatever the archive size.
+    """
+    os.makedirs(directory, exist_ok=True)
+    strings = {'results': list(OUTCOMES), 'agents': []}
+    result_codes = {value: code for code, value in enumerate(strings['results'])}
+    agent_codes = {}
+    event_files = {name: open(os.path.join(directory, f'event_{name}.bin'), 'wb') for name in EVENT_COLUMNS}
+    game_files = {name: open(os.path.join(directory, f'game_{name}.bin'), 'wb') for name in GAME_COLUMNS}
+    events = {name: array(typecode) for name, (typecode, _) in EVENT_COLUMNS.items()}
+    games = {name: array(typecode) for name, (typecode, _) in GAME_COLUMNS.items()}
+
+    def code(table, codes, value):
+        if value not in codes:
+            codes[value] = len(table)
+            table.append(value)
+        return codes[value]
+
+    def flush(columns, files):
+        for name, column in columns.items():
+            column.tofile(files[name])
+            del column[:]
+
+    num_games = num_events = 0
+    try:
+        for path in archive_paths:
+            with GameArchive(path) as archive:
+                for record in archive:
+                    seats = {name: seat for seat, name in enumerate(record.players)}
+                    agents = [code(strings['agents'], agent_codes, agent_type) for agent_type in record.agent_types]
+                    games['seed'].append(NO_SEED if record.seed is None else record.seed)
+                    games['first_event'].append(num_events)
+                    games['num_events'].append(len(record.events))
+                    games['num_players'].append(len(record.players))
+                    games['winner'].append(seats.get(record.winner, -1))
+                    games['turns'].append(record.turns)
+                    for seat in range(MAX_SEATS):
+                        games[f'agent_{seat}'].append(agents[seat] if seat < len(agents) else -1)
+
+                    for (kind, first, second, action, result, success), state in zip(record.events, record.states):
+                        first_seat, second_seat = seats.get(first, -1), seats.get(second, -1)
+                        events['game'].append(num_games)
+                        events['kind'].append(kind)
+                        events['first'].append(first_seat)
+                        events['second'].append(second_seat)
+                        events['action'].append(ACTIONS.index(action) if action in ACTIONS else -1)
+                        events['result'].append(-1 if result is None else code(strings['results'], result_codes, result))
+                        events['success'].append(SUCCESS_CODES[success])
+                        for name, value in zip(('first_coins', 'first_cards', 'second_coins', 'second_cards'), state):
+                            events[name].append(-1 if value is None else value)
+                        events['first_agent'].append(agents[first_seat] if first_seat >= 0 else -1)
+                        events['second_agent'].append(agents[second_seat] if second_seat >= 0 else -1)
+                        claim, hand = state[4:]
+                        events['claim'].append(-1 if claim is None else CARD_CODES[claim])
+                        events['hand'].append(-1 if hand is None else sum({1 << CARD_CODES[card] for card in hand}))
+                        events['hand_cards'].append(-1 if hand is None else len(hand))
+                        events['bluff'].append(-1 if claim is None or hand is None else int(claim not in hand))
+                    num_events += len(record.events)
+                    num_games += 1
+                    if len(events['game']) >= FLUSH_EVENTS:
+                        flush(events, event_files)
+                        flush(games, game_files)
+        flush(events, event_files)
+        flush(games, game_files)
+    finally:
+        for column_file in list(event_files.values()) + list(game_files.values()):
+            column_file.close()
+
+    with open(os.path.join(directory, 'index.json'), 'w') as meta:
+        json.dump({'games': num_games, 'events': num_events, 'strings': strings}, meta)
+    return GameIndex(directory)
+
+
+class GameIndex:
+    """
+    Columnar index over archived games, memory-mapped read-only: one numpy
+    array per event column (game, kind, seats, action, result, success, both
+    players' coins, cards and agent types, the claimed character and the
+    claimant's hand) and per game column. Queries are vectorized comparisons
+    over whole columns, so filtering and counting run at memory speed
+    without decoding a single record.
+
+        index = GameIndex('games.idx')
+        blocks = index.events(kind='block', action='assassinate', first_cards=1)
+        blocks.counts('result')
+        index.events(kind='block', claim='Contessa', hand_cards=1).rate(bluff=1)
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, 'index.json')) as meta:
+            meta = json.load(meta)
+        self.num_games = meta['games']
+        self.num_events = meta['events']
+        self.strings = {'kind': list(KINDS), 'action': ACTIONS, 'result': meta['strings']['results'],
+                        'agent': meta['strings']['agents']}
+        self.event_columns = {name: self.map(f'event_{name}.bin', dtype, self.num_events)
+                              for name, (_, dtype) in EVENT_COLUMNS.items()}
+        self.game_columns = {name: self.map(f'game_{name}.bin', dtype, self.num_games)
+                             for name, (_, dtype) in GAME_COLUMNS.items()}
+
+    def map(self, file_name, dtype, rows):
+        if rows == 0:
+            return np.zeros(0, dtype)
+        return np.memmap(os.path.join(self.directory, file_name), dtype=np.dtype(dtype).newbyteorder('<'), mode='r', shape=(rows,))
+
+    def table(self, column):
+        """String table a column's codes refer to, or None for a numeric column."""
+        if column == 'kind':
+            return self.strings['kind']
+        if column == 'action':
+            return self.strings['action']
+        if column == 'result':
+            return self.strings['result']
+        if column == 'claim':
+            return CARDS
+        if column.endswith('agent') or column.startswith('agent_'):
+            return self.strings['agent']
+        return None
+
+    def encode(self, column, value):
+        """Column code for a filter value: strings by table, success by SUCCESS_CODES, numbers as they are."""
+        if column == 'success':
+            return SUCCESS_CODES[value]
+        table = self.table(column)
+        if table is not None and isinstance(value, str):
+            if column == 'kind':
+                return KINDS[value]
+            return table.index(value) if value in table else -2  # Matches nothing
+        return value
+
+    def decode(self, column, code):
+        code = int(code)
+        if column == 'success':
+            return {-1: None, 0: False, 1: True}[code]
+        table = self.table(column)
+        if column == 'kind':
+            return next(name for name, kind in KINDS.items() if kind == code)
+        if table is not None:
+            return table[code] if code >= 0 else None
+        return code
+
+    def mask(self, columns, filters, mask=None):
+        """
+        Rows matching every filter: a value matches equal codes, a (low, high)
+        tuple an inclusive range, and a list or set any of its values.
+        """
+        for column, value in filters.items():
+            data = columns[column]
+            if isinstance(value, tuple):
+                low, high = value
+                match = (data >= low) & (data <= high)
+            elif isinstance(value, (list, set, frozenset, np.ndarray)):
+                match = np.isin(data, [self.encode(column, item) for item in value])
+            else:
+                match = data == self.encode(column, value)
+            mask = match if mask is None else mask & match
+        return mask
+
+    def events(self, **filters):
+        return Query(self, self.event_columns, self.mask(self.event_columns, filters))
+
+    def games(self, **filters):
+        return Query(self, self.game_columns, self.mask(self.game_columns, filters))
+
+
+class Query:
+    """A filtered selection of index rows; where narrows it, the rest aggregate it."""
+
+    def __init__(self, index, columns, mask):
+        self.index = index
+        self.columns = columns
+        self.selection = mask  # Boolean mask, or None for every row
+
+    def where(self, **filters):
+        return Query(self.index, self.columns, self.index.mask(self.columns, filters, self.selection))
+
+    def column(self, name):
+        data = self.columns[name]
+        return data if self.selection is None else data[self.selection]
+
+    def count(self):
+        if self.selection is None:
+            return len(next(iter(self.columns.values())))
+        return int(np.count_nonzero(self.selection))
+
+    def counts(self, name):
+        """Rows per value of a column, decoded, most frequent first."""
+        values, counts = np.unique(self.column(name), return_counts=True)
+        pairs = sorted(zip(values, counts), key=lambda pair: -pair[1])
+        return {self.index.decode(name, value): int(count) for value, count in pairs}
+
+    def rate(self, **filters):
+        """Fraction of the selected rows that also match filters."""
+        total = self.count()
+        return self.where(**filters).count() / total if total else 0.0
+
+    def mean(self, name):
+        data = self.column(name)
+        return float(data.mean()) if len(data) else 0.0
+
+    def game_ids(self):
+        if 'game' in self.columns:
+            return np.unique(self.column('game'))
+        return np.arange(self.count()) if self.selection is None else np.flatnonzero(self.selection)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a columnar query index over game archives.")
+    parser.add_argument('archives', nargs='+')
+    parser.add_argument('--out', required=True, help="Index directory")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index = build_index(args.archives, args.out)
+    print(f"Indexed {index.num_games} games, {index.num_events} events in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,213 @@
-class GameLogger:
-    def __init__(self):
-        self.logs = []
-
-    def log(self, message):
-        """Logs a message."""
-        self.logs.append(message)
-        print(message)  # Optionally, print the message in real-time
-
-    def get_logs(self):
-        """Returns all the logs."""
-        return self.logs
+import atexit
+import itertools
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+DEBUG, INFO, WARNING, ERROR = 10, 20, 30, 40
+OFF = 100  # Above every level: nothing is logged
+LEVEL_NAMES = {DEBUG: 'DEBUG', INFO: 'INFO', WARNING: 'WARNING', ERROR: 'ERROR'}
+DEFAULT_HISTORY = 1000  # Messages each logger keeps in memory for get_logs
+BATCH_SIZE = 256  # Lines the writer takes off the queue per file write
+
+
+class FileSink:
+    """
+    Append-only JSON-lines file that rotates when it grows past max_bytes:
+    path becomes path.1, path.1 becomes path.2 and so on, keeping at most
+    backups old files. Only the writer thread touches it.
+    """
+
+    def __init__(self, path, max_bytes=10 * 1024 * 1024, backups=3):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.file = open(path, 'a', encoding='utf-8')
+        self.size = self.file.tell()
+
+    def write(self, lines):
+        """Writes a batch in as few calls as rotation allows."""
+        chunk = []
+        for line in lines:
+            if self.max_bytes and self.size and self.size + len(line) > self.max_bytes:
+                self.file.write(''.join(chunk))
+                chunk = []
+                self.rotate()
+            chunk.append(line)
+            self.size += len(line)
+        self.file.write(''.join(chunk))
+        self.file.flush()
+
+    def rotate(self):
+        self.file.close()
+        if self.backups > 0:
+            for number in range(self.backups - 1, 0, -1):
+                older = f"{self.path}.{number}"
+                if os.path.exists(older):
+                    os.replace(older, f"{self.path}.{number + 1}")
+            os.replace(self.path, f"{self.path}.1")
+        self.file = open(self.path, 'w', encoding='utf-8')
+        self.size = 0
+
+    def close(self):
+        self.file.close()
+
+
+class LogWriter:
+    """
+    Background thread that owns the file sinks. Loggers put (sink, line)
+    pairs on its queue and return at once; the thread takes up to
+    BATCH_SIZE lines at a time and writes each sink's share with a single
+    call, so game threads never wait on the disk.
+    """
+
+    def __init__(self):
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self.run, name='GameLogWriter', daemon=True)
+        self.thread.start()
+
+    def put(self, sink, line):
+        self.queue.put((sink, line))
+
+    def run(self):
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < BATCH_SIZE:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            by_sink = {}
+            for sink, line in batch:
+                by_sink.setdefault(sink, []).append(line)
+            for sink, lines in by_sink.items():
+                try:
+                    if lines[-1] is None:  # Close request, queued after the sink's last line
+                        if len(lines) > 1:
+                            sink.write(lines[:-1])
+                        sink.close()
+                    else:
+                        sink.write(lines)
+                except (OSError, ValueError):
+                    pass  # A log file that cannot be written must not take the game down
+            for _ in batch:
+                self.queue.task_done()
+
+    def flush(self):
+        """Blocks until every line queued so far is written."""
+        self.queue.join()
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def log_writer():
+    """Process-wide writer thread, started on first use."""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = LogWriter()
+            atexit.register(_writer.flush)
+        return _writer
+
+
+_game_ids = itertools.count(1)
+
+
+class GameLogger:
+    """
+    Leveled, structured game log. A message below the logger's level
+    returns from log() after one comparison, before any formatting; callers
+    building expensive messages check enabled(level) first. Messages that
+    pass are kept in a bounded history, echoed to the terminal when echo is
+    set, and, when a path is given, queued as JSON lines to a per-game file
+    that a background thread writes in batches and rotates by size. The
+    path may contain {game_id} to give each game its own file.
+    """
+
+    def __init__(self, echo=True, level=INFO, path=None, game_id=None, history=DEFAULT_HISTORY,
+                 max_bytes=10 * 1024 * 1024, backups=3):
+        self.echo = echo  # Headless games keep the log but skip the terminal
+        self.level = level
+        self.game_id = next(_game_ids) if game_id is None else game_id
+        self.logs = deque(maxlen=history)
+        self.sink = None
+        if path:
+            self.sink = FileSink(path.format(game_id=self.game_id), max_bytes, backups)
+
+    def enabled(self, level):
+        return level >= self.level
+
+    def log(self, message, level=INFO, **fields):
+        """Logs a message, with optional structured fields for the file sink."""
+        if level < self.level:
+            return
+        self.logs.append(message)
+        if self.echo:
+            print(message)
+        if self.sink is not None:
+            record = {'time': time.time(), 'level': LEVEL_NAMES.get(level, level), 'game': self.game_id,
+                      'message': message}
+            if fields:
+                record.update(fields)
+            log_writer().put(self.sink, json.dumps(record, default=str) + '\n')
+
+    def debug(self, message, **fields):
+        if DEBUG >= self.level:
+            self.log(message, DEBUG, **fields)
+
+    def info(self, message, **fields):
+        if INFO >= self.level:
+            self.log(message, INFO, **fields)
+
+    def warning(self, message, **fields):
+        if WARNING >= self.level:
+            self.log(message, WARNING, **fields)
+
+    def error(self, message, **fields):
+        self.log(message, ERROR, **fields)
+
+    def get_logs(self):
+        """Returns the most recent logs, oldest first."""
+        return list(self.logs)
+
+    def flush(self):
+        if self.sink is not None:
+            log_writer().flush()
+
+    def close(self, wait=True):
+        """
+        Writes out everything queued and closes the file sink. With wait
+        False the close is only queued behind the logger's last line, for
+        runners that close a logger per game and flush the writer once.
+        """
+        if self.sink is not None:
+            writer = log_writer()
+            writer.put(self.sink, None)
+            if wait:
+                writer.flush()
+            self.sink = None
+
+
+_default_logger = None
+
+
+def default_logger():
+    """
+    Logger for code without a game at hand (agents built standalone, the
+    communication layer). Set COUPAI_LOG_LEVEL to DEBUG to see the agents'
+    diagnostics; the default shows warnings and errors only.
+    """
+    global _default_logger
+    if _default_logger is None:
+        name = os.getenv('COUPAI_LOG_LEVEL', 'WARNING').upper()
+        level = next((number for number, level_name in LEVEL_NAMES.items() if level_name == name), WARNING)
+        _default_logger = GameLogger(level=level, game_id=0)
+    return _default_logger
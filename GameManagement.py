@@ -1,413 +1,683 @@
-from GameLogger import GameLogger
-from GameState import GameState
-import random
-from AIAgent import AIAgent
-from CommunicationLayer import CommunicationLayer
-
-
-class Game:
-    def __init__(self, players):
-        self.players = players
-        self.logger = GameLogger()
-        self.deck = CardManager.initialize_deck()
-        self.turn_manager = TurnManager(self)
-        self.action_handler = ActionHandler(self)
-        self.challenge_handler = ChallengeHandler(self)
-        self.game_state = GameState()
-        self.communication_layer = None  # Initialize as None
-
-    def initialize_communication_layer(self):
-        if len(self.players) >= 2:
-            self.communication_layer = CommunicationLayer(self.players[0], self.players[1])
-        else:
-            raise ValueError("Not enough players to initialize communication layer")
-
-    def action_requires_coins(self, action):
-        """Check if the given action requires coins."""
-        actions_requiring_coins = ['coup', 'assassinate']
-        return action in actions_requiring_coins
-
-    def start_game(self):
-        self.initialize_communication_layer()
-        self.logger.log("Game has started")
-        # Initialize GameState for each player
-        for player in self.players:
-            self.game_state.add_player(player.name)
-
-        # Distribute cards to each player and update GameState
-        for player in self.players:
-            player.cards = [self.deck.pop() for _ in range(2)]
-            print(f"{player.name} received initial cards: {', '.join(player.cards)}")
-            self.logger.log(f"{player.name} received their initial cards.")
-            self.game_state.update_player_cards(player.name, player.cards)
-
-        # Update GameState with the remaining deck size
-        self.game_state.update_deck_size(len(self.deck))
-
-        # Start the game loop
-        while not self.is_game_over():
-            self.turn_manager.play_turn()
-            self.game_state.update_deck_size(len(self.deck))
-
-        self.announce_winner()
-        self.ask_restart_game()
-
-    def is_game_over(self):
-        # The game is over if only one or no players have cards left
-        active_players = [player for player in self.players if player.has_cards()]
-        return len(active_players) <= 1
-    
-    def run_communication_phase(self):
-        for player in self.players:
-            other_player = next(p for p in self.players if p != player)
-            if isinstance(player, AIAgent):
-                player.interact_with_communication_layer(self.communication_layer, self.game_state.get_public_game_state())
-            else:
-                self.communication_layer.start_exchange(player, other_player, self.game_state.get_public_game_state())
-
-            # Print the latest entries in the communication log
-            self.print_communication_log()
-
-    def print_communication_log(self):
-        print("---- Communication Log ----")
-        for entry in self.communication_layer.get_communication_log()[-2:]:  # Get the last two entries
-            print(f"Sender: {entry['sender']}, Receiver: {entry['receiver']}, Message: {entry['message']}")
-        print("----------------------------")
-
-    def announce_winner(self):
-        winner = next((player for player in self.players if player.has_cards()), None)
-        if winner:
-            self.logger.log(f"Game over! The winner is {winner.name}.")
-            self.game_state.set_winner(winner.name)  # Log the winner in GameState
-        else:
-            self.logger.log("Game over! No winner.")
-            self.game_state.set_winner(None)  # No winner
-
-        # Log final game state
-        final_state = self.game_state.get_game_state()
-        print(f"Final Game State: {final_state}")
-
-    def ask_restart_game(self):
-        while True:  # Loop until a valid input is received
-            choice = input("Do you want to play again? (yes/no): ").lower().strip()
-            if choice == 'yes':
-                self.reset_game()
-                break  # Break the loop if valid input is received
-            elif choice == 'no':
-                self.logger.log("Exiting game. Thank you for playing!")
-                break  # Break the loop if valid input is received
-            else:
-                print("Invalid input. Please enter 'yes' or 'no'.")
-
-    def reset_game(self):
-        self.logger.log("Resetting game...")
-        self.deck = CardManager.initialize_deck()
-        for player in self.players:
-            player.cards = []
-            player.coins = 2
-            # Reinitialize GameState for each player
-            self.game_state.add_player(player.name)
-        # Call distribute_cards with game_state
-        CardManager.distribute_cards(self.players, self.deck, self.logger, self.game_state)
-        self.turn_manager.current_turn = 0
-        self.start_game()
-
-    def choose_target(self, acting_player):
-        valid_targets = [player for player in self.players if player != acting_player and player.has_cards()]
-        print("Choose a target:")
-        for i, player in enumerate(valid_targets):
-            print(f"{i + 1}: {player.name}")
-
-        while True:
-            choice = input("Enter the number of the target player: ")
-            if choice.isdigit():
-                choice_index = int(choice) - 1
-                if 0 <= choice_index < len(valid_targets):
-                    return valid_targets[choice_index]  # Return the player object, not just the name
-                else:
-                    print("Invalid choice. Please select a valid target.")
-            else:
-                print("Invalid input. Please enter a number.")
-
-
-
-class TurnManager:
-    def __init__(self, game):
-        self.game = game
-        self.current_turn = 0
-
-    def play_turn(self):
-        if self.game.is_game_over():
-            self.game.announce_winner()
-            return
-
-        turn_player = self.game.players[self.current_turn]
-
-        if not turn_player.has_influence():
-            self.game.logger.log(f"{turn_player.name} has no influence and is out of the game.")
-            self.next_turn()
-            return
-
-        self.game.logger.log(f"{turn_player.name}'s turn begins.")
-        action_successful, challenge_failed, action_blocked = self.perform_action(turn_player)
-
-        # Move to the next turn if the action was successful, if a challenge failed, or if an action was blocked
-        if action_successful or challenge_failed or action_blocked:
-            self.game.run_communication_phase()
-            self.next_turn()
-
-    def perform_action(self, turn_player):
-        while True:
-            action = turn_player.choose_action(self.game.game_state)
-            if action not in self.game.action_handler.valid_actions:
-                self.game.logger.log(f"Invalid action: {action}. Please try again.")
-                continue
-
-            target_player = None
-            if action in ['coup', 'assassinate', 'steal']:
-                target_player = turn_player.choose_target(self.game)
-
-            action_result = self.game.action_handler.handle_action(action, turn_player, target_player)
-            action_successful, reason = action_result if isinstance(action_result, tuple) else (action_result, 'success' if action_result else 'unspecified')
-            self.game.game_state.log_action(turn_player.name, action, reason)
-            self.game.logger.log(f"Action Result: {action_result}, Successful: {action_successful}, Reason: {reason}")
-
-            challenge_failed = reason == 'challenge_failed'
-            action_blocked = reason == 'blocked'
-            return action_successful, challenge_failed, action_blocked
-
-    def next_turn(self):
-        self.current_turn = (self.current_turn + 1) % len(self.game.players)
-        self.game.logger.log(f"Turn moves to player index {self.current_turn}.")
-        self.game.game_state.current_turn = self.current_turn
-
-    def next_turn(self):
-        self.current_turn = (self.current_turn + 1) % len(self.game.players)
-        self.game.logger.log(f"Turn moves to player index {self.current_turn}.")
-
-
-
-class ActionHandler:
-    def __init__(self, game):
-        self.game = game
-        self.valid_actions = {'income', 'foreign_aid', 'coup', 'tax', 'assassinate', 'steal', 'exchange'}
-
-    def handle_action(self, action, player, target_player=None):
-        # Existing debug print statement
-        print(f"Handling action: {action} for player: {player.name}, type: {type(action)}")
-
-        # Check action and call the corresponding method
-        if action == "income":
-            return self.income(player)
-        elif action == "foreign_aid":
-            return self.foreign_aid(player)
-        elif action == "coup":
-            return self.coup(player, target_player)
-        elif action == "tax":
-            return self.tax(player)
-        elif action == "assassinate":
-            return self.assassinate(player, target_player)
-        elif action == "steal":
-            return self.steal(player, target_player)
-        elif action == "exchange":
-            return self.exchange(player)
-        else:
-            # Log the invalid action
-            self.game.logger.log(f"Invalid action attempted: {action} by {player.name}")
-            self.game.game_state.log_action(player.name, action, 'invalid')
-            return False, 'invalid_action'
-
-    def income(self, player):
-        self.game.logger.log(f"{player.name} takes Income action.")
-        player.gain_coins(1)
-        self.game.game_state.update_player_coins(player.name, player.coins)  # Update GameState
-        self.game.game_state.log_action(player.name, 'income', 'success')
-        return True, 'success'
-
-    def foreign_aid(self, player):
-        self.game.logger.log(f"{player.name} attempts Foreign Aid action.")
-        for potential_blocker in self.game.players:
-            if potential_blocker != player and potential_blocker.wants_to_block(player, 'foreign_aid'):
-                if self.game.challenge_handler.resolve_block(player, potential_blocker, 'foreign_aid'):
-                    self.game.game_state.log_action(player.name, 'foreign_aid', 'blocked')
-                    return False, 'blocked'
-        
-        player.gain_coins(2)
-        self.game.game_state.update_player_coins(player.name, player.coins)  # Update GameState
-        self.game.game_state.log_action(player.name, 'foreign_aid', 'success')
-        return True, 'success'
-
-    def coup(self, player, target=None):
-        self.game.logger.log(f"{player.name} attempts Coup action.")
-        if player.coins < 7:
-            self.game.logger.log(f"{player.name} does not have enough coins to perform a Coup.")
-            self.game.game_state.log_action(player.name, 'coup', 'insufficient_coins')
-            return False, 'insufficient_coins'
-
-        if target is None:
-            self.game.logger.log("No target specified for Coup.")
-            self.game.game_state.log_action(player.name, 'coup', 'no_target')
-            return False, 'no_target'
-
-        player.lose_coins(7)
-        self.game.game_state.update_player_coins(player.name, player.coins)  # Update GameState
-
-        target.lose_influence()
-        self.game.game_state.update_player_cards(target.name, target.cards)  # Update GameState
-        self.game.game_state.log_action(player.name, 'coup', 'success')
-        return True, 'success'
-    
-    def tax(self, player):
-        self.game.logger.log(f"{player.name} attempts Tax action.")
-        if self.game.challenge_handler.resolve_challenge(player, 'tax'):
-            self.game.game_state.log_action(player.name, 'tax', 'challenge_failed')
-            return (False, 'challenge_failed')
-
-        player.gain_coins(3)
-        self.game.game_state.update_player_coins(player.name, player.coins)  # Update GameState
-        self.game.game_state.log_action(player.name, 'tax', 'success')
-        return True
-
-    def assassinate(self, player, target=None):
-        self.game.logger.log(f"{player.name} attempts Assassinate action.")
-        if player.coins < 3:
-            self.game.logger.log(f"{player.name} does not have enough coins to perform an Assassination.")
-            self.game.game_state.log_action(player.name, 'assassinate', 'insufficient_coins')
-            return False, 'insufficient_coins'
-
-        if target is None:
-            self.game.logger.log("No target specified for Assassinate.")
-            self.game.game_state.log_action(player.name, 'assassinate', 'no_target')
-            return False, 'no_target'
-
-        player.lose_coins(3)
-        self.game.game_state.update_player_coins(player.name, player.coins)  # Update GameState
-
-        # Pass the target player object instead of just the name
-        if not self.game.challenge_handler.resolve_block(player, target, 'assassinate'):
-            target.lose_influence()
-            self.game.game_state.log_action(player.name, 'assassinate', 'success')
-            self.game.game_state.update_player_cards(target.name, target.cards)  # Update GameState
-            return True, 'success'
-        else:
-            self.game.game_state.log_action(player.name, 'assassinate', 'blocked')
-            return False, 'blocked'
-
-    def steal(self, player, target=None):
-        self.game.logger.log(f"{player.name} attempts Steal action.")
-
-        if target is None:
-            self.game.logger.log("No target specified for Steal.")
-            self.game.game_state.log_action(player.name, 'steal', 'no_target')
-            return False, 'no_target'
-
-        for potential_blocker in self.game.players:
-            if potential_blocker != player and potential_blocker.wants_to_block(player, 'steal'):
-                if self.game.challenge_handler.resolve_block(player, potential_blocker, 'steal'):
-                    self.game.game_state.log_action(player.name, 'steal', 'blocked')
-                    return False, 'blocked'
-
-        stolen_amount = min(target.coins, 2)
-        player.gain_coins(stolen_amount)
-        target.lose_coins(stolen_amount)
-        self.game.game_state.update_player_coins(player.name, player.coins)
-        self.game.game_state.update_player_coins(target.name, target.coins)
-        self.game.game_state.log_action(player.name, 'steal', 'success')
-        return True, 'success'
-
-    def exchange(self, player):
-        self.game.logger.log(f"{player.name} attempts Exchange action.")
-        if self.game.challenge_handler.resolve_challenge(player, 'exchange'):
-            self.game.game_state.log_action(player.name, 'exchange', 'challenge_failed')
-            return False, 'challenge_failed'
-
-        num_cards_to_exchange = min(len(player.cards), 2)  # Number of cards to exchange
-        chosen_cards = player.choose_exchange_cards(num_cards_to_exchange)
-
-        for card in chosen_cards:
-            player.cards.remove(card)
-            self.game.deck.append(card)
-
-        player.cards.extend([self.game.deck.pop() for _ in range(num_cards_to_exchange)])
-        random.shuffle(self.game.deck)  # Shuffle the deck after the exchange
-
-        self.game.game_state.update_player_cards(player.name, player.cards)  # Update GameState
-        self.game.game_state.log_action(player.name, 'exchange', 'success')
-        return True  # Successful exchange
-
-
-
-
-class ChallengeHandler:
-    def __init__(self, game):
-        self.game = game
-
-    def resolve_block(self, acting_player, blocking_player, action):
-        self.game.logger.log(f"{acting_player.name} is facing a block attempt by {blocking_player.name} on {action}.")
-
-        challenge_decision = acting_player.wants_to_challenge(blocking_player, 'block')
-        if challenge_decision:
-            self.game.logger.log(f"{acting_player.name} challenges {blocking_player.name}'s block!")
-            challenge_result = self.challenge_action(blocking_player, acting_player, 'block')
-            self.game.game_state.log_block(blocking_player.name, acting_player.name, action, 'challenged', challenge_result)
-            return challenge_result
-
-        # Assuming block success if not challenged
-        block_success = True
-        self.game.game_state.log_block(blocking_player.name, acting_player.name, action, 'unchallenged', block_success)
-        return block_success  # Block is successful if not challenged
-
-    def resolve_challenge(self, acting_player, action):
-        self.game.logger.log(f"Resolving challenges against {acting_player.name}'s action: {action}")
-        for player in self.game.players:
-            if player != acting_player:
-                if player.wants_to_challenge(acting_player, action):
-                    self.game.logger.log(f"{player.name} challenges {acting_player.name}'s {action}!")
-                    challenge_result = self.challenge_action(acting_player, player, action)
-                    if challenge_result is None:
-                        self.game.logger.log("Error resolving challenge. Continuing without resolution.")
-                        self.game.game_state.log_challenge(player.name, acting_player.name, action, 'error', None)
-                        return False
-                    self.game.game_state.log_challenge(player.name, acting_player.name, action, 'completed', challenge_result)
-                    return challenge_result
-        return False  # No challenge occurred
-
-    def challenge_action(self, acting_player, challenging_player, action):
-        self.game.logger.log(f"{acting_player.name} is being challenged by {challenging_player.name} on {action}.")
-        is_bluffing = not acting_player.verify_card(action)
-
-        if is_bluffing:
-            self.game.logger.log(f"{acting_player.name} was bluffing during {action}!")
-            acting_player.lose_influence()
-            self.game.game_state.log_challenge(challenging_player.name, acting_player.name, action, 'bluff', True)
-            self.game.game_state.log_influence_change(acting_player.name, -1)
-            return True
-        else:
-            self.game.logger.log(f"{acting_player.name} was not bluffing during {action}!")
-            challenging_player.lose_influence()
-            self.game.game_state.log_challenge(challenging_player.name, acting_player.name, action, 'truth', False)
-            self.game.game_state.log_influence_change(challenging_player.name, -1)
-            # Shuffle and draw a new card for the acting player, if they have less than 2 cards
-            if len(acting_player.cards) < 2:
-                acting_player.shuffle_in_card(action, self.game.deck)
-                acting_player.draw_card(self.game.deck)
-            return False
-
-
-class CardManager:
-    @staticmethod
-    def initialize_deck():
-        characters = ['Duke', 'Assassin', 'Captain', 'Ambassador', 'Contessa']
-        deck = characters * 3
-        random.shuffle(deck)
-        return deck
-
-    @staticmethod
-    def distribute_cards(players, deck, logger, game_state):
-        for player in players:
-            player.cards = [deck.pop() for _ in range(2)]
-            print(f"{player.name} received initial cards: {', '.join(player.cards)}")
-            logger.log(f"{player.name} received their initial cards.")
-            # Update GameState with the number of cards without revealing them
-            game_state.update_player_cards(player.name, len(player.cards))
-
+from GameLogger import GameLogger, DEBUG, INFO, WARNING, OFF
+from GameState import GameState
+from CompactGameState import CompactGameState, CARDS, COPIES_PER_CARD
+import random
+from concurrent.futures import ThreadPoolExecutor
+from AIAgent import AIAgent
+from CommunicationLayer import CommunicationLayer
+from Speculation import ReactionSpeculator
+from MoveJournal import MoveJournal
+from Zobrist import ZobristHash
+from time import perf_counter
+
+
+class Game:
+    def __init__(self, players, headless=False, compact_state=False, speculation=0, events_path=None,
+                 log_level=None, log_path=None, metrics=None, profiler=None, rng=None):
+        self.players = players
+        self.headless = headless  # No prompts, no stdout and no chat when running unattended
+        # Deck shuffles draw from rng; a seeded random.Random keeps replays off the global generator
+        self.rng = rng if rng is not None else random
+        # Headless games only record warnings unless asked; log_path may hold {game_id} for a file per game
+        self.logger = GameLogger(echo=not headless, level=log_level if log_level is not None else WARNING if headless else INFO,
+                                 path=log_path)
+        self.deck = CardManager.initialize_deck(self.rng)
+        self.turn_manager = TurnManager(self)
+        self.action_handler = ActionHandler(self)
+        self.challenge_handler = ChallengeHandler(self)
+        # CompactGameState keeps the same API in flat arrays for high-throughput runs
+        # Recent events stay in memory; older ones are spilled to events_path (one game per file)
+        # or to a temporary file, so actions_log stays complete. close() releases the file
+        self.game_state = CompactGameState(spill_path=events_path) if compact_state else GameState(spill_path=events_path)
+        self.communication_layer = None  # Initialize as None
+        # Prefetch opponents' reactions to this many likely actions while an AI actor decides (0 disables)
+        self.speculator = ReactionSpeculator(self, speculation) if speculation else None
+        self.journal = None  # MoveJournal of the moves played through apply, created on first use; attached only during apply
+        self.zobrist = None  # ZobristHash, created by the first position_hash call
+        self.metrics = metrics  # Metrics timing turns and LLM calls and counting reactions; None disables
+        self.profiler = profiler  # Profiler told when the action, reaction and communication phases start and end
+
+    def initialize_communication_layer(self):
+        if len(self.players) >= 2:
+            self.communication_layer = CommunicationLayer(self.players[0], self.players[1])
+        else:
+            raise ValueError("Not enough players to initialize communication layer")
+
+    def action_requires_coins(self, action):
+        """Check if the given action requires coins."""
+        actions_requiring_coins = ['coup', 'assassinate']
+        return action in actions_requiring_coins
+
+    def start_game(self):
+        if not self.headless:
+            self.initialize_communication_layer()
+        self.logger.log("Game has started")
+        self.deal_initial_cards()
+
+        # Start the game loop
+        while not self.is_game_over():
+            self.turn_manager.play_turn()
+            self.game_state.update_deck_size(len(self.deck))
+
+        self.announce_winner()
+        if not self.headless:
+            self.ask_restart_game()
+
+    def deal_initial_cards(self):
+        # Initialize GameState for each player
+        for player in self.players:
+            self.game_state.add_player(player.name)
+
+        # Distribute cards to each player and update GameState
+        for player in self.players:
+            player.cards = [self.deck.pop() for _ in range(2)]
+            if self.logger.enabled(DEBUG):
+                self.logger.debug(f"{player.name} received initial cards: {', '.join(player.cards)}")
+            self.logger.log(f"{player.name} received their initial cards.")
+            self.game_state.update_player_cards(player.name, player.cards)
+
+        # Update GameState with the remaining deck size
+        self.game_state.update_deck_size(len(self.deck))
+        if self.zobrist is not None:
+            self.zobrist.recompute()  # A new deal, e.g. after reset_game
+
+    def is_game_over(self):
+        # The game is over if only one or no players have cards left
+        active_players = [player for player in self.players if player.has_cards()]
+        return len(active_players) <= 1
+    
+    def run_communication_phase(self):
+        if self.headless:
+            return  # Headless games have no table talk
+
+        start = perf_counter() if self.metrics is not None else 0
+        if self.profiler is not None:
+            self.profiler.enter('communication')
+        for player in self.players:
+            other_player = next(p for p in self.players if p != player)
+            if isinstance(player, AIAgent):
+                player.interact_with_communication_layer(self.communication_layer, self.game_state.get_public_game_state())
+            else:
+                self.communication_layer.start_exchange(player, other_player, self.game_state.get_public_game_state())
+
+            # Print the latest entries in the communication log
+            self.print_communication_log()
+        if self.profiler is not None:
+            self.profiler.exit()
+        if self.metrics is not None:
+            self.metrics.observe('coup_communication_seconds', perf_counter() - start)
+
+    def print_communication_log(self):
+        print("---- Communication Log ----")
+        for entry in self.communication_layer.get_communication_log()[-2:]:  # Get the last two entries
+            print(f"Sender: {entry['sender']}, Receiver: {entry['receiver']}, Message: {entry['message']}")
+        print("----------------------------")
+
+    def announce_winner(self):
+        winner = next((player for player in self.players if player.has_cards()), None)
+        if winner:
+            self.logger.log(f"Game over! The winner is {winner.name}.")
+            self.game_state.set_winner(winner.name)  # Log the winner in GameState
+        else:
+            self.logger.log("Game over! No winner.")
+            self.game_state.set_winner(None)  # No winner
+
+        # Log final game state
+        if self.logger.enabled(INFO):
+            self.logger.info(f"Final Game State: {self.game_state.get_game_state()}")
+
+    def close(self):
+        """Releases the game state's event spill file; call once the game is over."""
+        self.game_state.close()
+
+    def ask_restart_game(self):
+        while True:  # Loop until a valid input is received
+            choice = input("Do you want to play again? (yes/no): ").lower().strip()
+            if choice == 'yes':
+                self.reset_game()
+                break  # Break the loop if valid input is received
+            elif choice == 'no':
+                self.logger.log("Exiting game. Thank you for playing!")
+                break  # Break the loop if valid input is received
+            else:
+                print("Invalid input. Please enter 'yes' or 'no'.")
+
+    def reset_game(self):
+        self.logger.log("Resetting game...")
+        # Moves journaled in the last game cannot be undone in this one
+        self.detach_journal()
+        self.journal = None
+        self.deck = CardManager.initialize_deck(self.rng)
+        for player in self.players:
+            player.cards = []
+            player.coins = 2
+        self.game_state.set_winner(None)
+        self.turn_manager.current_turn = self.game_state.current_turn = 0
+        self.turn_manager.turns_played = 0
+        self.start_game()  # Deals once, reinitializing GameState for each player and rebuilding the position hash
+
+    # -- snapshots --
+
+    def snapshot(self, buffer=None):
+        """
+        Captures the mutable core of the game in one flat list: turn index,
+        turns played and winner, then per player coins, hand size, cards and
+        the game state's view of them (save_player), then the deck in order.
+        Pass an earlier snapshot as buffer to refill it instead of allocating
+        a new one. Loggers, the event log and chat history are not part of a
+        snapshot.
+        """
+        snapshot = buffer if buffer is not None else []
+        snapshot.clear()
+        snapshot.append(self.turn_manager.current_turn)
+        snapshot.append(self.turn_manager.turns_played)
+        snapshot.append(self.game_state.winner)
+        for player in self.players:
+            snapshot.append(player.coins)
+            snapshot.append(len(player.cards))
+            snapshot.extend(player.cards)
+            snapshot.append(self.game_state.save_player(player.name))
+        snapshot.extend(self.deck)
+        return snapshot
+
+    def restore(self, snapshot):
+        """Puts the game back to a snapshot in place, reusing the players' hand and deck lists."""
+        self.turn_manager.current_turn = self.game_state.current_turn = snapshot[0]
+        self.turn_manager.turns_played = snapshot[1]
+        self.game_state.winner = snapshot[2]
+        position = 3
+        for player in self.players:
+            player.coins = snapshot[position]
+            size = snapshot[position + 1]
+            position += 2
+            player.cards[:] = snapshot[position:position + size]
+            position += size
+            self.game_state.restore_player(player.name, snapshot[position])
+            position += 1
+        self.deck[:] = snapshot[position:]
+        self.game_state.update_deck_size(len(self.deck))
+        if self.zobrist is not None:
+            self.zobrist.recompute()
+
+    # -- position hashing --
+
+    def position_hash(self):
+        """
+        64-bit Zobrist hash of coins, hands, deck composition and turn, kept
+        current in O(1) per change once this has been called (after dealing).
+        """
+        if self.zobrist is None:
+            self.zobrist = ZobristHash(self)
+            for player in self.players:
+                player.zobrist = self.zobrist
+            if self.journal is not None:
+                self.journal.zobrist = self.zobrist
+        return self.zobrist.value
+
+    # -- reversible moves --
+
+    def apply(self, action, target=None):
+        """
+        Plays action (with target, a Player, where needed) for the player to
+        move, asking opponents to react as in a normal turn, and passes the
+        turn the way play_turn does. Every effect on the players, the deck,
+        the turn and the game state's player entries is journaled, so undo
+        reverts the move exactly. The journal is attached only while the move
+        plays, so turns played normally in between are neither recorded nor
+        undone, and the move leaves nothing in the event log, its listeners
+        or the logger. Returns (successful, reason).
+        """
+        journal = self.attach_journal()
+        journal.begin_move()
+        level, self.logger.level = self.logger.level, OFF
+        self.game_state.muted = True
+        try:
+            turn_player = self.players[self.turn_manager.current_turn]
+            action_result = self.action_handler.handle_action(action, turn_player, target)
+            successful, reason = action_result if isinstance(action_result, tuple) else (action_result, 'success' if action_result else 'unspecified')
+            if successful or reason in ('challenge_failed', 'blocked'):
+                journal.turn(self.turn_manager)
+                self.turn_manager.turns_played += 1
+                self.turn_manager.next_turn()
+                # Skip players who are out, as play_turn would on their turn
+                while not self.is_game_over() and not self.players[self.turn_manager.current_turn].has_cards():
+                    self.turn_manager.next_turn()
+        finally:
+            self.game_state.muted = False
+            self.logger.level = level
+            self.detach_journal()
+        return successful, reason
+
+    def attach_journal(self):
+        """Points the players and the game state at the journal, created on first use, so their changes are recorded."""
+        if self.journal is None:
+            self.journal = MoveJournal()
+            self.journal.zobrist = self.zobrist
+        self.game_state.journal = self.journal
+        for player in self.players:
+            player.journal = self.journal
+        return self.journal
+
+    def detach_journal(self):
+        self.game_state.journal = None
+        for player in self.players:
+            player.journal = None
+
+    def undo(self):
+        """Reverts the last move played through apply."""
+        if self.journal is None:
+            raise ValueError("No move to undo")
+        self.journal.undo()
+        self.game_state.current_turn = self.turn_manager.current_turn
+
+    def choose_target(self, acting_player):
+        valid_targets = [player for player in self.players if player != acting_player and player.has_cards()]
+        print("Choose a target:")
+        for i, player in enumerate(valid_targets):
+            print(f"{i + 1}: {player.name}")
+
+        while True:
+            choice = input("Enter the number of the target player: ")
+            if choice.isdigit():
+                choice_index = int(choice) - 1
+                if 0 <= choice_index < len(valid_targets):
+                    return valid_targets[choice_index]  # Return the player object, not just the name
+                else:
+                    print("Invalid choice. Please select a valid target.")
+            else:
+                print("Invalid input. Please enter a number.")
+
+
+
+class TurnManager:
+    def __init__(self, game):
+        self.game = game
+        self.current_turn = 0
+        self.turns_played = 0  # Completed turns, used by the headless runners
+
+    def play_turn(self):
+        if self.game.is_game_over():
+            self.game.announce_winner()
+            return
+
+        turn_player = self.game.players[self.current_turn]
+
+        if not turn_player.has_influence():
+            self.game.logger.log(f"{turn_player.name} has no influence and is out of the game.")
+            self.next_turn()
+            return
+
+        # The turn is the one timed span: actions and reactions are only counted, since a
+        # scripted bot's turn takes microseconds and each timer costs a share of that
+        metrics = self.game.metrics
+        start = perf_counter() if metrics is not None else 0
+        self.game.logger.log(f"{turn_player.name}'s turn begins.")
+        action, action_successful, reason = self.perform_action(turn_player)
+
+        # Move to the next turn if the action was successful, if a challenge failed, or if an action was blocked
+        if action_successful or reason in ('challenge_failed', 'blocked'):
+            self.game.run_communication_phase()
+            self.turns_played += 1
+            self.next_turn()
+        if metrics is not None:
+            metrics.observe('coup_turn_seconds', perf_counter() - start, (action, reason))
+
+    def perform_action(self, turn_player):
+        speculator = self.game.speculator
+        if speculator and turn_player.reacts_concurrently:
+            speculator.prefetch(turn_player)
+        try:
+            return self.choose_and_handle_action(turn_player)
+        finally:
+            if speculator:
+                speculator.settle()
+
+    def choose_and_handle_action(self, turn_player):
+        profiler = self.game.profiler
+        if profiler is not None:
+            profiler.enter('action')
+        try:
+            while True:
+                action = turn_player.choose_action(self.game.game_state)
+                if action in self.game.action_handler.valid_actions:
+                    break
+                self.game.logger.log(f"Invalid action: {action}. Please try again.")
+
+            target_player = None
+            if action in ['coup', 'assassinate', 'steal']:
+                target_player = turn_player.choose_target(self.game)
+        finally:
+            if profiler is not None:
+                profiler.exit()
+        action_result = self.game.action_handler.handle_action(action, turn_player, target_player)
+        action_successful, reason = action_result if isinstance(action_result, tuple) else (action_result, 'success' if action_result else 'unspecified')
+        self.game.logger.log(f"Action Result: {action_result}, Successful: {action_successful}, Reason: {reason}")
+
+        return action, action_successful, reason
+
+    def next_turn(self):
+        self.current_turn = (self.current_turn + 1) % len(self.game.players)
+        self.game.logger.log(f"Turn moves to player index {self.current_turn}.")
+        self.game.game_state.current_turn = self.current_turn
+
+    def next_turn(self):
+        previous_turn = self.current_turn
+        self.current_turn = (self.current_turn + 1) % len(self.game.players)
+        self.game.logger.log(f"Turn moves to player index {self.current_turn}.")
+        if self.game.zobrist is not None:
+            self.game.zobrist.turn(previous_turn, self.current_turn)
+
+
+
+class ActionHandler:
+    def __init__(self, game):
+        self.game = game
+        self.valid_actions = {'income', 'foreign_aid', 'coup', 'tax', 'assassinate', 'steal', 'exchange'}
+
+    def handle_action(self, action, player, target_player=None):
+        if self.game.logger.enabled(DEBUG):
+            self.game.logger.debug(f"Handling action: {action} for player: {player.name}, type: {type(action)}")
+
+        # Check action and call the corresponding method
+        if action == "income":
+            return self.income(player)
+        elif action == "foreign_aid":
+            return self.foreign_aid(player)
+        elif action == "coup":
+            return self.coup(player, target_player)
+        elif action == "tax":
+            return self.tax(player)
+        elif action == "assassinate":
+            return self.assassinate(player, target_player)
+        elif action == "steal":
+            return self.steal(player, target_player)
+        elif action == "exchange":
+            return self.exchange(player)
+        else:
+            # Log the invalid action
+            self.game.logger.log(f"Invalid action attempted: {action} by {player.name}")
+            self.game.game_state.log_action(player.name, action, 'invalid')
+            return False, 'invalid_action'
+
+    def income(self, player):
+        self.game.logger.log(f"{player.name} takes Income action.")
+        player.gain_coins(1)
+        self.game.game_state.update_player_coins(player.name, player.coins)  # Update GameState
+        self.game.game_state.log_action(player.name, 'income', 'success')
+        return True, 'success'
+
+    def foreign_aid(self, player):
+        self.game.logger.log(f"{player.name} attempts Foreign Aid action.")
+        if self.game.challenge_handler.resolve_blocks(player, 'foreign_aid'):
+            self.game.game_state.log_action(player.name, 'foreign_aid', 'blocked')
+            return False, 'blocked'
+        
+        player.gain_coins(2)
+        self.game.game_state.update_player_coins(player.name, player.coins)  # Update GameState
+        self.game.game_state.log_action(player.name, 'foreign_aid', 'success')
+        return True, 'success'
+
+    def coup(self, player, target=None):
+        self.game.logger.log(f"{player.name} attempts Coup action.")
+        if player.coins < 7:
+            self.game.logger.log(f"{player.name} does not have enough coins to perform a Coup.")
+            self.game.game_state.log_action(player.name, 'coup', 'insufficient_coins')
+            return False, 'insufficient_coins'
+
+        if target is None:
+            self.game.logger.log("No target specified for Coup.")
+            self.game.game_state.log_action(player.name, 'coup', 'no_target')
+            return False, 'no_target'
+
+        player.lose_coins(7)
+        self.game.game_state.update_player_coins(player.name, player.coins)  # Update GameState
+
+        target.lose_influence()
+        self.game.game_state.update_player_cards(target.name, target.cards)  # Update GameState
+        self.game.game_state.log_action(player.name, 'coup', 'success')
+        return True, 'success'
+    
+    def tax(self, player):
+        self.game.logger.log(f"{player.name} attempts Tax action.")
+        if self.game.challenge_handler.resolve_challenge(player, 'tax'):
+            self.game.game_state.log_action(player.name, 'tax', 'challenge_failed')
+            return (False, 'challenge_failed')
+
+        player.gain_coins(3)
+        self.game.game_state.update_player_coins(player.name, player.coins)  # Update GameState
+        self.game.game_state.log_action(player.name, 'tax', 'success')
+        return True
+
+    def assassinate(self, player, target=None):
+        self.game.logger.log(f"{player.name} attempts Assassinate action.")
+        if player.coins < 3:
+            self.game.logger.log(f"{player.name} does not have enough coins to perform an Assassination.")
+            self.game.game_state.log_action(player.name, 'assassinate', 'insufficient_coins')
+            return False, 'insufficient_coins'
+
+        if target is None:
+            self.game.logger.log("No target specified for Assassinate.")
+            self.game.game_state.log_action(player.name, 'assassinate', 'no_target')
+            return False, 'no_target'
+
+        player.lose_coins(3)
+        self.game.game_state.update_player_coins(player.name, player.coins)  # Update GameState
+
+        # Pass the target player object instead of just the name
+        if not self.game.challenge_handler.resolve_block(player, target, 'assassinate'):
+            target.lose_influence()
+            self.game.game_state.log_action(player.name, 'assassinate', 'success')
+            self.game.game_state.update_player_cards(target.name, target.cards)  # Update GameState
+            return True, 'success'
+        else:
+            self.game.game_state.log_action(player.name, 'assassinate', 'blocked')
+            return False, 'blocked'
+
+    def steal(self, player, target=None):
+        self.game.logger.log(f"{player.name} attempts Steal action.")
+
+        if target is None:
+            self.game.logger.log("No target specified for Steal.")
+            self.game.game_state.log_action(player.name, 'steal', 'no_target')
+            return False, 'no_target'
+
+        if self.game.challenge_handler.resolve_blocks(player, 'steal'):
+            self.game.game_state.log_action(player.name, 'steal', 'blocked')
+            return False, 'blocked'
+
+        stolen_amount = min(target.coins, 2)
+        player.gain_coins(stolen_amount)
+        target.lose_coins(stolen_amount)
+        self.game.game_state.update_player_coins(player.name, player.coins)
+        self.game.game_state.update_player_coins(target.name, target.coins)
+        self.game.game_state.log_action(player.name, 'steal', 'success')
+        return True, 'success'
+
+    def exchange(self, player):
+        self.game.logger.log(f"{player.name} attempts Exchange action.")
+        if self.game.challenge_handler.resolve_challenge(player, 'exchange'):
+            self.game.game_state.log_action(player.name, 'exchange', 'challenge_failed')
+            return False, 'challenge_failed'
+
+        num_cards_to_exchange = min(len(player.cards), 2)  # Number of cards to exchange
+        chosen_cards = player.choose_exchange_cards(num_cards_to_exchange)
+
+        journal, zobrist = player.journal, self.game.zobrist
+        for card in chosen_cards:
+            if journal is not None:
+                journal.hand_remove(player, card)
+                journal.deck_append(self.game.deck)
+            player.cards.remove(card)
+            self.game.deck.append(card)
+            if zobrist is not None:
+                zobrist.card_out(player, card)
+                zobrist.deck_in(card)
+
+        for _ in range(num_cards_to_exchange):
+            if journal is not None:
+                journal.deck_pop(self.game.deck)
+                journal.hand_append(player)
+            card = self.game.deck.pop()
+            player.cards.append(card)
+            if zobrist is not None:
+                zobrist.deck_out(card)
+                zobrist.card_in(player, card)
+        if journal is not None:
+            journal.deck_shuffle(self.game.deck)
+        self.game.rng.shuffle(self.game.deck)  # Shuffle the deck after the exchange
+
+        self.game.game_state.update_player_cards(player.name, player.cards)  # Update GameState
+        self.game.game_state.log_action(player.name, 'exchange', 'success')
+        return True  # Successful exchange
+
+
+
+
+class ChallengeHandler:
+    def __init__(self, game):
+        self.game = game
+
+    def resolve_blocks(self, acting_player, action):
+        """
+        Asks the opponents whether they block action and resolves each block
+        in turn; True once one stands. The whole window, the opponents'
+        wants_to_block decisions included, is the 'reaction' phase.
+        """
+        profiler = self.game.profiler
+        if profiler is not None:
+            profiler.enter('reaction')
+        try:
+            for potential_blocker in self.poll_reactions(acting_player, 'block', action):
+                if self.resolve_block(acting_player, potential_blocker, action):
+                    return True
+            return False
+        finally:
+            if profiler is not None:
+                profiler.exit()
+
+    def resolve_block(self, acting_player, blocking_player, action):
+        if self.game.metrics is not None:
+            self.game.metrics.inc('coup_blocks_total', labels=(action,))
+        profiler = self.game.profiler
+        if profiler is not None:
+            profiler.enter('reaction')
+        try:
+            self.game.logger.log(f"{acting_player.name} is facing a block attempt by {blocking_player.name} on {action}.")
+
+            challenge_decision = acting_player.wants_to_challenge(blocking_player, 'block')
+            if challenge_decision:
+                self.game.logger.log(f"{acting_player.name} challenges {blocking_player.name}'s block!")
+                challenge_result = self.challenge_action(blocking_player, acting_player, 'block')
+                self.game.game_state.log_block(blocking_player.name, acting_player.name, action, 'challenged', challenge_result)
+                return challenge_result
+
+            # Assuming block success if not challenged
+            block_success = True
+            self.game.game_state.log_block(blocking_player.name, acting_player.name, action, 'unchallenged', block_success)
+            return block_success  # Block is successful if not challenged
+        finally:
+            if profiler is not None:
+                profiler.exit()
+
+    def resolve_challenge(self, acting_player, action):
+        profiler = self.game.profiler
+        if profiler is not None:
+            profiler.enter('reaction')
+        try:
+            self.game.logger.log(f"Resolving challenges against {acting_player.name}'s action: {action}")
+            for player in self.poll_reactions(acting_player, 'challenge', action):
+                if self.game.metrics is not None:
+                    self.game.metrics.inc('coup_challenges_total', labels=(action,))
+                self.game.logger.log(f"{player.name} challenges {acting_player.name}'s {action}!")
+                challenge_result = self.challenge_action(acting_player, player, action)
+                if challenge_result is None:
+                    self.game.logger.log("Error resolving challenge. Continuing without resolution.")
+                    self.game.game_state.log_challenge(player.name, acting_player.name, action, 'error', None)
+                    return False
+                self.game.game_state.log_challenge(player.name, acting_player.name, action, 'completed', challenge_result)
+                return challenge_result
+            return False  # No challenge occurred
+        finally:
+            if profiler is not None:
+                profiler.exit()
+
+    def poll_reactions(self, acting_player, reaction, action):
+        """
+        Yields, in seat order, the opponents who want to react ('challenge' or
+        'block') to acting_player's action. Opponents whose decisions are slow
+        (reacts_concurrently, e.g. LLM-backed agents) are all asked at once
+        before the first answer is read, so a reaction window costs about one
+        round trip; the rest are asked in turn, and only until the caller stops.
+        """
+        method = 'wants_to_challenge' if reaction == 'challenge' else 'wants_to_block'
+        opponents = [player for player in self.game.players if player != acting_player]
+        pending = {}
+        concurrent = [player for player in opponents if player.reacts_concurrently]
+        speculator = self.game.speculator
+        for player in concurrent:
+            future = speculator.take(player, reaction, action) if speculator else None
+            if future is None and len(concurrent) > 1:
+                future = self.reaction_pool().submit(getattr(player, method), acting_player, action)
+            if future is not None:
+                pending[player] = future
+
+        try:
+            for player in opponents:
+                future = pending.get(player)
+                wants_to_react = future.result() if future else getattr(player, method)(acting_player, action)
+                if wants_to_react:
+                    yield player
+        finally:
+            for future in pending.values():
+                future.cancel()  # Answers nobody will read
+
+    _reaction_pool = None
+
+    @classmethod
+    def reaction_pool(cls):
+        if cls._reaction_pool is None:
+            cls._reaction_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix='reactions')
+        return cls._reaction_pool
+
+    def challenge_action(self, acting_player, challenging_player, action):
+        self.game.logger.log(f"{acting_player.name} is being challenged by {challenging_player.name} on {action}.")
+        is_bluffing = not acting_player.verify_card(action)
+
+        if is_bluffing:
+            self.game.logger.log(f"{acting_player.name} was bluffing during {action}!")
+            acting_player.lose_influence()
+            self.game.game_state.update_player_cards(acting_player.name, acting_player.cards)
+            self.game.game_state.log_challenge(challenging_player.name, acting_player.name, action, 'bluff', True)
+            self.game.game_state.log_influence_change(acting_player.name, -1)
+            return True
+        else:
+            self.game.logger.log(f"{acting_player.name} was not bluffing during {action}!")
+            challenging_player.lose_influence()
+            self.game.game_state.log_challenge(challenging_player.name, acting_player.name, action, 'truth', False)
+            self.game.game_state.log_influence_change(challenging_player.name, -1)
+            # Shuffle and draw a new card for the acting player, if they have less than 2 cards
+            if len(acting_player.cards) < 2:
+                acting_player.shuffle_in_card(action, self.game.deck)
+                acting_player.draw_card(self.game.deck)
+            self.game.game_state.update_player_cards(acting_player.name, acting_player.cards)
+            self.game.game_state.update_player_cards(challenging_player.name, challenging_player.cards)
+            return False
+
+
+class CardManager:
+    @staticmethod
+    def initialize_deck(rng=random):
+        deck = CARDS * COPIES_PER_CARD  # The composition BeliefTracker and the search models assume
+        rng.shuffle(deck)
+        return deck
+
+    @staticmethod
+    def distribute_cards(players, deck, logger, game_state):
+        for player in players:
+            player.cards = [deck.pop() for _ in range(2)]
+            if logger.enabled(DEBUG):
+                logger.debug(f"{player.name} received initial cards: {', '.join(player.cards)}")
+            logger.log(f"{player.name} received their initial cards.")
+            # Update GameState with the number of cards without revealing them
+            game_state.update_player_cards(player.name, len(player.cards))
+
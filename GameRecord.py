@@ -0,0 +1,475 @@
+import mmap
+import os
+import struct
+import zlib
+from CompactGameState import ACTIONS, OUTCOMES, CARDS, CARD_CODES
+from EventLog import EVENT_ACTION, EVENT_CHALLENGE, EVENT_BLOCK
+from GameState import GameState
+from Player import ACTION_TO_CARD
+
+try:
+    import zstandard  # Best ratio and speed when installed; lz4 and zlib are the fallbacks
+except ImportError:
+    zstandard = None
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+
+
+RECORD_VERSION = 3  # Version 1 records have no coin and card counts, version 2 no claims and hands
+EVENT_END = 15  # Kind that closes a record's event stream
+SUCCESS_CODES = {None: 0, False: 1, True: 2}
+SUCCESS_VALUES = {0: None, 1: False, 2: True}
+UNKNOWN_STATE = (None, None, None, None, None, None)
+
+# Character an action or a block claims; a steal block may name either of two
+CLAIMED_CARDS = {action: (card,) for action, card in ACTION_TO_CARD.items()
+                 if card is not None and not action.startswith('block')}
+BLOCK_CARDS = {'foreign_aid': (ACTION_TO_CARD['block_foreign_aid'],),
+               'steal': (ACTION_TO_CARD['block_steal'], ACTION_TO_CARD['block_steal_ambassador']),
+               'assassinate': (ACTION_TO_CARD['block_assassinate'],)}
+
+ARCHIVE_MAGIC = b'CGRA'
+CODEC_NONE, CODEC_ZLIB, CODEC_ZSTD, CODEC_LZ4 = range(4)
+CODECS = {'none': CODEC_NONE, 'zlib': CODEC_ZLIB, 'zstd': CODEC_ZSTD, 'lz4': CODEC_LZ4}
+BLOCK_HEADER = struct.Struct('<BII')  # codec, raw size, stored size
+INDEX_ENTRY = struct.Struct('<QII')  # block offset, offset in the block, record size
+FOOTER = struct.Struct('<QQ4s')  # index offset, record count, magic
+DEFAULT_BLOCK_SIZE = 64 * 1024
+
+
+# -- varints --
+
+def write_varint(out, value):
+    while value >= 0x80:
+        out.append(value & 0x7f | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def read_varint(data, offset):
+    value = shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+def write_string(out, value):
+    encoded = value.encode('utf-8')
+    write_varint(out, len(encoded))
+    out.extend(encoded)
+
+
+def read_string(data, offset):
+    size, offset = read_varint(data, offset)
+    return bytes(data[offset:offset + size]).decode('utf-8'), offset + size
+
+
+class StringTable:
+    """
+    Strings by varint code, 0 meaning None. A code one past the table defines
+    a new string inline, so writer and reader grow identical tables and each
+    name or outcome is spelled out once per record.
+    """
+
+    def __init__(self, initial=()):
+        self.values = list(initial)
+        self.codes = {value: code for code, value in enumerate(self.values)}
+
+    def write(self, out, value):
+        if value is None:
+            out.append(0)
+            return
+        code = self.codes.get(value)
+        if code is not None:
+            write_varint(out, code + 1)
+            return
+        self.codes[value] = len(self.values)
+        self.values.append(value)
+        write_varint(out, len(self.values))
+        write_string(out, value)
+
+    def read(self, data, offset):
+        code, offset = read_varint(data, offset)
+        if code == 0:
+            return None, offset
+        if code <= len(self.values):
+            return self.values[code - 1], offset
+        value, offset = read_string(data, offset)
+        self.values.append(value)
+        return value, offset
+
+
+class GameRecord:
+    """
+    One finished game: the seed it was played from, each seat's player name
+    and agent type, every logged event as (kind, first, second, action,
+    result, success) with EventLog's kinds, the winner and the turn count.
+    states holds, per event, (first coins, first cards, second coins, second
+    cards, claim, hand), None where unknown. The counts are as they stood
+    when the event was logged. claim is the character the event claims
+    (an action's, a block's, or for a challenge the challenged claim's)
+    and hand the claimant's cards, sorted, as they stood when the claim was
+    made; an event that claims nothing carries its first player's hand.
+    encode gives the binary form: a varint header, then the event stream in
+    which players are seat numbers and actions and outcomes are codes
+    into the engine's tables.
+    """
+
+    def __init__(self, seed, players, agent_types, events=None, winner=None, turns=0, states=None):
+        self.seed = seed
+        self.players = list(players)
+        self.agent_types = list(agent_types)
+        self.events = events if events is not None else []
+        self.winner = winner
+        self.turns = turns
+        self.states = states if states is not None else [UNKNOWN_STATE] * len(self.events)
+
+    def encode(self):
+        out = bytearray()
+        write_varint(out, RECORD_VERSION)
+        # Seeds are zigzag-encoded, with 0 for an unseeded game
+        write_varint(out, 0 if self.seed is None else (self.seed << 1 if self.seed >= 0 else (-self.seed << 1) - 1) + 1)
+        write_varint(out, len(self.players))
+        for name, agent_type in zip(self.players, self.agent_types):
+            write_string(out, name)
+            write_string(out, agent_type)
+        names = StringTable(self.players)
+        strings = StringTable(ACTIONS + OUTCOMES)
+        for (kind, first, second, action, result, success), state in zip(self.events, self.states):
+            out.append(kind)
+            names.write(out, first)
+            names.write(out, second)
+            strings.write(out, action)
+            strings.write(out, result)
+            out.append(SUCCESS_CODES[success])
+            for value in state[:4]:
+                write_varint(out, 0 if value is None else value + 1)
+            claim, hand = state[4:]
+            write_varint(out, 0 if claim is None else CARD_CODES[claim] + 1)
+            write_varint(out, 0 if hand is None else len(hand) + 1)
+            out.extend(CARD_CODES[card] for card in hand or ())
+        out.append(EVENT_END)
+        names.write(out, self.winner)
+        write_varint(out, self.turns)
+        return bytes(out)
+
+    @classmethod
+    def decode(cls, data):
+        version, offset = read_varint(data, 0)
+        if version not in (1, 2, RECORD_VERSION):
+            raise ValueError(f"Unsupported game record version {version}")
+        seed, offset = read_varint(data, offset)
+        seed = None if seed == 0 else ((seed - 1) >> 1 if seed & 1 else -(seed >> 1))
+        num_players, offset = read_varint(data, offset)
+        players, agent_types = [], []
+        for _ in range(num_players):
+            name, offset = read_string(data, offset)
+            agent_type, offset = read_string(data, offset)
+            players.append(name)
+            agent_types.append(agent_type)
+        names = StringTable(players)
+        strings = StringTable(ACTIONS + OUTCOMES)
+        events, states = [], []
+        while True:
+            kind = data[offset]
+            offset += 1
+            if kind == EVENT_END:
+                break
+            first, offset = names.read(data, offset)
+            second, offset = names.read(data, offset)
+            action, offset = strings.read(data, offset)
+            result, offset = strings.read(data, offset)
+            events.append((kind, first, second, action, result, SUCCESS_VALUES[data[offset]]))
+            offset += 1
+            if version == 1:
+                states.append(UNKNOWN_STATE)
+                continue
+            state = []
+            for _ in range(4):
+                value, offset = read_varint(data, offset)
+                state.append(value - 1 if value else None)
+            if version == 2:
+                states.append(tuple(state) + (None, None))
+                continue
+            claim, offset = read_varint(data, offset)
+            size, offset = read_varint(data, offset)
+            hand = None
+            if size:
+                hand = tuple(CARDS[code] for code in data[offset:offset + size - 1])
+                offset += size - 1
+            states.append(tuple(state) + (CARDS[claim - 1] if claim else None, hand))
+        winner, offset = names.read(data, offset)
+        turns, offset = read_varint(data, offset)
+        return cls(seed, players, agent_types, events, winner, turns, states)
+
+    def replay(self, game_state=None):
+        """Logs the recorded events into game_state (a new GameState by default) and returns it."""
+        game_state = game_state if game_state is not None else GameState()
+        for name in self.players:
+            game_state.add_player(name)
+        for kind, first, second, action, result, success in self.events:
+            if kind == EVENT_ACTION:
+                game_state.log_action(first, action, result)
+            elif kind == EVENT_CHALLENGE:
+                game_state.log_challenge(first, second, action, result, success)
+            elif kind == EVENT_BLOCK:
+                game_state.log_block(first, second, action, result, success)
+            else:
+                game_state.log_turn_change(first)
+        game_state.set_winner(self.winner)
+        return game_state
+
+
+class GameRecorder:
+    """
+    Game state listener that collects every logged event for a GameRecord.
+    Given the game, it also notes both players' coins and card counts from
+    the Player objects as each event is logged, and each claimant's hand.
+    Events are logged once resolved, after a challenged claimant has already
+    shuffled in and redrawn, so hands are taken at the start of each turn:
+    on attach, which therefore comes after the deal, and after every action
+    event, the last event of a turn. No claimant's hand changes between the
+    start of the turn and their claim.
+    """
+
+    def __init__(self, seed=None, players=(), agent_types=(), game=None):
+        self.seed = seed
+        self.players = list(players)
+        self.agent_types = list(agent_types)
+        self.seats = {player.name: player for player in game.players} if game is not None else {}
+        self.events = []
+        self.states = []
+        self.hands = {}  # Player name -> sorted cards at the start of the turn
+
+    def attach(self, game_state):
+        game_state.add_listener(self)
+        self.take_hands()
+        return self
+
+    def take_hands(self):
+        self.hands = {name: tuple(sorted(player.cards)) for name, player in self.seats.items()}
+
+    def add(self, event, claimant, claims):
+        self.events.append(event)
+        first, second = self.seats.get(event[1]), self.seats.get(event[2])
+        hand = self.hands.get(claimant)
+        claim = None
+        if claims:
+            # Of a steal block's two characters, the one the blocker holds
+            claim = next((card for card in claims if hand and card in hand), claims[0])
+        self.states.append((first.coins if first else None, len(first.cards) if first else None,
+                            second.coins if second else None, len(second.cards) if second else None,
+                            claim, hand))
+
+    def on_action(self, player_name, action, outcome):
+        self.add((EVENT_ACTION, player_name, None, action, outcome, None), player_name, CLAIMED_CARDS.get(action))
+        self.take_hands()
+
+    def on_challenge(self, challenger, challenged, action, result, success):
+        # A challenged block's action is only known when the block is logged, right after
+        self.add((EVENT_CHALLENGE, challenger, challenged, action, result, success), challenged, CLAIMED_CARDS.get(action))
+
+    def on_block(self, blocker, blocked, action, result, success):
+        claims = BLOCK_CARDS.get(action)
+        self.add((EVENT_BLOCK, blocker, blocked, action, result, success), blocker, claims)
+        claim = self.states[-1][4]
+        for position in range(len(self.events) - 2, -1, -1):
+            kind, _, challenged, challenged_action = self.events[position][:4]
+            if kind != EVENT_CHALLENGE or challenged != blocker or challenged_action != 'block':
+                break
+            self.states[position] = self.states[position][:4] + (claim, self.states[position][5])
+
+    def record(self, winner=None, turns=0):
+        return GameRecord(self.seed, self.players, self.agent_types, self.events, winner, turns, self.states)
+
+
+# -- block compression --
+
+def default_codec():
+    if zstandard is not None:
+        return CODEC_ZSTD
+    if lz4 is not None:
+        return CODEC_LZ4
+    return CODEC_ZLIB
+
+
+def compress(codec, data):
+    if codec == CODEC_ZSTD:
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    if codec == CODEC_LZ4:
+        return lz4.frame.compress(data)
+    if codec == CODEC_ZLIB:
+        return zlib.compress(data, 6)
+    return data
+
+
+def decompress(codec, data):
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise RuntimeError("This archive block is zstd-compressed; install zstandard to read it")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == CODEC_LZ4:
+        if lz4 is None:
+            raise RuntimeError("This archive block is lz4-compressed; install lz4 to read it")
+        return lz4.frame.decompress(data)
+    if codec == CODEC_ZLIB:
+        return zlib.decompress(data)
+    return data
+
+
+class GameArchive:
+    """
+    Append-only file of encoded GameRecords for millions of games. Records
+    are packed into blocks of about block_size bytes, each compressed on its
+    own (zstd, then lz4, then zlib, whichever is installed, or codec='none'),
+    and an index of (block, offset, size) per record is written after the
+    last block on close, followed by a fixed footer. Opening reads only the
+    footer and the index, and loading record i decompresses just its block.
+    Mode 'a' reopens an archive to add records; 'w' starts a new one.
+
+    Appending never writes over what is already there: new blocks go after
+    the old footer, and close writes the full index and a new footer after
+    them and fsyncs. Should a run die before that, the file's tail is not a
+    footer, and opening falls back to the last complete footer in the file,
+    so the archive reads as it was before the run. Each append session
+    leaves its predecessor's index behind as dead space.
+    """
+
+    def __init__(self, path, mode='r', codec=None, block_size=DEFAULT_BLOCK_SIZE):
+        if mode not in ('r', 'a', 'w'):
+            raise ValueError(f"Unknown archive mode {mode!r}")
+        self.path = path
+        self.mode = mode
+        self.codec = CODECS[codec] if isinstance(codec, str) else (codec if codec is not None else default_codec())
+        self.block_size = block_size
+        self.index = bytearray()
+        self.pending = bytearray()  # Encoded records of the block being filled
+        self.pending_entries = []
+        self.cached_block = (None, None)  # (offset, decompressed data) of the last block read
+        if mode == 'w' or (mode == 'a' and not os.path.exists(path)):
+            self.file = open(path, 'w+b')
+            self.file.write(ARCHIVE_MAGIC)
+            self.end = len(ARCHIVE_MAGIC)
+        else:
+            self.file = open(path, 'r+b' if mode == 'a' else 'rb')
+            self.load_index()
+
+    def load_index(self):
+        size = self.file.seek(0, os.SEEK_END)
+        footer = self.footer_at(size - FOOTER.size) or self.find_footer()
+        if footer is None:
+            raise ValueError(f"{self.path} is not a game archive (or was never closed)")
+        index_offset, count = footer
+        self.file.seek(index_offset)
+        self.index = bytearray(self.file.read(count * INDEX_ENTRY.size))
+        self.end = size  # New blocks go after everything, so the index just read stays valid until close
+
+    def footer_at(self, position):
+        """(index offset, record count) of a footer at position, or None if there is no complete one."""
+        if position < len(ARCHIVE_MAGIC):
+            return None
+        self.file.seek(position)
+        data = self.file.read(FOOTER.size)
+        if len(data) < FOOTER.size:
+            return None
+        index_offset, count, magic = FOOTER.unpack(data)
+        if magic != ARCHIVE_MAGIC or index_offset + count * INDEX_ENTRY.size != position:
+            return None
+        return index_offset, count
+
+    def find_footer(self):
+        """Last complete footer in the file, for an archive whose last append run never closed it."""
+        if self.file.seek(0, os.SEEK_END) < len(ARCHIVE_MAGIC) + FOOTER.size:
+            return None
+        with mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            magic_at = data.rfind(ARCHIVE_MAGIC)
+            while magic_at > 0:
+                footer = self.footer_at(magic_at + len(ARCHIVE_MAGIC) - FOOTER.size)
+                if footer is not None:
+                    return footer
+                magic_at = data.rfind(ARCHIVE_MAGIC, 0, magic_at)
+        return None
+
+    def __len__(self):
+        return len(self.index) // INDEX_ENTRY.size + len(self.pending_entries)
+
+    # -- writing --
+
+    def append(self, record):
+        if self.mode == 'r':
+            raise ValueError("Archive is open read-only")
+        data = record.encode() if isinstance(record, GameRecord) else record
+        self.pending_entries.append((len(self.pending), len(data)))
+        self.pending.extend(data)
+        if len(self.pending) >= self.block_size:
+            self.flush_block()
+
+    def flush_block(self):
+        if not self.pending_entries:
+            return
+        stored = compress(self.codec, bytes(self.pending))
+        codec = self.codec if len(stored) < len(self.pending) else CODEC_NONE
+        if codec == CODEC_NONE:
+            stored = bytes(self.pending)
+        self.file.seek(self.end)
+        self.file.write(BLOCK_HEADER.pack(codec, len(self.pending), len(stored)))
+        self.file.write(stored)
+        for offset, size in self.pending_entries:
+            self.index.extend(INDEX_ENTRY.pack(self.end, offset, size))
+        self.end += BLOCK_HEADER.size + len(stored)
+        self.pending = bytearray()
+        self.pending_entries = []
+
+    def close(self):
+        if self.file is None:
+            return
+        if self.mode != 'r':
+            self.flush_block()
+            self.file.seek(self.end)
+            self.file.write(self.index)
+            self.file.write(FOOTER.pack(self.end, len(self.index) // INDEX_ENTRY.size, ARCHIVE_MAGIC))
+            self.file.flush()
+            os.fsync(self.file.fileno())
+        self.file.close()
+        self.file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # -- reading --
+
+    def read_block(self, block_offset):
+        if self.cached_block[0] != block_offset:
+            self.file.seek(block_offset)
+            codec, raw_size, stored_size = BLOCK_HEADER.unpack(self.file.read(BLOCK_HEADER.size))
+            self.cached_block = (block_offset, decompress(codec, self.file.read(stored_size)))
+        return self.cached_block[1]
+
+    def raw(self, position):
+        """Encoded bytes of record position."""
+        stored = len(self.index) // INDEX_ENTRY.size
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError("game record index out of range")
+        if position >= stored:
+            offset, size = self.pending_entries[position - stored]
+            return bytes(self.pending[offset:offset + size])
+        block_offset, offset, size = INDEX_ENTRY.unpack_from(self.index, position * INDEX_ENTRY.size)
+        return self.read_block(block_offset)[offset:offset + size]
+
+    def __getitem__(self, position):
+        return GameRecord.decode(self.raw(position))
+
+    def __iter__(self):
+        for position in range(len(self)):
+            yield self[position]
@@ -0,0 +1,367 @@
+import itertools
+import math
+import os
+import random
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from CompactGameState import CARD_CODES, ACTION_CODES
+from DecisionBackends import DecisionBackend, HeuristicBackend, register_backend
+from AIAgent import AIAgent
+from FastGame import (FastGame, FULL_DECK, CARD_VALUE, CLAIMED_CARD, BLOCKING_CARDS, PHASE_ACTION, PHASE_CHALLENGE,
+                      PHASE_BLOCK, PHASE_BLOCK_CHALLENGE, PHASE_OVER, REACT, NO_SEAT, STEAL, move_action, move_target)
+
+
+UNKNOWN = -1  # Hidden card in an information set
+CLAIM_WEIGHT = 2.0  # How much more likely a claimed character is to be in a player's hand
+REVEALED_WEIGHT = 6.0  # ... and one shown in a won challenge
+BELIEF_FLOOR = 0.01  # Least weight a tracked belief gives any card
+DISCOUNT = 0.99  # Per move, so a win now beats the same win later
+REUSE_DEPTH = 16  # How far below the last root a reusable information set is looked for
+
+
+class InformationSet:
+    """
+    What one seat knows at a decision: its own hand, every public count, and
+    how strongly the actions log suggests each opponent holds each character.
+    Opponents' cards and the deck are UNKNOWN in game; determinize deals them.
+    """
+
+    def __init__(self, game, observer, claims):
+        self.game = game
+        self.observer = observer
+        self.claims = claims  # claims[seat][card] -> weight from the log
+
+    def determinize(self, rng):
+        """A full game consistent with the observer's view: unseen cards dealt, weighted by claims."""
+        game = self.game.copy()
+        unseen = list(FULL_DECK)
+        for card in game.hands[self.observer]:
+            unseen.remove(card)
+        rng.shuffle(unseen)
+        for seat, hand in enumerate(game.hands):
+            if seat == self.observer:
+                continue
+            weights = self.claims[seat]
+            for slot in range(len(hand)):
+                index = weighted_index(unseen, weights, rng)
+                hand[slot] = unseen.pop(index)
+        game.deck = unseen[:len(game.deck)]
+        if game.target == NO_SEAT and game.phase == PHASE_BLOCK and game.action == STEAL:
+            # The engine does not say whom a steal is aimed at when it asks for blocks
+            game.target = rng.choice([seat for seat in game.alive_seats() if seat != game.turn])
+        return game
+
+
+def weighted_index(cards, weights, rng):
+    total = sum(weights[card] for card in cards)
+    pick = rng.random() * total
+    for index, card in enumerate(cards):
+        pick -= weights[card]
+        if pick < 0:
+            return index
+    return len(cards) - 1
+
+
+class Node:
+    """
+    One information set of the shared tree. stats holds, per move, the
+    visits, the summed reward of the seat that made it, and how often the
+    move was available; children are keyed by (move, public outcome) so a
+    node always stands for one public history.
+    """
+
+    __slots__ = ('key', 'stats', 'children')
+
+    def __init__(self, key):
+        self.key = key
+        self.stats = {}
+        self.children = {}
+
+    def visits(self):
+        return sum(stat[0] for stat in self.stats.values())
+
+
+def select_move(node, moves, exploration, rng):
+    stats = node.stats
+    untried = []
+    for move in moves:
+        stat = stats.get(move)
+        if stat is None:
+            stat = stats[move] = [0, 0.0, 0]
+        stat[2] += 1
+        if stat[0] == 0:
+            untried.append(move)
+    if untried:
+        return rng.choice(untried), True
+    best, best_score = None, -1.0
+    for move in moves:
+        visits, reward, available = stats[move]
+        score = reward / visits + exploration * math.sqrt(math.log(available) / visits)
+        if score > best_score:
+            best, best_score = move, score
+    return best, False
+
+
+def find_reusable(root, key):
+    """Breadth-first search of a kept tree for the node of the current information set."""
+    frontier = deque([(root, 0)])
+    while frontier:
+        node, depth = frontier.popleft()
+        if node.key == key and node.stats:
+            return node
+        if depth < REUSE_DEPTH:
+            frontier.extend((child, depth + 1) for child in node.children.values())
+    return None
+
+
+def run_search(info, iterations, time_budget, exploration, rng, root, rollout_plies=200):
+    """Single-observer ISMCTS from root; returns the root's move stats."""
+    deadline = time.perf_counter() + time_budget if time_budget else None
+    done = 0
+    while (iterations is None or done < iterations) and (deadline is None or time.perf_counter() < deadline):
+        game = info.determinize(rng)
+        start = game.plies
+        node = root
+        path = []
+        while game.phase != PHASE_OVER:
+            move, expanded = select_move(node, game.legal_moves(), exploration, rng)
+            mover = game.decider
+            outcome = game.apply(move, rng)
+            path.append((node, move, mover))
+            child = node.children.get((move, outcome))
+            if child is None:
+                child = node.children[(move, outcome)] = Node(game.public_key())
+            node = child
+            if expanded:
+                break
+        rewards = game.rollout(rng, rollout_plies)
+        discount = DISCOUNT ** (game.plies - start)
+        for node, move, mover in path:
+            stat = node.stats[move]
+            stat[0] += 1
+            stat[1] += rewards[mover] * discount
+        done += 1
+    return done
+
+
+def search_root(info, iterations, time_budget, exploration, seed, tree=None):
+    """
+    Runs one search, continuing from the subtree of tree (a root kept from
+    an earlier decision) that matches the information set if there is one.
+    Returns ({move: (visits, reward)}, iterations, reused, root).
+    """
+    rng = random.Random(seed)
+    key = info.game.public_key()
+    root = find_reusable(tree, key) if tree is not None else None
+    reused = root is not None
+    if root is None:
+        root = Node(key)
+    done = run_search(info, iterations, time_budget, exploration, rng, root)
+    moves = info.game.legal_moves()
+    return {move: tuple(root.stats[move][:2]) for move in moves if move in root.stats}, done, reused, root
+
+
+# Trees root-parallel workers keep between decisions, by backend and seat, least recently used first
+_worker_trees = OrderedDict()
+MAX_WORKER_TREES = 32
+
+
+def search_in_worker(info, tree_id, iterations, time_budget, exploration, seed, reuse_tree):
+    """Entry point of root-parallel workers, each of which keeps and reuses its own trees."""
+    tree = _worker_trees.pop(tree_id, None) if reuse_tree else None
+    stats, done, reused, root = search_root(info, iterations, time_budget, exploration, seed, tree)
+    if reuse_tree:
+        _worker_trees[tree_id] = root
+        while len(_worker_trees) > MAX_WORKER_TREES:
+            _worker_trees.popitem(last=False)
+    return stats, done, reused
+
+
+_backend_ids = itertools.count(1)
+
+
+class ISMCTSBackend(DecisionBackend):
+    """
+    Information-set Monte Carlo tree search over FastGame. Each decision
+    rebuilds the seat's information set from the live game (own cards,
+    public coins and card counts, claims from the actions log), then runs
+    iterations searches, or as many as fit in time_budget seconds, each on
+    a fresh determinization of the hidden cards. The tree is kept and the
+    subtree for the next decision's information set is reused; the backend
+    keeps one tree per seat it plays. With workers > 1 the root is searched
+    in that many processes and their visit counts are summed; each worker
+    keeps its own trees, under this backend's id.
+    """
+
+    name = 'ismcts'
+    _search_pool = None
+    _search_pool_workers = 0
+
+    def __init__(self, iterations=1000, time_budget=None, workers=1, exploration=0.7, reuse_tree=True, seed=None):
+        self.iterations = iterations
+        self.time_budget = time_budget
+        self.workers = workers or os.cpu_count()
+        self.exploration = exploration
+        self.reuse_tree = reuse_tree
+        self.trees = {}  # Player name -> root kept from the last search
+        self.tree_id = next(_backend_ids)
+        # Unseeded backends draw their seed from the global generator, so seeded games replay exactly
+        self.rng = random.Random(seed if seed is not None else random.getrandbits(32))
+        self.pending_action = None
+        self.pending_target = None
+        self.searches = 0
+        self.reused = 0
+        self.iterations_run = 0
+        self.fallback = HeuristicBackend()
+
+    @classmethod
+    def search_pool(cls, workers):
+        if cls._search_pool is None or cls._search_pool_workers < workers:
+            if cls._search_pool is not None:
+                cls._search_pool.shutdown(wait=False)
+            cls._search_pool = ProcessPoolExecutor(max_workers=workers)
+            cls._search_pool_workers = workers
+        return cls._search_pool
+
+    # -- information sets --
+
+    def information_set(self, player, phase, actor=None, action=None, target=None, responder=None, blocker=None):
+        game = player.game
+        seats = {seat_player: seat for seat, seat_player in enumerate(game.players)}
+        observer = seats[player]
+        hands = [[CARD_CODES[card] for card in seat_player.cards] if seat_player is player else [UNKNOWN] * len(seat_player.cards)
+                 for seat_player in game.players]
+        coins = [seat_player.coins for seat_player in game.players]
+        model = FastGame(hands, coins, [UNKNOWN] * len(game.deck), seats[actor] if actor is not None else observer)
+        if model.phase != PHASE_OVER:
+            model.phase = phase
+            model.action = ACTION_CODES[action] if action is not None else NO_SEAT
+            model.target = seats[target] if target is not None else NO_SEAT
+            model.responder = seats[responder] if responder is not None else NO_SEAT
+            model.blocker = seats[blocker] if blocker is not None else NO_SEAT
+            model.decider = observer
+        return InformationSet(model, observer, self.claims(game, seats, getattr(player, 'beliefs', None)))
+
+    def claims(self, game, seats, beliefs=None):
+        """Per seat and card, how much the actions log (or the player's BeliefTracker) suggests the seat holds the card."""
+        if beliefs is not None:
+            # Floored, so a card ruled out by a lost challenge can still be dealt once the hand is redrawn
+            return [[max(beliefs.probability(seat_player.name, card), BELIEF_FLOOR) for card in CARD_CODES]
+                    for seat_player in seats]
+        claims = [[1.0] * len(CARD_VALUE) for _ in seats]
+        players = {seat_player.name: seat for seat_player, seat in seats.items()}
+        for entry in game.game_state.actions_log:
+            action = ACTION_CODES.get(entry.get('action'))
+            if 'blocker' in entry:
+                seat = players.get(entry['blocker'])
+                for card in BLOCKING_CARDS.get(action, ()):
+                    if seat is not None:
+                        claims[seat][card] += CLAIM_WEIGHT
+            elif 'challenged' in entry and entry.get('result') == 'truth':
+                seat = players.get(entry['challenged'])
+                if seat is not None and action in CLAIMED_CARD:
+                    claims[seat][CLAIMED_CARD[action]] += REVEALED_WEIGHT
+            elif 'player' in entry and action in CLAIMED_CARD:
+                seat = players.get(entry['player'])
+                if seat is not None:
+                    claims[seat][CLAIMED_CARD[action]] += CLAIM_WEIGHT
+        return claims
+
+    # -- search --
+
+    def search(self, player, info):
+        """Most visited root move of the (possibly root-parallel) search."""
+        legal = info.game.legal_moves()
+        if len(legal) == 1:
+            return legal[0]
+        if self.workers > 1:
+            iterations = -(-self.iterations // self.workers) if self.iterations else None
+            pool = self.search_pool(self.workers)
+            futures = [pool.submit(search_in_worker, info, (self.tree_id, player.name), iterations, self.time_budget,
+                                   self.exploration, self.rng.getrandbits(32), self.reuse_tree) for _ in range(self.workers)]
+            results = [future.result() for future in futures]
+        else:
+            tree = self.trees.get(player.name) if self.reuse_tree else None
+            stats, done, reused, root = search_root(info, self.iterations, self.time_budget, self.exploration,
+                                                    self.rng.getrandbits(32), tree)
+            if self.reuse_tree:
+                self.trees[player.name] = root
+            results = [(stats, done, reused)]
+
+        totals = {}
+        for stats, done, reused in results:
+            self.iterations_run += done
+            self.reused += reused
+            for move, (visits, reward) in stats.items():
+                total = totals.setdefault(move, [0, 0.0])
+                total[0] += visits
+                total[1] += reward
+        self.searches += 1
+        if not totals:
+            return self.rng.choice(legal)
+        return max(totals, key=lambda move: (totals[move][0], totals[move][1]))
+
+    def stats(self):
+        return {
+            'searches': self.searches,
+            'iterations': self.iterations_run,
+            'reuse_rate': self.reused / (self.searches * self.workers) if self.searches else 0.0
+        }
+
+    # -- decisions --
+
+    def choose_action(self, player, game_state):
+        info = self.information_set(player, PHASE_ACTION, actor=player)
+        move = self.search(player, info)
+        actions = list(ACTION_CODES)
+        self.pending_action = actions[move_action(move)]
+        self.pending_target = move_target(move) if self.pending_action in ('coup', 'assassinate', 'steal') else None
+        return self.pending_action
+
+    def choose_target(self, player, valid_targets):
+        if self.pending_target is not None:
+            chosen = player.game.players[self.pending_target]
+            if chosen in valid_targets:
+                return chosen
+        return self.fallback.choose_target(player, valid_targets)
+
+    def wants_to_challenge(self, player, acting_player, action):
+        if not player.has_cards():
+            return False
+        if action == 'block':
+            # Only the actor is asked about a block, so the blocked action is our own pending one
+            if self.pending_action not in ('foreign_aid', 'steal', 'assassinate'):
+                return False
+            target = player.game.players[self.pending_target] if self.pending_target is not None else None
+            info = self.information_set(player, PHASE_BLOCK_CHALLENGE, actor=player, action=self.pending_action,
+                                        target=target, responder=acting_player, blocker=acting_player)
+        elif action in ('tax', 'exchange'):  # The only claims the engine lets opponents challenge
+            info = self.information_set(player, PHASE_CHALLENGE, actor=acting_player, action=action, responder=player)
+        else:
+            return False
+        return self.search(player, info) == REACT
+
+    def wants_to_block(self, player, acting_player, action):
+        if not player.has_cards() or action not in ('foreign_aid', 'steal'):
+            return False
+        info = self.information_set(player, PHASE_BLOCK, actor=acting_player, action=action, responder=player)
+        return self.search(player, info) == REACT
+
+    def choose_exchange_cards(self, player, num_cards_to_exchange):
+        # The engine hands exchanged cards back in reverse, so giving up the least wanted first keeps
+        # the most wanted card at the front, where it is the last one lost
+        ranked = sorted(player.cards, key=lambda card: CARD_VALUE[CARD_CODES[card]])
+        return ranked[:num_cards_to_exchange]
+
+
+register_backend('ismcts', ISMCTSBackend)
+
+
+class ISMCTSAgent(AIAgent):
+    """AIAgent that decides by ISMCTS instead of the language model; takes the same (name, character, game)."""
+
+    def __init__(self, name, character=None, game=None, iterations=1000, time_budget=None, workers=1, seed=None):
+        if seed is None and game is not None:
+            seed = game.rng.getrandbits(32)  # Seeded games replay their searches too
+        super().__init__(name, character, game, backend=ISMCTSBackend(iterations, time_budget, workers, seed=seed))
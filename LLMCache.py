@@ -0,0 +1,152 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class ResponseCache:
+    """
+    Two-tier cache for completion responses: an in-memory LRU in front of an
+    optional SQLite file. Keys hash the model, request parameters and the prompt
+    with whitespace normalized, so prompts that only differ in indentation or
+    line breaks share an entry. Entries expire after ttl_seconds (if set) and
+    each tier evicts its least recently used entries past its size limit.
+    """
+
+    def __init__(self, path=None, max_memory_entries=1024, max_disk_entries=100000, ttl_seconds=None):
+        self.path = path
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl_seconds = ttl_seconds
+        self.memory = OrderedDict()  # key -> (response, stored_at)
+        self.lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.connection = None
+        if path:
+            self.connection = sqlite3.connect(path, check_same_thread=False)
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, stored_at REAL NOT NULL, last_used REAL NOT NULL)")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+            self.connection.commit()
+
+    @staticmethod
+    def make_key(model, params, prompt):
+        """Stable hash of a completion request."""
+        normalized_prompt = re.sub(r'\s+', ' ', prompt).strip()
+        payload = json.dumps({'model': model, 'params': params, 'prompt': normalized_prompt}, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _expired(self, stored_at, now):
+        return self.ttl_seconds is not None and now - stored_at > self.ttl_seconds
+
+    def get(self, key):
+        """Returns the cached response for key, or None on a miss."""
+        now = time.time()
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry is not None:
+                if not self._expired(entry[1], now):
+                    self.memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return entry[0]
+                del self.memory[key]
+
+            if self.connection is not None:
+                row = self.connection.execute(
+                    "SELECT response, stored_at FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    if not self._expired(row[1], now):
+                        self.connection.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+                        self.connection.commit()
+                        self._remember(key, row[0], row[1])
+                        self.disk_hits += 1
+                        return row[0]
+                    self.connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self.connection.commit()
+
+            self.misses += 1
+            return None
+
+    def put(self, key, response):
+        now = time.time()
+        with self.lock:
+            self._remember(key, response, now)
+            if self.connection is not None:
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO responses (key, response, stored_at, last_used) VALUES (?, ?, ?, ?)",
+                    (key, response, now, now))
+                self._trim_disk()
+                self.connection.commit()
+
+    def _remember(self, key, response, stored_at):
+        self.memory[key] = (response, stored_at)
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_memory_entries:
+            self.memory.popitem(last=False)
+            self.evictions += 1
+
+    def _trim_disk(self):
+        count = self.connection.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        if count > self.max_disk_entries:
+            excess = count - self.max_disk_entries
+            self.connection.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY last_used LIMIT ?)", (excess,))
+            self.evictions += excess
+        if self.ttl_seconds is not None:
+            self.connection.execute("DELETE FROM responses WHERE stored_at < ?", (time.time() - self.ttl_seconds,))
+
+    def get_or_create(self, model, params, prompt, create):
+        """Returns the cached response for the request, calling create() and storing its result on a miss."""
+        key = self.make_key(model, params, prompt)
+        response = self.get(key)
+        if response is None:
+            response = create()
+            self.put(key, response)
+        return response
+
+    def stats(self):
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            'memory_hits': self.memory_hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_rate': (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            'memory_entries': len(self.memory),
+            'evictions': self.evictions
+        }
+
+    def clear(self):
+        with self.lock:
+            self.memory.clear()
+            if self.connection is not None:
+                self.connection.execute("DELETE FROM responses")
+                self.connection.commit()
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+_shared_cache = None
+
+
+def shared_response_cache():
+    """
+    Process-wide cache for agents that opt in with
+    AIAgent(..., response_cache=shared_response_cache()); agents cache
+    nothing by default, since a cached reply repeats one sample forever.
+    Set COUPAI_RESPONSE_CACHE to a file path to add the persistent SQLite tier.
+    """
+    global _shared_cache
+    if _shared_cache is None:
+        _shared_cache = ResponseCache(path=os.getenv('COUPAI_RESPONSE_CACHE'))
+    return _shared_cache
@@ -0,0 +1,159 @@
+import asyncio
+import os
+import threading
+import httpx
+
+
+class LLMClientManager:
+    """
+    Owns the OpenAI clients for the whole process. The sync and async clients
+    are built once, on first use, over keep-alive connection pools, so every
+    AIAgent decision and every CommunicationLayer prompt reuses warm
+    connections instead of paying client setup and a TLS handshake per call.
+    Point base_url at any OpenAI-compatible server to run against a local
+    stand-in.
+    """
+
+    def __init__(self, api_key=None, base_url=None, max_connections=20, max_keepalive_connections=10,
+                 keepalive_expiry=30.0, timeout=60.0, max_retries=2):
+        self.api_key = api_key or os.getenv('OPENAI_API_KEY')
+        self.base_url = base_url or os.getenv('OPENAI_BASE_URL')
+        self.limits = httpx.Limits(max_connections=max_connections,
+                                   max_keepalive_connections=max_keepalive_connections,
+                                   keepalive_expiry=keepalive_expiry)
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.lock = threading.Lock()
+        self._client = None
+        self._async_client = None
+        self._async_loop = None  # Event loop the async client's pool belongs to
+
+    def client(self):
+        """Shared synchronous client."""
+        if self._client is None:
+            with self.lock:
+                if self._client is None:
+                    from openai import OpenAI  # Imported lazily so offline code paths do not need the package
+                    self._client = OpenAI(
+                        api_key=self.api_key,
+                        base_url=self.base_url,
+                        max_retries=self.max_retries,
+                        http_client=httpx.Client(limits=self.limits, timeout=self.timeout)
+                    )
+        return self._client
+
+    def async_client(self):
+        """
+        Shared asynchronous client for the running event loop. Its pool
+        belongs to that loop, so a call from another loop (a second
+        asyncio.run, say) closes the old client and builds a new one.
+        """
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_loop is not loop:
+            with self.lock:
+                stale, stale_loop = self._async_client, self._async_loop
+                if stale is None or stale_loop is not loop:
+                    from openai import AsyncOpenAI
+                    self._async_client = AsyncOpenAI(
+                        api_key=self.api_key,
+                        base_url=self.base_url,
+                        max_retries=self.max_retries,
+                        http_client=httpx.AsyncClient(limits=self.limits, timeout=self.timeout)
+                    )
+                    self._async_loop = loop
+                else:
+                    stale = None
+            if stale is not None:
+                self.close_async_client(stale, stale_loop)
+        return self._async_client
+
+    def create_completion(self, prompt, model, **params):
+        """Sends a completion request and returns the full response object."""
+        return self.client().completions.create(model=model, prompt=prompt, **params)
+
+    def complete(self, prompt, model, **params):
+        """Sends a completion request and returns the generated text."""
+        return self.create_completion(prompt, model, **params).choices[0].text
+
+    def stream_text(self, prompt, model, **params):
+        """
+        Yields the completion text as it streams in. Closing the generator (e.g.
+        breaking out of the loop) closes the response, which cancels the rest
+        of the generation.
+        """
+        stream = self.client().completions.create(model=model, prompt=prompt, stream=True, **params)
+        try:
+            for chunk in stream:
+                if chunk.choices:
+                    yield chunk.choices[0].text
+        finally:
+            stream.response.close()
+
+    async def acomplete(self, prompt, model, **params):
+        response = await self.async_client().completions.create(model=model, prompt=prompt, **params)
+        return response.choices[0].text
+
+    async def aclose(self):
+        """
+        Closes both clients from inside the event loop that used the async
+        one. Code driving the agents with asyncio.run should await it before
+        the loop ends: once the loop is closed its connections cannot be.
+        """
+        with self.lock:
+            async_client, self._async_client, self._async_loop = self._async_client, None, None
+        self.close()
+        if async_client is not None:
+            await async_client.close()
+
+    def close(self):
+        """Closes the sync client now and the async one on its own loop (see close_async_client)."""
+        with self.lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+            async_client, loop = self._async_client, self._async_loop
+            self._async_client = self._async_loop = None
+        if async_client is not None:
+            self.close_async_client(async_client, loop)
+
+    def close_async_client(self, async_client, loop):
+        """
+        Closes an async client's pool on the loop it belongs to: scheduled
+        there when called from inside it, waited for when the loop runs in
+        another thread, run to completion when the loop is idle. A closed
+        loop has already lost the means to close its transports, so the
+        client is only dropped then (use aclose to avoid that).
+        """
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if loop is running:
+            loop.create_task(async_client.close())
+        elif loop.is_running():
+            asyncio.run_coroutine_threadsafe(async_client.close(), loop).result(self.timeout)
+        elif not loop.is_closed():
+            loop.run_until_complete(async_client.close())
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_llm_client_manager():
+    """Returns the process-wide client manager, creating it from the environment on first use."""
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = LLMClientManager()
+    return _manager
+
+
+def set_llm_client_manager(manager):
+    """Swaps the process-wide manager, e.g. for one pointed at a local OpenAI-compatible server."""
+    global _manager
+    with _manager_lock:
+        previous, _manager = _manager, manager
+    if previous is not None and previous is not manager:
+        previous.close()
+    return manager
@@ -0,0 +1,194 @@
+import os
+import threading
+from array import array
+from bisect import bisect_right
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Upper bounds in seconds: 1 us doubling up to about 34 s, then +Inf
+LATENCY_BUCKETS = tuple(1e-6 * 2 ** power for power in range(26))
+FOLD_SAMPLES = 4096  # Raw observations a series buffers before binning them
+
+# name -> (type, help, label names). Histograms are latencies in seconds.
+METRICS = {
+    'coup_turn_seconds': ('histogram', "Time spent in a TurnManager.play_turn that played an action, "
+                                       "reactions and table talk included, by action and outcome.", ('action', 'reason')),
+    'coup_challenges_total': ('counter', "Challenges made, by the action challenged.", ('action',)),
+    'coup_blocks_total': ('counter', "Blocks attempted, by the action blocked.", ('action',)),
+    'coup_communication_seconds': ('histogram', "Time spent in a table talk phase.", ()),
+    'coup_prompt_seconds': ('histogram', "Time spent compiling a prompt.", ('decision',)),
+    'coup_llm_request_seconds': ('histogram', "Time spent in AIAgent.query_gpt.", ('cached',)),
+    'coup_llm_prompt_tokens_total': ('counter', "Prompt tokens sent to AIAgent.query_gpt.", ()),
+    'coup_llm_completion_tokens_total': ('counter', "Completion tokens returned by AIAgent.query_gpt.", ()),
+}
+
+
+class Metrics:
+    """
+    Counters and latency histograms for the game loop. Instrumented code
+    holds a Metrics (Game.metrics, None when disabled) and reports with
+    inc and observe. Both only append to their series' array, which is
+    thread-safe without a lock; every FOLD_SAMPLES reports, and before any
+    export, an observe buffer is sorted and binned in one pass into the
+    series' bucket counts, sum and count, and an inc buffer is summed into
+    the counter, so the per-report cost stays a dictionary lookup and an
+    append. Series are created on first report. Export with prometheus,
+    write (for a textfile collector) or serve (an HTTP endpoint for a
+    scraper).
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.series = {}  # (name, label values) -> float for counters, [bucket counts..., sum, count] for histograms
+        self.samples = {}  # (name, label values) -> array of latencies not binned yet
+        self.increments = {}  # (name, label values) -> array of counter increments not added up yet
+        self.lock = threading.Lock()
+        self.server = None
+
+    def inc(self, name, amount=1, labels=()):
+        key = (name, labels)
+        increments = self.increments.get(key)
+        if increments is None:
+            increments = self.increments.setdefault(key, array('d'))
+        increments.append(amount)
+        if len(increments) >= FOLD_SAMPLES:
+            self.add_up(key)
+
+    def observe(self, name, seconds, labels=()):
+        key = (name, labels)
+        samples = self.samples.get(key)
+        if samples is None:
+            samples = self.samples.setdefault(key, array('d'))
+        samples.append(seconds)
+        if len(samples) >= FOLD_SAMPLES:
+            self.fold(key)
+
+    def fold(self, key=None):
+        """Bins the buffered observations of one series, or of all, into bucket counts."""
+        buckets = self.buckets
+        with self.lock:
+            for key in [key] if key is not None else list(self.samples):
+                samples = self.samples[key]
+                count = len(samples)
+                if not count:
+                    continue
+                values = sorted(samples[:count])
+                del samples[:count]  # Observations appended meanwhile stay for the next fold
+                series = self.series.get(key)
+                if series is None:
+                    series = self.series[key] = [0] * (len(buckets) + 3)
+                below = 0
+                for slot, bound in enumerate(buckets):
+                    at_most = bisect_right(values, bound)
+                    series[slot] += at_most - below
+                    below = at_most
+                series[len(buckets)] += count - below
+                series[-2] += sum(values)
+                series[-1] += count
+
+    def add_up(self, key=None):
+        """Adds the buffered increments of one counter, or of all, to their totals."""
+        with self.lock:
+            for key in [key] if key is not None else list(self.increments):
+                increments = self.increments[key]
+                count = len(increments)
+                if not count:
+                    continue
+                total = sum(increments[:count])
+                del increments[:count]
+                self.series[key] = self.series.get(key, 0) + total
+
+    def snapshot(self):
+        """{name: {label values: value}}; a histogram's value is {'buckets': [...], 'sum': s, 'count': n}."""
+        self.fold()
+        self.add_up()
+        with self.lock:
+            items = [(key, list(value) if isinstance(value, list) else value) for key, value in self.series.items()]
+        snapshot = {}
+        for (name, labels), value in items:
+            if isinstance(value, list):
+                value = {'buckets': value[:-2], 'sum': value[-2], 'count': value[-1]}
+            snapshot.setdefault(name, {})[labels] = value
+        return snapshot
+
+    def reset(self):
+        with self.lock:
+            self.samples.clear()
+            self.increments.clear()
+            self.series.clear()
+
+    def prometheus(self):
+        """The snapshot in Prometheus text exposition format."""
+        lines = []
+        for name, series in sorted(self.snapshot().items()):
+            kind, help_text, label_names = METRICS.get(name, ('counter', '', ()))
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in sorted(series.items()):
+                pairs = [f'{label}="{escape(str(label_value))}"' for label, label_value in zip(label_names, labels)]
+                if kind != 'histogram':
+                    lines.append(f"{name}{format_labels(pairs)} {value:g}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float('inf'),), value['buckets']):
+                    cumulative += count
+                    bound = '+Inf' if bound == float('inf') else f'{bound:g}'
+                    bucket_labels = format_labels(pairs + [f'le="{bound}"'])
+                    lines.append(f"{name}_bucket{bucket_labels} {cumulative}")
+                lines.append(f"{name}_sum{format_labels(pairs)} {value['sum']:g}")
+                lines.append(f"{name}_count{format_labels(pairs)} {value['count']}")
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path):
+        """Writes the Prometheus text to path atomically, so a collector never reads half a file."""
+        temporary = f"{path}.tmp"
+        with open(temporary, 'w', encoding='utf-8') as metrics_file:
+            metrics_file.write(self.prometheus())
+        os.replace(temporary, path)
+
+    def serve(self, port=9464, host='127.0.0.1'):
+        """Serves the Prometheus text at http://host:port/metrics from a daemon thread; returns the server."""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Scrapes would otherwise print a line each
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self.server.serve_forever, name='MetricsServer', daemon=True).start()
+        return self.server
+
+    def close(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+
+def escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(pairs):
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+_shared_metrics = None
+
+
+def shared_metrics():
+    """Process-wide Metrics for runners that instrument every game they play."""
+    global _shared_metrics
+    if _shared_metrics is None:
+        _shared_metrics = Metrics()
+    return _shared_metrics
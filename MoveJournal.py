@@ -0,0 +1,98 @@
+# Undo records: (operation, object, value)
+COINS, HAND_POP, HAND_REMOVE, HAND_APPEND, DECK_POP, DECK_APPEND, DECK_SHUFFLE, TURN, PLAYER_VIEW = range(9)
+
+
+class MoveJournal:
+    """
+    Undo stack for Game.apply. Every primitive effect of a move (a coin
+    change, a card lost, removed or drawn, a card returned to the deck, a
+    deck shuffle, the turn passing, a player's entry in the game state)
+    pushes one record holding what it overwrote, and undo pops the records
+    of the last move in reverse. A record is a short tuple, and a shuffle
+    keeps the deck's previous order, which is at most fifteen cards, so
+    each step costs O(1) whatever the depth of the line being searched.
+    """
+
+    def __init__(self):
+        self.records = []
+        self.moves = []  # Start of each applied move in records
+        self.zobrist = None  # ZobristHash to keep current while undoing
+
+    def __len__(self):
+        return len(self.moves)
+
+    def begin_move(self):
+        self.moves.append(len(self.records))
+
+    # -- recording, called just before the effect --
+
+    def coins(self, player):
+        self.records.append((COINS, player, player.coins))
+
+    def hand_pop(self, player):
+        self.records.append((HAND_POP, player, player.cards[-1]))
+
+    def hand_remove(self, player, card):
+        self.records.append((HAND_REMOVE, player, (player.cards.index(card), card)))
+
+    def hand_append(self, player):
+        self.records.append((HAND_APPEND, player, None))
+
+    def deck_pop(self, deck):
+        self.records.append((DECK_POP, deck, deck[-1]))
+
+    def deck_append(self, deck):
+        self.records.append((DECK_APPEND, deck, None))
+
+    def deck_shuffle(self, deck):
+        self.records.append((DECK_SHUFFLE, deck, tuple(deck)))
+
+    def player_view(self, game_state, player_name):
+        self.records.append((PLAYER_VIEW, game_state, (player_name, game_state.save_player(player_name))))
+
+    def turn(self, turn_manager):
+        self.records.append((TURN, turn_manager, (turn_manager.current_turn, turn_manager.turns_played)))
+
+    # -- undoing --
+
+    def undo(self):
+        """Reverts every effect of the last applied move."""
+        if not self.moves:
+            raise ValueError("No move to undo")
+        start = self.moves.pop()
+        records = self.records
+        zobrist = self.zobrist
+        while len(records) > start:
+            operation, target, value = records.pop()
+            if operation == COINS:
+                if zobrist is not None:
+                    zobrist.coins(target, target.coins, value)
+                target.coins = value
+            elif operation == HAND_POP:
+                target.cards.append(value)
+                if zobrist is not None:
+                    zobrist.card_in(target, value)
+            elif operation == HAND_REMOVE:
+                target.cards.insert(*value)
+                if zobrist is not None:
+                    zobrist.card_in(target, value[1])
+            elif operation == HAND_APPEND:
+                card = target.cards.pop()
+                if zobrist is not None:
+                    zobrist.card_out(target, card)
+            elif operation == DECK_POP:
+                target.append(value)
+                if zobrist is not None:
+                    zobrist.deck_in(value)
+            elif operation == DECK_APPEND:
+                card = target.pop()
+                if zobrist is not None:
+                    zobrist.deck_out(card)
+            elif operation == DECK_SHUFFLE:
+                target[:] = value
+            elif operation == TURN:
+                if zobrist is not None:
+                    zobrist.turn(target.current_turn, value[0])
+                target.current_turn, target.turns_played = value
+            else:
+                target.restore_player(*value)
@@ -0,0 +1,204 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+CPROFILE, SAMPLING, TRACEMALLOC = 'cprofile', 'sampling', 'tracemalloc'
+MODES = (CPROFILE, SAMPLING, TRACEMALLOC)
+ENGINE = 'engine'  # Everything inside a profiled run that is not in a named phase
+PHASES = ('action', 'reaction', 'communication')
+MAX_STACK_DEPTH = 64
+
+
+class Profiler:
+    """
+    Profiles games phase by phase. Game code marks its phases with enter
+    and exit (action selection; the reaction windows, opponents' challenge
+    and block decisions included; table talk; see PHASES) when
+    Game.profiler is set, and the profiler keeps a stack of
+    them, so each phase's numbers exclude the phases nested inside it and
+    whatever runs outside every phase lands in 'engine'. Between start and
+    stop any of these run:
+
+    - cprofile: one cProfile.Profile per phase, switched on phase changes,
+      written as profile-<phase>.prof (for pstats or snakeviz) and a
+      profile-<phase>.txt of the top functions by cumulative time
+    - sampling: a thread that samples the game thread's stack every
+      interval seconds, written as samples-<phase>.folded, one
+      "outer;...;inner count" line per stack for flame graph tools
+    - tracemalloc: net bytes allocated per phase, and allocations.txt with
+      the top allocation sites at stop and their growth since start
+
+    summary.json in run_dir gathers wall time, entries, samples and bytes
+    per phase. Only the thread that called start is profiled; reactions
+    polled on the reaction pool run outside it.
+    """
+
+    def __init__(self, run_dir, modes=(CPROFILE,), interval=0.005, top=30):
+        unknown = set(modes) - set(MODES)
+        if unknown:
+            raise ValueError(f"Unknown profiling modes: {', '.join(sorted(unknown))}")
+        self.run_dir = run_dir
+        self.modes = tuple(modes)
+        self.interval = interval
+        self.top = top
+        self.stack = []
+        self.profiles = {}
+        self.profile = None  # Profile of the current phase, while it is enabled
+        self.samples = {}
+        self.wall = Counter()
+        self.entries = Counter()
+        self.allocated = Counter()
+        self.phase_started = 0.0
+        self.memory_mark = 0
+        self.thread_id = None
+        self.sampler = None
+        self.running = False
+        self.start_snapshot = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self):
+        os.makedirs(self.run_dir, exist_ok=True)
+        self.thread_id = threading.get_ident()
+        self.running = True
+        if TRACEMALLOC in self.modes:
+            tracemalloc.start(16)
+            self.start_snapshot = self.snapshot()
+        if SAMPLING in self.modes:
+            self.sampler = threading.Thread(target=self.sample, name='ProfilerSampler', daemon=True)
+            self.sampler.start()
+        self.stack = [ENGINE]
+        self.switch(None, ENGINE)
+
+    def stop(self):
+        """Ends the run and writes every report to run_dir; returns the summary."""
+        if not self.running:
+            return None
+        while len(self.stack) > 1:
+            self.exit()
+        self.switch(ENGINE, None)
+        self.stack = []
+        self.running = False
+        if self.sampler is not None:
+            self.sampler.join()
+            self.sampler = None
+        end_snapshot = None
+        if TRACEMALLOC in self.modes:
+            end_snapshot = self.snapshot()
+            tracemalloc.stop()
+        return self.write(end_snapshot)
+
+    # -- phases --
+
+    def enter(self, phase):
+        if not self.running:
+            return
+        self.switch(self.stack[-1], phase)
+        self.stack.append(phase)
+
+    def exit(self):
+        if not self.running or len(self.stack) < 2:
+            return
+        self.switch(self.stack.pop(), self.stack[-1])
+
+    def switch(self, leaving, entering):
+        # Disabled first and enabled last, so the profiles see as little of the profiler as possible
+        if self.profile is not None:
+            self.profile.disable()
+            self.profile = None
+        now = time.perf_counter()
+        if leaving is not None:
+            self.wall[leaving] += now - self.phase_started
+        if TRACEMALLOC in self.modes:
+            memory = tracemalloc.get_traced_memory()[0]
+            if leaving is not None:
+                self.allocated[leaving] += memory - self.memory_mark
+            self.memory_mark = memory
+        if entering is not None:
+            self.entries[entering] += 1
+        self.phase_started = time.perf_counter()
+        if entering is not None and CPROFILE in self.modes:
+            profile = self.profiles.get(entering)
+            if profile is None:
+                profile = self.profiles[entering] = cProfile.Profile()
+            self.profile = profile
+            profile.enable()
+
+    @staticmethod
+    def snapshot():
+        """tracemalloc snapshot without the profiler's own allocations."""
+        return tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, __file__),
+                                                          tracemalloc.Filter(False, tracemalloc.__file__)])
+
+    # -- sampling --
+
+    def sample(self):
+        while self.running:
+            time.sleep(self.interval)
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None or not self.stack:
+                continue
+            phase = self.stack[-1]
+            names = []
+            while frame is not None and len(names) < MAX_STACK_DEPTH:
+                code = frame.f_code
+                names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            self.samples.setdefault(phase, Counter())[';'.join(reversed(names))] += 1
+
+    # -- reports --
+
+    def write(self, end_snapshot=None):
+        for phase, profile in self.profiles.items():
+            text = io.StringIO()
+            stats = pstats.Stats(profile, stream=text)
+            for function in [function for function in stats.stats if function[0] == __file__]:
+                del stats.stats[function]  # The calls into enter and exit that switched phases
+            stats.dump_stats(os.path.join(self.run_dir, f'profile-{phase}.prof'))
+            stats.sort_stats('cumulative').print_stats(self.top)
+            with open(os.path.join(self.run_dir, f'profile-{phase}.txt'), 'w') as report:
+                report.write(text.getvalue())
+
+        for phase, stacks in self.samples.items():
+            with open(os.path.join(self.run_dir, f'samples-{phase}.folded'), 'w') as report:
+                for stack, count in stacks.most_common():
+                    report.write(f"{stack} {count}\n")
+
+        if end_snapshot is not None:
+            with open(os.path.join(self.run_dir, 'allocations.txt'), 'w') as report:
+                report.write(f"Top {self.top} allocation sites at the end of the run\n")
+                for statistic in end_snapshot.statistics('lineno')[:self.top]:
+                    report.write(f"{statistic}\n")
+                report.write(f"\nTop {self.top} allocation sites by growth during the run\n")
+                for statistic in end_snapshot.compare_to(self.start_snapshot, 'lineno')[:self.top]:
+                    report.write(f"{statistic}\n")
+
+        summary = {
+            'modes': list(self.modes),
+            'phases': {phase: {'seconds': round(self.wall[phase], 6),
+                               'entries': self.entries[phase],
+                               'samples': sum(self.samples.get(phase, Counter()).values()),
+                               'allocated_bytes': self.allocated[phase] if TRACEMALLOC in self.modes else None}
+                       for phase in sorted(self.entries)}
+        }
+        with open(os.path.join(self.run_dir, 'summary.json'), 'w') as report:
+            json.dump(summary, report, indent=2)
+        return summary
+
+
+def add_profile_arguments(parser):
+    """Adds --profile and --profile-modes to a runner's argument parser."""
+    parser.add_argument('--profile', metavar='RUN_DIR', help="Write per-phase profiles of the run to this directory")
+    parser.add_argument('--profile-modes', nargs='+', default=[CPROFILE], choices=MODES)
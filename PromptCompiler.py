@@ -0,0 +1,131 @@
+import re
+
+try:
+    import tiktoken  # Exact counts when available; the estimate below is close enough for budgeting
+except ImportError:
+    tiktoken = None
+
+
+PREAMBLE = """You are an expert Coup player out to crush your opponents. Weigh your cards, your coins and the actions
+they enable, what your opponents likely hold given their plays, and the risk of challenges and counteractions.
+Bluff when it pays. Only choose an action (income, foreign_aid, coup, tax, assassinate, steal, exchange) on an
+action decision, and only challenge or block when asked for that decision.
+State format: deck=<cards left>; per player name:coins/influence/cards; reads gives each opponent's likeliest
+characters; log lists recent events oldest first."""
+
+ANSWER_FORMATS = {
+    'action_decision': 'Start your answer with "The best action is to [insert action]".',
+    'challenge_decision': 'Answer "challenge" or "no_challenge".',
+    'block_decision': 'Answer "block" or "no_block".',
+    'reaction_decision': 'Answer with one of: challenge, block, no_challenge, no_block.',
+    'bluff_decision': 'Answer "bluff" or "no_bluff".'
+}
+
+# (prompt token budget, max_tokens for the completion) per decision type
+DEFAULT_BUDGETS = {
+    'action_decision': (700, 48),
+    'challenge_decision': (600, 16),
+    'block_decision': (600, 16),
+    'reaction_decision': (600, 16),
+    'bluff_decision': (600, 16),
+    'structured_decision': (800, 160),
+    'table_talk': (600, 64)  # CommunicationLayer prompts: a move and a line, a message or a reply
+}
+FALLBACK_BUDGET = (700, 64)
+
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+
+def count_tokens(text, encoding=None):
+    """Counts tokens with tiktoken when installed, otherwise estimates from words and punctuation."""
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return max(len(TOKEN_PATTERN.findall(text)), len(text) // 4)
+
+
+def encode_event(entry):
+    """One actions_log entry as a short, stable phrase."""
+    if 'turn_change_to' in entry:
+        return f"turn>{entry['turn_change_to']}"
+    if 'challenger' in entry:
+        return f"{entry['challenger']} challenges {entry['challenged']} {entry['action']}:{entry['result']}"
+    if 'blocker' in entry:
+        return f"{entry['blocker']} blocks {entry['blocked']} {entry['action']}:{entry['result']}"
+    return f"{entry.get('player')} {entry.get('action')}:{entry.get('outcome')}"
+
+
+class PromptCompiler:
+    """
+    Builds decision prompts from a compact rendering of the game state instead
+    of the raw dict repr. The static preamble is built and counted once; per
+    decision only the state line, the log and the answer format are added, and
+    the oldest log entries are dropped until the prompt fits the decision
+    type's token budget. compile returns the prompt and the max_tokens to
+    request for it.
+    """
+
+    def __init__(self, budgets=None, model=None):
+        self.budgets = dict(DEFAULT_BUDGETS)
+        self.budgets.update(budgets or {})
+        self.encoding = None
+        if tiktoken is not None and model:
+            try:
+                self.encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                self.encoding = None
+        self.preamble = PREAMBLE
+        self.preamble_tokens = count_tokens(PREAMBLE, self.encoding)
+
+    def budget(self, decision_type):
+        return self.budgets.get(decision_type, FALLBACK_BUDGET)
+
+    def count(self, text):
+        return count_tokens(text, self.encoding)
+
+    def encode_players(self, game_state):
+        players = []
+        for name, state in game_state['players_state'].items():
+            cards = state.get('card_count')
+            if cards is None:
+                cards = len(state['cards']) if isinstance(state.get('cards'), list) else state.get('cards', 0)
+            players.append(f"{name}:{state['coins']}/{state['influence']}/{cards}")
+        return f"deck={game_state['deck_size']}; " + ' '.join(players)
+
+    def encode_info(self, additional_info):
+        if not additional_info:
+            return ''
+        # Players are referred to by name, not by object repr
+        return ' '.join(f"{key}={getattr(value, 'name', value)}" for key, value in additional_info.items())
+
+    def encode_beliefs(self, beliefs, game_state):
+        """Two likeliest characters per living opponent, from a BeliefTracker."""
+        if beliefs is None:
+            return ''
+        observer = beliefs.observer.name if beliefs.observer is not None else None
+        reads = []
+        for name, state in game_state['players_state'].items():
+            if name == observer or not state['influence']:
+                continue
+            likely = ','.join(f"{card}={beliefs.probability(name, card):.2f}" for card in beliefs.most_likely(name, 2))
+            reads.append(f"{name}:{likely}")
+        return f"reads: {' '.join(reads)}\n" if reads else ''
+
+    def compile(self, game_state, decision_type, additional_info=None, answer_format=None, beliefs=None):
+        """Returns (prompt, max_tokens) fitted to the decision type's budget."""
+        prompt_budget, max_tokens = self.budget(decision_type)
+        answer_format = answer_format if answer_format is not None else ANSWER_FORMATS.get(decision_type, '')
+        head = (f"{self.preamble}\nDecision: {decision_type} {self.encode_info(additional_info)}\n"
+                f"{self.encode_beliefs(beliefs, game_state)}")
+        fixed_tokens = self.preamble_tokens + self.count(head[len(self.preamble):]) + self.count(answer_format)
+
+        players = self.encode_players(game_state)
+        events = [encode_event(entry) for entry in game_state.get('actions_log', [])]
+        event_tokens = [self.count(event) + 1 for event in events]
+        total = fixed_tokens + self.count(players) + 2 + sum(event_tokens)
+        start = 0
+        while start < len(events) and total > prompt_budget:
+            total -= event_tokens[start]  # Oldest events go first
+            start += 1
+
+        prompt = f"{head}{players}\nlog: {'; '.join(events[start:])}\n{answer_format}"
+        return prompt, max_tokens
@@ -0,0 +1,151 @@
+import argparse
+import functools
+import random
+import time
+from GameManagement import Game
+from Bots import RandomBot, HeuristicBot
+from AIAgent import AIAgent
+from ISMCTS import ISMCTSAgent
+from GameRecord import GameRecorder, GameArchive
+from GameLogger import LEVEL_NAMES, log_writer
+from Metrics import Metrics
+from Profiling import Profiler, add_profile_arguments
+
+
+def policy_name(policy):
+    """Readable name for a policy class or factory."""
+    if isinstance(policy, functools.partial):  # e.g. AIAgent with a decision backend
+        backend = policy.keywords.get('backend')
+        suffix = f"-{getattr(backend, 'name', backend)}" if backend is not None else ''
+        return policy_name(policy.func) + suffix
+    return getattr(policy, '__name__', type(policy).__name__)
+
+
+def play_headless_game(policies, seed=None, max_turns=500, compact_state=False, archive=None, log_path=None, log_level=None,
+                       metrics=None, profiler=None):
+    """
+    Plays one complete game without prompts, stdout or table talk.
+    Each policy is called as policy(name, character, game) to build the
+    player for its seat, so RandomBot, HeuristicBot and AIAgent all fit.
+    With a GameArchive the game's record is appended to it. With log_path
+    (which may hold {game_id}) the game's log at log_level is written there;
+    the file is finished in the background, and log_writer().flush() waits
+    for it.
+    With a Metrics the game's turns, actions and reactions are timed into it,
+    and with a started Profiler they are profiled phase by phase.
+    """
+    # The deck shuffles and every player's choices draw from the game's own generator,
+    # so a seed replays the game without touching the caller's random state
+    rng = random.Random(seed)
+    game = Game([], headless=True, compact_state=compact_state, log_level=log_level, log_path=log_path,
+                metrics=metrics, profiler=profiler, rng=rng)
+    game.players = [policy(f"{policy_name(policy)}_{seat + 1}", None, game) for seat, policy in enumerate(policies)]
+    for player in game.players:
+        player.rng = rng
+    game.deal_initial_cards()
+    recorder = None
+    if archive is not None:
+        recorder = GameRecorder(seed, [player.name for player in game.players], [policy_name(policy) for policy in policies], game)
+        recorder.attach(game.game_state)  # After the deal: the recorder notes the hands it starts from
+
+    # max_turns bounds play_turn calls so a stalling policy cannot hang a batch
+    steps = 0
+    while not game.is_game_over() and steps < max_turns:
+        game.turn_manager.play_turn()
+        game.game_state.update_deck_size(len(game.deck))
+        steps += 1
+
+    completed = game.is_game_over()
+    winner_seat = None
+    if completed:
+        game.announce_winner()
+        winner_seat = next((seat for seat, player in enumerate(game.players) if player.has_cards()), None)
+    if recorder is not None:
+        archive.append(recorder.record(game.game_state.winner if completed else None, game.turn_manager.turns_played))
+    game.close()
+    game.logger.close(wait=False)  # simulate flushes the log writer once per run
+
+    return {
+        'seed': seed,
+        'players': [player.name for player in game.players],
+        'winner': game.game_state.winner if completed else None,
+        'winner_seat': winner_seat,
+        'turns': game.turn_manager.turns_played,
+        'completed': completed
+    }
+
+
+def simulate(num_games, policies, seed=None, max_turns=500, compact_state=False, archive=None, log_path=None, log_level=None,
+             metrics=None, metrics_sample=1, profiler=None):
+    """
+    Runs num_games headless games with one policy per seat and returns a list
+    of per-game result dicts. Game i is seeded with seed + i, so any single
+    game can be replayed on its own. Games use the dict GameState, which
+    plays a few percent faster; compact_state=True switches to the smaller
+    CompactGameState. Pass a GameArchive to keep every game's record,
+    a log_path with {game_id} to keep every game's log in its own file, and
+    a Metrics to collect timings over the whole run. The game loop times
+    one span per turn and only counts reactions, but scripted bots play a
+    turn in microseconds, so even that is a few percent of the run;
+    metrics_sample=N times only every Nth game.
+    """
+    results = []
+    for game_index in range(num_games):
+        game_seed = None if seed is None else seed + game_index
+        results.append(play_headless_game(policies, game_seed, max_turns, compact_state, archive, log_path, log_level,
+                                          metrics if game_index % metrics_sample == 0 else None, profiler))
+    if log_path:
+        log_writer().flush()  # Every game's file is written and closed
+    return results
+
+
+POLICIES = {
+    'random': RandomBot,
+    'heuristic': HeuristicBot,
+    # AIAgents on offline decision backends, for mixing with LLM agents and API-free load tests
+    'ai-heuristic': functools.partial(AIAgent, backend='heuristic'),
+    'ai-scripted': functools.partial(AIAgent, backend='scripted'),
+    'ismcts': ISMCTSAgent
+}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run headless Coup games between scripted policies.")
+    parser.add_argument('--games', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--policies', nargs='+', default=['random', 'heuristic'], choices=sorted(POLICIES))
+    parser.add_argument('--record', help="Append every game's record to this archive file")
+    parser.add_argument('--log', help="Write each game's log here, e.g. logs/game-{game_id}.jsonl")
+    parser.add_argument('--log-level', default='INFO', choices=list(LEVEL_NAMES.values()))
+    parser.add_argument('--metrics', help="Write timings in Prometheus text format to this file when done")
+    parser.add_argument('--metrics-port', type=int, help="Serve live timings at http://127.0.0.1:PORT/metrics")
+    parser.add_argument('--metrics-sample', type=int, default=1, help="Time only every Nth game")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    log_level = next(level for level, name in LEVEL_NAMES.items() if name == args.log_level)
+
+    archive = GameArchive(args.record, 'a') if args.record else None
+    metrics = Metrics() if args.metrics or args.metrics_port else None
+    if args.metrics_port:
+        metrics.serve(args.metrics_port)
+    profiler = Profiler(args.profile, args.profile_modes) if args.profile else None
+    if profiler is not None:
+        profiler.start()
+    start = time.perf_counter()
+    results = simulate(args.games, [POLICIES[name] for name in args.policies], args.seed, archive=archive,
+                       log_path=args.log, log_level=log_level if args.log else None, metrics=metrics,
+                       metrics_sample=args.metrics_sample, profiler=profiler)
+    elapsed = time.perf_counter() - start
+    if profiler is not None:
+        profiler.stop()
+    if archive is not None:
+        archive.close()
+    if args.metrics:
+        metrics.write(args.metrics)
+
+    wins = {}
+    for result in results:
+        wins[result['winner']] = wins.get(result['winner'], 0) + 1
+    print(f"{args.games} games in {elapsed:.2f}s ({args.games / elapsed:.0f} games/s)")
+    for winner, count in sorted(wins.items(), key=lambda item: -item[1]):
+        print(f"{winner}: {count}")
@@ -0,0 +1,117 @@
+import threading
+
+# Reaction window each action opens for the actor's opponents. Assassinate and
+# coup open none: the only question asked there is the actor's own block challenge.
+REACTION_FOR_ACTION = {
+    'tax': 'challenge',
+    'exchange': 'challenge',
+    'foreign_aid': 'block',
+    'steal': 'block'
+}
+DEFAULT_ACTION_ORDER = ['tax', 'foreign_aid', 'steal', 'exchange']
+
+_speculation = threading.local()  # .cancelled: the flag of the speculative reaction this thread runs
+
+
+class SpeculationCancelled(Exception):
+    """Raised by a speculative reaction that stops early because its turn settled without it."""
+
+
+def speculation_cancelled():
+    """
+    True inside a speculative reaction whose answer will not be used.
+    future.cancel() cannot stop a reaction that is already running, so
+    reactions doing slow work (an LLM round trip) check this before and
+    during it and give up with SpeculationCancelled.
+    """
+    cancelled = getattr(_speculation, 'cancelled', None)
+    return cancelled is not None and cancelled.is_set()
+
+
+class ReactionSpeculator:
+    """
+    Starts opponents' challenge/block decisions for the actor's most likely
+    actions while the actor is still choosing, on the same pool
+    ChallengeHandler.poll_reactions uses. When the reaction window opens, the
+    prefetched answer for the chosen action is used as is; the rest are
+    cancelled when the turn settles: queued ones never start, and running
+    ones see speculation_cancelled() turn true and can stop early.
+
+    candidates sets how aggressive the speculation is: how many actions are
+    prefetched per turn. hits, misses and wasted count answers used, answers
+    that had to be requested after all, and speculative calls thrown away.
+    """
+
+    def __init__(self, game, candidates=2):
+        self.game = game
+        self.candidates = candidates
+        self.pending = {}  # (opponent, reaction, action) -> (future, cancellation flag)
+        self.active = False
+        self.launched = 0
+        self.hits = 0
+        self.misses = 0
+        self.wasted = 0
+
+    def candidate_actions(self, actor):
+        """Reaction-opening actions ranked by how often the actor played them recently."""
+        counts = {action: 0 for action in DEFAULT_ACTION_ORDER}
+        for entry in self.game.game_state.get_public_game_state()['actions_log']:
+            if entry.get('player') == actor.name and entry.get('action') in counts:
+                counts[entry['action']] += 1
+        ranked = sorted(DEFAULT_ACTION_ORDER, key=lambda action: -counts[action])  # sorted is stable, so ties keep the default order
+        return ranked[:self.candidates]
+
+    def prefetch(self, actor):
+        """Launches the opponents' reactions to the actor's top candidate actions."""
+        self.active = True
+        pool = self.game.challenge_handler.reaction_pool()
+        opponents = [player for player in self.game.players if player != actor and player.reacts_concurrently and player.has_cards()]
+        for action in self.candidate_actions(actor):
+            reaction = REACTION_FOR_ACTION[action]
+            for opponent in opponents:
+                method = opponent.wants_to_challenge if reaction == 'challenge' else opponent.wants_to_block
+                cancelled = threading.Event()
+                self.pending[(opponent, reaction, action)] = (pool.submit(self.react, cancelled, method, actor, action), cancelled)
+                self.launched += 1
+
+    @staticmethod
+    def react(cancelled, method, actor, action):
+        """Runs one speculative reaction with its cancellation flag visible to speculation_cancelled."""
+        if cancelled.is_set():
+            raise SpeculationCancelled()
+        _speculation.cancelled = cancelled
+        try:
+            return method(actor, action)
+        finally:
+            _speculation.cancelled = None
+
+    def take(self, opponent, reaction, action):
+        """Returns the prefetched future for this reaction, or None if it was not speculated."""
+        if not self.active:
+            return None
+        speculated = self.pending.pop((opponent, reaction, action), None)
+        if speculated is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return speculated[0]
+
+    def settle(self):
+        """Ends the turn's speculation, discarding every answer that was not used."""
+        for future, cancelled in self.pending.values():
+            cancelled.set()
+            future.cancel()
+            self.wasted += 1
+        self.pending.clear()
+        self.active = False
+
+    def stats(self):
+        used = self.hits + self.misses
+        return {
+            'launched': self.launched,
+            'hits': self.hits,
+            'misses': self.misses,
+            'wasted': self.wasted,
+            'hit_rate': self.hits / used if used else 0.0,
+            'waste_rate': self.wasted / self.launched if self.launched else 0.0
+        }
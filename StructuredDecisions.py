@@ -0,0 +1,75 @@
+import json
+
+
+STRUCTURED_INSTRUCTIONS = """Reply with a single JSON object and nothing else, using exactly these keys:
+{"action": one of [ACTIONS] or null, "target": the name of the player you target or null, "challenge": true or false, "block": true or false, "message": what you say to the table (may be empty)}
+For an action decision fill in action (and target for coup, assassinate and steal). For a challenge or block decision set challenge or block. Always include a message; bluffing is allowed."""
+
+# Deterministic answer when a reply cannot be parsed: the safest move, no reaction, no talk
+SAFE_DECISION = {'action': 'income', 'target': None, 'challenge': False, 'block': False, 'message': ''}
+
+
+class DecisionParseError(ValueError):
+    pass
+
+
+class DecisionParser:
+    """
+    Validates structured decision replies. The JSON object is found by
+    decoding from each '{' in turn until one yields an object (models
+    sometimes wrap it in prose or code fences, or add braces after it), and
+    each key is checked against the schema: action from the allowed set,
+    target from the current targets, booleans for challenge and block, a
+    string message.
+    """
+
+    decoder = json.JSONDecoder()
+
+    def __init__(self, valid_actions):
+        self.valid_actions = frozenset(valid_actions)
+        self.instructions = STRUCTURED_INSTRUCTIONS.replace('ACTIONS', ', '.join(sorted(self.valid_actions)))
+
+    def parse(self, response, valid_targets=()):
+        fields = self.find_object(response)
+
+        action = fields.get('action')
+        if isinstance(action, str):
+            action = action.strip().lower().replace(' ', '_')
+        if action is not None and action not in self.valid_actions:
+            raise DecisionParseError(f"Unknown action: {action!r}")
+
+        target = fields.get('target')
+        if target is not None and target not in valid_targets:
+            raise DecisionParseError(f"Invalid target: {target!r}")
+
+        decision = {'action': action, 'target': target}
+        for key in ('challenge', 'block'):
+            value = fields.get(key, False)
+            if not isinstance(value, bool):
+                raise DecisionParseError(f"{key} must be true or false, got {value!r}")
+            decision[key] = value
+
+        message = fields.get('message', '')
+        if message is None:
+            message = ''
+        if not isinstance(message, str):
+            raise DecisionParseError(f"message must be a string, got {message!r}")
+        decision['message'] = message.strip()
+        return decision
+
+    def find_object(self, response):
+        """The first JSON object in response; raises DecisionParseError if there is none."""
+        start = response.find('{')
+        if start < 0:
+            raise DecisionParseError(f"No JSON object in response: {response!r}")
+        error = None
+        while start >= 0:
+            try:
+                fields, _ = self.decoder.raw_decode(response, start)
+            except ValueError as decode_error:
+                error = error or decode_error
+            else:
+                if isinstance(fields, dict):
+                    return fields
+            start = response.find('{', start + 1)
+        raise DecisionParseError(f"Malformed JSON in response: {error}")
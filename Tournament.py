@@ -0,0 +1,204 @@
+import argparse
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from Simulation import simulate
+from Bots import RandomBot, HeuristicBot
+
+
+# Agent types a tournament can seat, keyed by the name used on the command line.
+# Workers look agents up here by name, so register new types at import time of
+# a module the workers also import (spawned workers do not see runtime changes).
+AGENT_TYPES = {
+    'random': RandomBot,
+    'heuristic': HeuristicBot
+}
+
+
+def register_agent(name, factory):
+    """Registers a Player factory taking (name, character, game), e.g. a Player subclass."""
+    AGENT_TYPES[name] = factory
+
+
+def build_shards(agent_names, games_per_matchup, shard_size, seed=0, max_turns=500):
+    """
+    Splits a round-robin into shards. Every ordered pair of agents plays
+    games_per_matchup games, so each agent gets both seats against each
+    opponent, and every matchup reuses the same seed range. A shard's id
+    names everything its results depend on (matchup, first seed, game
+    count and turn limit), so a checkpoint written under another seed or
+    configuration is replayed rather than merged.
+    """
+    shards = []
+    for matchup in itertools.permutations(agent_names, 2):
+        for start in range(0, games_per_matchup, shard_size):
+            shards.append({
+                'id': f"{matchup[0]}-vs-{matchup[1]}:seed={seed + start}:games={min(shard_size, games_per_matchup - start)}:turns={max_turns}",
+                'matchup': list(matchup),
+                'seed': seed + start,
+                'games': min(shard_size, games_per_matchup - start)
+            })
+    return shards
+
+
+def run_shard(shard, max_turns=500):
+    """Plays one shard in a worker process and returns its aggregated statistics."""
+    policies = [AGENT_TYPES[name] for name in shard['matchup']]
+    results = simulate(shard['games'], policies, shard['seed'], max_turns)
+
+    seat_wins = [0] * len(policies)
+    incomplete = 0
+    turns = 0
+    for result in results:
+        turns += result['turns']
+        if result['winner_seat'] is None:
+            incomplete += 1
+        else:
+            seat_wins[result['winner_seat']] += 1
+
+    return {
+        'id': shard['id'],
+        'matchup': shard['matchup'],
+        'games': shard['games'],
+        'seat_wins': seat_wins,
+        'incomplete': incomplete,
+        'turns': turns
+    }
+
+
+def new_standings(agent_names):
+    return {
+        'agents': {name: {'games': 0, 'wins': 0, 'losses': 0, 'incomplete': 0, 'turns': 0} for name in agent_names},
+        'matchups': {},
+        'shards_done': 0
+    }
+
+
+def merge_shard(standings, shard_result):
+    """Folds one shard's statistics into the running standings."""
+    matchup = shard_result['matchup']
+    games = shard_result['games']
+    decided = games - shard_result['incomplete']
+    for seat, name in enumerate(matchup):
+        agent = standings['agents'].setdefault(name, {'games': 0, 'wins': 0, 'losses': 0, 'incomplete': 0, 'turns': 0})
+        wins = shard_result['seat_wins'][seat]
+        agent['games'] += games
+        agent['wins'] += wins
+        agent['losses'] += decided - wins
+        agent['incomplete'] += shard_result['incomplete']
+        agent['turns'] += shard_result['turns']
+
+    key = ' vs '.join(matchup)
+    table = standings['matchups'].setdefault(key, {'games': 0, 'seat_wins': [0] * len(matchup), 'incomplete': 0, 'turns': 0})
+    table['games'] += games
+    table['incomplete'] += shard_result['incomplete']
+    table['turns'] += shard_result['turns']
+    for seat, wins in enumerate(shard_result['seat_wins']):
+        table['seat_wins'][seat] += wins
+    standings['shards_done'] += 1
+    return standings
+
+
+def load_checkpoint(path):
+    """Returns the shard results already recorded in a checkpoint file."""
+    completed = {}
+    if not path or not os.path.exists(path):
+        return completed
+    with open(path) as checkpoint:
+        for line in checkpoint:
+            try:
+                shard_result = json.loads(line)
+            except ValueError:
+                continue  # A run killed mid-write can leave a torn last line
+            completed[shard_result['id']] = shard_result
+    return completed
+
+
+def iter_tournament(agent_names, games_per_matchup, shard_size=500, workers=None, seed=0, checkpoint_path=None, max_turns=500):
+    """
+    Runs a round-robin across a process pool and yields (shard_result, standings)
+    each time a shard finishes. Finished shards are appended to checkpoint_path,
+    and shards already recorded there are merged without being replayed.
+    """
+    for name in agent_names:
+        if name not in AGENT_TYPES:
+            raise ValueError(f"Unknown agent type: {name}")
+
+    shards = build_shards(agent_names, games_per_matchup, shard_size, seed, max_turns)
+    completed = load_checkpoint(checkpoint_path)
+    standings = new_standings(agent_names)
+    pending = []
+    for shard in shards:
+        if shard['id'] in completed:
+            merge_shard(standings, completed[shard['id']])
+        else:
+            pending.append(shard)
+
+    if not pending:
+        return
+
+    checkpoint = open(checkpoint_path, 'a') if checkpoint_path else None
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(run_shard, shard, max_turns) for shard in pending]
+            try:
+                for future in as_completed(futures):
+                    shard_result = future.result()
+                    if checkpoint:
+                        checkpoint.write(json.dumps(shard_result) + '\n')
+                        checkpoint.flush()
+                        os.fsync(checkpoint.fileno())
+                    yield shard_result, merge_shard(standings, shard_result)
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+    finally:
+        if checkpoint:
+            checkpoint.close()
+
+
+def run_tournament(agent_names, games_per_matchup, shard_size=500, workers=None, seed=0, checkpoint_path=None, max_turns=500):
+    """Runs a full tournament (resuming from checkpoint_path if given) and returns the final standings."""
+    standings = None
+    for _, standings in iter_tournament(agent_names, games_per_matchup, shard_size, workers, seed, checkpoint_path, max_turns):
+        pass
+    if standings is None:
+        # Nothing left to play: rebuild the standings from the checkpoint alone
+        standings = new_standings(agent_names)
+        completed = load_checkpoint(checkpoint_path)
+        for shard in build_shards(agent_names, games_per_matchup, shard_size, seed, max_turns):
+            if shard['id'] in completed:
+                merge_shard(standings, completed[shard['id']])
+    return standings
+
+
+def print_standings(standings):
+    for name, agent in sorted(standings['agents'].items(), key=lambda item: -item[1]['wins']):
+        decided = agent['wins'] + agent['losses']
+        win_rate = agent['wins'] / decided if decided else 0.0
+        average_turns = agent['turns'] / agent['games'] if agent['games'] else 0.0
+        print(f"{name}: {agent['wins']}/{decided} won ({win_rate:.1%}), {agent['incomplete']} unfinished, {average_turns:.1f} turns/game")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Round-robin tournament between registered agent types.")
+    parser.add_argument('--agents', nargs='+', default=sorted(AGENT_TYPES))
+    parser.add_argument('--games', type=int, default=10000, help="Games per ordered matchup")
+    parser.add_argument('--shard-size', type=int, default=500)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--checkpoint', default=None, help="JSON-lines file to resume from and append to")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    standings = None
+    total_shards = len(build_shards(args.agents, args.games, args.shard_size, args.seed))
+    for shard_result, standings in iter_tournament(args.agents, args.games, args.shard_size, args.workers, args.seed, args.checkpoint):
+        print(f"[{standings['shards_done']}/{total_shards}] {shard_result['id']} done")
+    if standings is None:
+        standings = run_tournament(args.agents, args.games, args.shard_size, args.workers, args.seed, args.checkpoint)
+    print(f"Finished in {time.perf_counter() - start:.2f}s")
+    print_standings(standings)
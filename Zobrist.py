@@ -0,0 +1,171 @@
+import random
+from array import array
+from CompactGameState import CARDS, CARD_CODES, COPIES_PER_CARD, MAX_HAND
+
+ZOBRIST_SEED = 0x5eed  # Fixed, so hashes agree across processes and runs
+MAX_COINS = 63  # Coin counts above this share a key
+MAX_SEATS = 6
+
+
+def _keys(rng, count):
+    return [rng.getrandbits(64) for _ in range(count)]
+
+
+_rng = random.Random(ZOBRIST_SEED)
+COIN_KEYS = [_keys(_rng, MAX_COINS + 1) for _ in range(MAX_SEATS)]
+# HAND_KEYS[seat][card][n] marks a hand holding exactly n copies of card; DECK_KEYS likewise for the deck
+HAND_KEYS = [[_keys(_rng, MAX_HAND + 1) for _ in CARDS] for _ in range(MAX_SEATS)]
+DECK_KEYS = [_keys(_rng, COPIES_PER_CARD + 1) for _ in CARDS]
+TURN_KEYS = _keys(_rng, MAX_SEATS)
+
+
+class ZobristHash:
+    """
+    64-bit position hash of a Game: each seat's coins and hand (as a
+    multiset), the deck's composition and whose turn it is, XORed from
+    fixed random keys. Player coin and card methods, ActionHandler.exchange,
+    TurnManager.next_turn and MoveJournal.undo report each change, and each
+    report swaps one or two keys, so the hash stays current in O(1) per
+    change. Positions that differ only in deck order or history hash alike,
+    which is what a transposition table wants.
+    """
+
+    def __init__(self, game):
+        self.game = game
+        self.seats = {player.name: seat for seat, player in enumerate(game.players)}
+        self.recompute()
+
+    def recompute(self):
+        """Rebuilds the hash from the game in full, e.g. after Game.restore."""
+        game = self.game
+        self.hand_counts = [[0] * len(CARDS) for _ in game.players]
+        self.deck_counts = [0] * len(CARDS)
+        value = TURN_KEYS[game.turn_manager.current_turn]
+        for seat, player in enumerate(game.players):
+            value ^= COIN_KEYS[seat][min(player.coins, MAX_COINS)]
+            counts = self.hand_counts[seat]
+            for card in player.cards:
+                counts[CARD_CODES[card]] += 1
+            for code, count in enumerate(counts):
+                if count:
+                    value ^= HAND_KEYS[seat][code][count]
+        for card in game.deck:
+            self.deck_counts[CARD_CODES[card]] += 1
+        for code, count in enumerate(self.deck_counts):
+            value ^= DECK_KEYS[code][count]
+        self.value = value
+        return value
+
+    # -- changes --
+
+    def coins(self, player, old, new):
+        keys = COIN_KEYS[self.seats[player.name]]
+        self.value ^= keys[min(old, MAX_COINS)] ^ keys[min(new, MAX_COINS)]
+
+    def card_in(self, player, card):
+        seat = self.seats[player.name]
+        code = CARD_CODES[card]
+        count = self.hand_counts[seat][code]
+        keys = HAND_KEYS[seat][code]
+        self.value ^= (keys[count] if count else 0) ^ keys[count + 1]
+        self.hand_counts[seat][code] = count + 1
+
+    def card_out(self, player, card):
+        seat = self.seats[player.name]
+        code = CARD_CODES[card]
+        count = self.hand_counts[seat][code]
+        keys = HAND_KEYS[seat][code]
+        self.value ^= keys[count] ^ (keys[count - 1] if count > 1 else 0)
+        self.hand_counts[seat][code] = count - 1
+
+    def deck_in(self, card):
+        code = CARD_CODES[card]
+        count = self.deck_counts[code]
+        self.value ^= DECK_KEYS[code][count] ^ DECK_KEYS[code][count + 1]
+        self.deck_counts[code] = count + 1
+
+    def deck_out(self, card):
+        code = CARD_CODES[card]
+        count = self.deck_counts[code]
+        self.value ^= DECK_KEYS[code][count] ^ DECK_KEYS[code][count - 1]
+        self.deck_counts[code] = count - 1
+
+    def turn(self, old, new):
+        self.value ^= TURN_KEYS[old] ^ TURN_KEYS[new]
+
+
+REPLACE_ALWAYS, REPLACE_DEPTH, REPLACE_TWO_TIER = 'always', 'depth', 'two_tier'
+
+
+class TranspositionTable:
+    """
+    Bounded hash table of search results keyed by 64-bit position hashes.
+    Slots are found by hash modulo capacity and hold (key, depth, value);
+    on a collision the replacement policy decides: 'always' keeps the
+    newest entry, 'depth' keeps the one searched deeper (ties go to the
+    newer), and 'two_tier' gives each slot a depth-preferred entry and an
+    always-replaced one, so deep results survive without starving new
+    positions. Memory never grows past capacity entries (two per slot for
+    two_tier).
+    """
+
+    def __init__(self, capacity=1 << 16, policy=REPLACE_DEPTH):
+        if policy not in (REPLACE_ALWAYS, REPLACE_DEPTH, REPLACE_TWO_TIER):
+            raise ValueError(f"Unknown replacement policy: {policy}")
+        self.capacity = capacity
+        self.policy = policy
+        ways = 2 if policy == REPLACE_TWO_TIER else 1
+        self.keys = array('Q', bytes(8 * capacity * ways))
+        self.depths = array('i', [-1]) * (capacity * ways)
+        self.values = [None] * (capacity * ways)
+        self.ways = ways
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, min_depth=0):
+        """Value stored for key at depth min_depth or more, else None."""
+        base = key % self.capacity * self.ways
+        for slot in range(base, base + self.ways):
+            if self.keys[slot] == key and self.depths[slot] >= min_depth:
+                self.hits += 1
+                return self.values[slot]
+        self.misses += 1
+        return None
+
+    def store(self, key, value, depth=0):
+        base = key % self.capacity * self.ways
+        slot = base
+        if self.policy == REPLACE_DEPTH:
+            if self.keys[slot] != key and self.depths[slot] > depth:
+                return
+        elif self.policy == REPLACE_TWO_TIER:
+            if self.keys[base] == key or depth >= self.depths[base]:
+                if self.keys[base] != key and self.depths[base] >= 0:
+                    # The displaced deep entry moves to the always-replaced tier
+                    self.keys[base + 1], self.depths[base + 1], self.values[base + 1] = \
+                        self.keys[base], self.depths[base], self.values[base]
+            else:
+                slot = base + 1
+        self.keys[slot] = key
+        self.depths[slot] = depth
+        self.values[slot] = value
+
+    def clear(self):
+        for slot in range(len(self.values)):
+            self.depths[slot] = -1
+            self.values[slot] = None
+        self.hits = self.misses = 0
+
+    def __len__(self):
+        return sum(1 for depth in self.depths if depth >= 0)
+
+
+_shared_table = None
+
+
+def shared_transposition_table():
+    """Process-wide table for search agents and decision caches that are not given their own."""
+    global _shared_table
+    if _shared_table is None:
+        _shared_table = TranspositionTable(1 << 18, REPLACE_TWO_TIER)
+    return _shared_table
@@ -1,57 +1,1222 @@
-import unittest
-from Player import Player  # Import the relevant classes
-
-class TestPlayer(unittest.TestCase):
-
-    def setUp(self):
-        self.player = Player("TestPlayer", None)  # Initialize a player for testing
-
-    def test_gain_coins(self):
-        self.player.gain_coins(3)
-        self.assertEqual(self.player.coins, 5)  # Starting with 2 coins, now should have 5
-
-    def test_lose_coins(self):
-        self.player.lose_coins(1)
-        self.assertEqual(self.player.coins, 1)  # Starting with 2 coins, now should have 1
-
-    def test_coins_never_negative(self):
-        self.player.lose_coins(3)
-        self.assertEqual(self.player.coins, 0)  # Coins should not go below 0
-
-if __name__ == '__main__':
-    unittest.main()
-
-
-class TestGame(unittest.TestCase):
-
-    def setUp(self):
-        # Setup a game with players
-        self.players = [Player("Player1", None), Player("Player2", None)]
-        self.game = Game(self.players)
-
-    def test_is_game_over_with_multiple_players(self):
-        self.assertFalse(self.game.is_game_over())
-
-    def test_is_game_over_with_single_player(self):
-        # Simulate a situation where only one player has cards
-        self.players[0].cards = []
-        self.assertTrue(self.game.is_game_over())
-
-if __name__ == '__main__':
-    unittest.main()
-
-
-class TestActionHandler(unittest.TestCase):
-
-    def setUp(self):
-        self.players = [Player("Player1", None), Player("Player2", None)]
-        self.game = Game(self.players)
-        self.action_handler = ActionHandler(self.game)
-
-    def test_income_action(self):
-        player = self.players[0]
-        self.action_handler.income(player)
-        self.assertEqual(player.coins, 3)  # Player should gain 1 coin (starting from 2)
-
-if __name__ == '__main__':
-    unittest.main()
+import asyncio
+import copy
+import functools
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from Player import Player  # Import the relevant classes
+from GameManagement import Game, ActionHandler
+from Bots import RandomBot, HeuristicBot
+from Simulation import simulate, POLICIES
+from GameState import GameState
+from CompactGameState import CompactGameState
+from Tournament import run_tournament, load_checkpoint
+from LLMCache import ResponseCache
+from LLMClient import LLMClientManager, get_llm_client_manager, set_llm_client_manager
+from AIAgent import AIAgent
+from PromptCompiler import PromptCompiler
+from DecisionScanner import scan_decision
+from DecisionBackends import ScriptedBackend
+from FastGame import (FastGame, TAX, ASSASSINATE, DUKE, CAPTAIN, CONTESSA, REACT, OUTCOME_TRUTH, PHASE_ACTION,
+                      PHASE_BLOCK_CHALLENGE)
+from ISMCTS import ISMCTSAgent
+from CFRSolver import CFRSolver
+from CFRStrategy import StrategyTable, CFRBot, close_table, infoset_index, legal_slots, NUM_INFOSETS, WIDTH, NO_CLAIM, HANDS
+from StructuredDecisions import DecisionParser, DecisionParseError
+from Beliefs import BeliefTracker
+from EventLog import EventLog, read_spill, EVENT_ACTION, EVENT_BLOCK
+from GameRecord import GameRecord, GameRecorder, GameArchive
+from GameIndex import build_index
+from Zobrist import ZobristHash, TranspositionTable
+from GameLogger import GameLogger, LogWriter, DEBUG, INFO, WARNING
+from Metrics import Metrics
+from Profiling import Profiler
+from Speculation import SpeculationCancelled, speculation_cancelled
+import Benchmark
+from BatchSimulator import BatchSimulator, simulate_batch, VectorRandomPolicy, VectorHeuristicPolicy
+
+class TestPlayer(unittest.TestCase):
+
+    def setUp(self):
+        self.player = Player("TestPlayer", None)  # Initialize a player for testing
+
+    def test_gain_coins(self):
+        self.player.gain_coins(3)
+        self.assertEqual(self.player.coins, 5)  # Starting with 2 coins, now should have 5
+
+    def test_lose_coins(self):
+        self.player.lose_coins(1)
+        self.assertEqual(self.player.coins, 1)  # Starting with 2 coins, now should have 1
+
+    def test_coins_never_negative(self):
+        self.player.lose_coins(3)
+        self.assertEqual(self.player.coins, 0)  # Coins should not go below 0
+
+
+class TestGame(unittest.TestCase):
+
+    def setUp(self):
+        # Setup a game with players
+        self.players = [Player("Player1", None), Player("Player2", None)]
+        self.game = Game(self.players)
+        for player in self.players:
+            player.cards = [self.game.deck.pop(), self.game.deck.pop()]
+
+    def test_is_game_over_with_multiple_players(self):
+        self.assertFalse(self.game.is_game_over())
+
+    def test_is_game_over_with_single_player(self):
+        # Simulate a situation where only one player has cards
+        self.players[0].cards = []
+        self.assertTrue(self.game.is_game_over())
+
+
+class TestActionHandler(unittest.TestCase):
+
+    def setUp(self):
+        self.players = [Player("Player1", None), Player("Player2", None)]
+        self.game = Game(self.players)
+        self.action_handler = ActionHandler(self.game)
+
+    def test_income_action(self):
+        player = self.players[0]
+        self.action_handler.income(player)
+        self.assertEqual(player.coins, 3)  # Player should gain 1 coin (starting from 2)
+
+
+class TestSimulation(unittest.TestCase):
+
+    def test_games_complete_with_a_winner(self):
+        results = simulate(20, [RandomBot, HeuristicBot], seed=1)
+        self.assertEqual(len(results), 20)
+        for result in results:
+            self.assertTrue(result['completed'])
+            self.assertIn(result['winner'], result['players'])
+
+    def test_mirror_heuristic_games_finish(self):
+        # Blocked steals and assassinations used to be retried forever
+        for policies in ([HeuristicBot, HeuristicBot], [HeuristicBot, HeuristicBot, HeuristicBot]):
+            results = simulate(200, policies, seed=0)
+            self.assertTrue(all(result['completed'] for result in results))
+        batch = simulate_batch(2000, [VectorHeuristicPolicy(), VectorHeuristicPolicy()], seed=0)
+        self.assertTrue(batch['completed'].all())
+
+    def test_same_seed_replays_the_same_games(self):
+        first = simulate(5, [RandomBot, RandomBot], seed=7)
+        second = simulate(5, [RandomBot, RandomBot], seed=7)
+        self.assertEqual(first, second)
+
+    def test_seeded_games_leave_the_global_generator_alone(self):
+        random.seed(123)
+        expected = [random.random() for _ in range(3)]
+        random.seed(123)
+        simulate(3, [RandomBot, HeuristicBot], seed=7)
+        self.assertEqual([random.random() for _ in range(3)], expected)
+
+
+class TestTournament(unittest.TestCase):
+
+    def test_resume_skips_completed_shards(self):
+        with tempfile.TemporaryDirectory() as run_dir:
+            checkpoint = os.path.join(run_dir, 'shards.jsonl')
+            first = run_tournament(['random', 'heuristic'], 20, shard_size=10, workers=1, checkpoint_path=checkpoint)
+            self.assertEqual(len(load_checkpoint(checkpoint)), 4)
+            resumed = run_tournament(['random', 'heuristic'], 20, shard_size=10, workers=1, checkpoint_path=checkpoint)
+            self.assertEqual(first, resumed)
+            self.assertEqual(first['agents']['random']['games'], 40)
+
+    def test_resume_replays_shards_from_another_seed(self):
+        with tempfile.TemporaryDirectory() as run_dir:
+            checkpoint = os.path.join(run_dir, 'shards.jsonl')
+            run_tournament(['random', 'heuristic'], 20, shard_size=10, workers=1, checkpoint_path=checkpoint)
+            run_tournament(['random', 'heuristic'], 20, shard_size=10, workers=1, seed=1, checkpoint_path=checkpoint)
+            self.assertEqual(len(load_checkpoint(checkpoint)), 8)
+
+
+class TestCompactGameState(unittest.TestCase):
+
+    def play(self, compact_state, seed):
+        random.seed(seed)
+        game = Game([], headless=True, compact_state=compact_state)
+        game.players = [RandomBot("Player1", None, game), HeuristicBot("Player2", None, game)]
+        game.deal_initial_cards()
+        while not game.is_game_over():
+            game.turn_manager.play_turn()
+        game.announce_winner()
+        return game.game_state
+
+    def test_matches_dict_game_state(self):
+        for seed in range(10):
+            expected = self.play(False, seed)
+            compact = self.play(True, seed)
+            self.assertEqual(compact.get_game_state(), expected.get_game_state())
+            self.assertEqual(compact.get_public_game_state(), expected.get_public_game_state())
+
+    def test_logs_each_action_once(self):
+        state = self.play(True, 3)
+        events = [entry for entry in state.actions_log if 'player' in entry]
+        self.assertFalse(any(first == second for first, second in zip(events, events[1:])))
+
+    def test_accepts_card_counts(self):
+        state = CompactGameState()
+        state.add_player("Player1")
+        state.update_player_cards("Player1", 2)
+        self.assertEqual(state.get_public_game_state()["players_state"]["Player1"]["card_count"], 2)
+
+    def test_players_state_rejects_writes(self):
+        state = CompactGameState()
+        state.add_player("Player1")
+        with self.assertRaises(TypeError):
+            state.players_state["Player1"]['coins'] = 7
+        with self.assertRaises(TypeError):
+            state.players_state["Player2"] = {}
+        self.assertEqual(state.players_state["Player1"]['coins'], 2)
+
+
+class TestBatchSimulator(unittest.TestCase):
+
+    def test_matches_object_engine_win_rate(self):
+        batch = simulate_batch(4000, [VectorRandomPolicy(), VectorHeuristicPolicy()], seed=3)
+        self.assertTrue(batch['completed'].all())
+        games = simulate(2000, [RandomBot, HeuristicBot], seed=3)
+        object_rate = sum(result['winner_seat'] == 0 for result in games) / len(games)
+        batch_rate = (batch['winner_seat'] == 0).mean()
+        self.assertAlmostEqual(batch_rate, object_rate, delta=0.04)
+
+    def test_cards_are_never_created(self):
+        sim = BatchSimulator(500, [VectorRandomPolicy(), VectorRandomPolicy()], seed=4)
+        for _ in range(20):
+            self.assertTrue(((sim.hand >= 0).sum((1, 2)) == sim.hand_size.sum(1)).all())
+            self.assertTrue((sim.hand_size.sum(1) + sim.deck.sum(1) <= 15).all())
+            sim.step()
+
+
+class TestResponseCache(unittest.TestCase):
+
+    def test_whitespace_variants_share_an_entry(self):
+        self.assertEqual(ResponseCache.make_key("model", {}, "Game state:  x\n  go"),
+                         ResponseCache.make_key("model", {}, "Game state: x go"))
+
+    def test_disk_tier_survives_a_new_cache(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            path = os.path.join(cache_dir, 'responses.sqlite')
+            cache = ResponseCache(path, max_memory_entries=1)
+            cache.get_or_create("model", {}, "prompt", lambda: "The best action is to tax")
+            cache.close()
+
+            reopened = ResponseCache(path)
+            response = reopened.get_or_create("model", {}, "prompt", lambda: self.fail("cache miss"))
+            self.assertEqual(response, "The best action is to tax")
+            self.assertEqual(reopened.stats()['disk_hits'], 1)
+            reopened.close()
+
+    def test_expired_entries_miss(self):
+        cache = ResponseCache(ttl_seconds=0)
+        cache.put("key", "response")
+        cache.memory["key"] = ("response", 0.0)
+        self.assertIsNone(cache.get("key"))
+        self.assertEqual(cache.stats()['misses'], 1)
+
+
+class StandInClientManager(LLMClientManager):
+    """Answers every completion locally and counts the requests."""
+
+    def __init__(self, text):
+        super().__init__(api_key="local")
+        self.text = text
+        self.requests = 0
+        self.max_tokens = []
+
+    def complete(self, prompt, model, **params):
+        self.requests += 1
+        self.max_tokens.append(params.get('max_tokens'))
+        return self.text
+
+
+class TestLLMClientManager(unittest.TestCase):
+
+    def setUp(self):
+        self.previous = get_llm_client_manager()
+        self.stand_in = set_llm_client_manager(StandInClientManager("The best action is to income"))
+
+    def tearDown(self):
+        set_llm_client_manager(self.previous)
+
+    def test_agents_share_the_process_manager(self):
+        cache = ResponseCache()
+        agents = [AIAgent("AI_1", None, None, response_cache=cache), AIAgent("AI_2", None, None, response_cache=cache)]
+        for agent in agents:
+            self.assertEqual(agent.query_gpt(f"prompt for {agent.name}"), "The best action is to income")
+        self.assertEqual(self.stand_in.requests, 2)
+
+    def test_close_shuts_the_async_pool_on_its_loop(self):
+        server = Benchmark.MockCompletionServer()
+        loop = asyncio.new_event_loop()
+        try:
+            manager = LLMClientManager(api_key="local", base_url=server.url, max_retries=0)
+            self.assertEqual(loop.run_until_complete(manager.acomplete("prompt", "model")), " tax")
+            async_client = manager._async_client
+            manager.close()
+            self.assertTrue(async_client.is_closed())
+        finally:
+            loop.close()
+            server.close()
+
+    def test_agents_do_not_cache_unless_given_a_cache(self):
+        agent = AIAgent("AI_1", None, None)
+        agent.query_gpt("same prompt")
+        agent.query_gpt("same prompt")
+        self.assertEqual(self.stand_in.requests, 2)
+        cached = AIAgent("AI_2", None, None, response_cache=ResponseCache())
+        cached.query_gpt("same prompt")
+        cached.query_gpt("same prompt")
+        self.assertEqual(self.stand_in.requests, 3)
+
+
+class SlowReactor(RandomBot):
+    """
+    Bot whose reactions take a fixed delay, like an LLM round trip. With a
+    barrier, each reaction first waits there for the other reactors, which
+    only succeeds if they are all asked at the same time.
+    """
+
+    reacts_concurrently = True
+
+    def __init__(self, name, delay, challenges, barrier=None):
+        super().__init__(name)
+        self.delay = delay
+        self.challenges = challenges
+        self.barrier = barrier
+        self.overlapped = None
+        self.cards = ['Contessa', 'Contessa']
+
+    def rendezvous(self):
+        if self.barrier is not None:
+            try:
+                self.barrier.wait(timeout=5)
+                self.overlapped = True
+            except threading.BrokenBarrierError:
+                self.overlapped = False
+
+    def wants_to_challenge(self, acting_player, action):
+        self.rendezvous()
+        time.sleep(self.delay)
+        return self.challenges
+
+
+class TestReactionFanOut(unittest.TestCase):
+
+    def test_first_challenger_in_seat_order_after_one_round_trip(self):
+        actor = RandomBot("Actor")
+        actor.cards = ['Captain', 'Captain']
+        barrier = threading.Barrier(3)
+        opponents = [SlowReactor("Slow_1", 0.05, False, barrier), SlowReactor("Slow_2", 0.1, True, barrier),
+                     SlowReactor("Slow_3", 0.01, True, barrier)]
+        game = Game([actor] + opponents, headless=True)
+
+        challengers = list(game.challenge_handler.poll_reactions(actor, 'challenge', 'tax'))
+
+        # Asked one at a time, the first reactor would time out at the barrier and break it for the others
+        self.assertEqual([player.overlapped for player in opponents], [True, True, True])
+        self.assertEqual([player.name for player in challengers], ["Slow_2", "Slow_3"])
+
+
+class SlowTaxer(SlowReactor):
+    """Actor that takes a round trip to decide and always claims Duke."""
+
+    def choose_action(self, game_state):
+        self.rendezvous()
+        time.sleep(self.delay)
+        return 'tax'
+
+
+class PatientReactor(RandomBot):
+    """Reactor that keeps thinking until its speculative call is called off."""
+
+    reacts_concurrently = True
+
+    def __init__(self, name, barrier):
+        super().__init__(name)
+        self.barrier = barrier
+        self.stopped = threading.Semaphore(0)
+        self.cards = ['Contessa', 'Contessa']
+
+    def wants_to_challenge(self, acting_player, action):
+        self.barrier.wait(timeout=5)
+        deadline = time.monotonic() + 5
+        while not speculation_cancelled():
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(0.001)
+        self.stopped.release()
+        raise SpeculationCancelled()
+
+    wants_to_block = wants_to_challenge
+
+
+class IncomeActor(SlowReactor):
+    """Actor that takes income, which opens no reaction window."""
+
+    def choose_action(self, game_state):
+        self.rendezvous()
+        return 'income'
+
+
+class TestReactionSpeculation(unittest.TestCase):
+
+    def test_prefetched_challenge_overlaps_the_actor_decision(self):
+        # The actor's decision only returns once the opponent's challenge decision has started
+        barrier = threading.Barrier(2)
+        actor = SlowTaxer("Actor", 0.05, False, barrier)
+        opponent = SlowReactor("Opponent", 0.05, False, barrier)
+        game = Game([actor, opponent], headless=True, speculation=2)
+        for player in game.players:
+            game.game_state.add_player(player.name)
+
+        game.turn_manager.perform_action(actor)
+
+        self.assertEqual((actor.overlapped, opponent.overlapped), (True, True))
+        stats = game.speculator.stats()
+        self.assertEqual((stats['launched'], stats['hits'], stats['wasted']), (2, 1, 1))
+
+    def test_settle_stops_running_speculative_reactions(self):
+        # The actor decides once both prefetched reactions are running, so neither can just be dequeued
+        barrier = threading.Barrier(3)
+        actor = IncomeActor("Actor", 0, False, barrier)
+        opponent = PatientReactor("Opponent", barrier)
+        game = Game([actor, opponent], headless=True, speculation=2)
+        for player in game.players:
+            game.game_state.add_player(player.name)
+
+        game.turn_manager.perform_action(actor)
+
+        self.assertTrue(actor.overlapped)
+        # Both prefetched reactions (tax and foreign aid) saw the turn settle without them
+        self.assertTrue(opponent.stopped.acquire(timeout=5))
+        self.assertTrue(opponent.stopped.acquire(timeout=5))
+        self.assertEqual(game.speculator.stats()['wasted'], 2)
+
+
+class TestStructuredDecisions(unittest.TestCase):
+
+    def setUp(self):
+        self.parser = DecisionParser(AIAgent.valid_actions)
+
+    def test_parses_wrapped_json(self):
+        decision = self.parser.parse('Sure! {"action": "steal", "target": "AI_2", "challenge": false, "block": false, "message": "Hand it over"}', ["AI_2"])
+        self.assertEqual(decision, {'action': 'steal', 'target': 'AI_2', 'challenge': False, 'block': False, 'message': 'Hand it over'})
+
+    def test_rejects_values_outside_the_schema(self):
+        with self.assertRaises(DecisionParseError):
+            self.parser.parse('{"action": "fly"}')
+        with self.assertRaises(DecisionParseError):
+            self.parser.parse('{"action": "coup", "target": "Nobody"}', ["AI_2"])
+        with self.assertRaises(DecisionParseError):
+            self.parser.parse('The best action is to tax')
+
+    def test_takes_the_first_object_when_braces_follow_it(self):
+        reply = 'Decision: {"action": "tax", "message": "Duke"} and my notes: {draft}'
+        self.assertEqual(self.parser.parse(reply)['action'], 'tax')
+        self.assertEqual(self.parser.parse('Options {a, b}, final: {"action": "income"}')['action'], 'income')
+
+    def test_reactions_leave_the_action_decision_alone(self):
+        previous = get_llm_client_manager()
+        stand_in = set_llm_client_manager(StandInClientManager(
+            '{"action": "steal", "target": "AI_2", "challenge": true, "block": false, "message": "Mine now"}'))
+        try:
+            game = Game([], headless=True)
+            game.players = [AIAgent(f"AI_{seat}", None, game, structured=True) for seat in (1, 2)]
+            game.deal_initial_cards()
+            agent, opponent = game.players
+            self.assertEqual(agent.choose_action(game.game_state), 'steal')
+            decision = agent.pending_decision
+            stand_in.text = '{"action": null, "target": null, "challenge": true, "block": false, "message": "Liar"}'
+            reaction = ThreadPoolExecutor(1).submit(agent.wants_to_challenge, opponent, 'tax')
+            self.assertTrue(reaction.result())
+            self.assertIs(agent.pending_decision, decision)
+            self.assertIs(agent.choose_target(game), opponent)
+            self.assertEqual(agent.send_message(game.game_state.get_public_game_state()), "Mine now")
+        finally:
+            set_llm_client_manager(previous)
+
+    def count_requests(self, structured, reply):
+        previous = get_llm_client_manager()
+        stand_in = set_llm_client_manager(StandInClientManager(reply))
+        try:
+            game = Game([])
+            game.players = [AIAgent(f"AI_{seat}", None, game, response_cache=ResponseCache(max_memory_entries=0), structured=structured) for seat in (1, 2)]
+            game.initialize_communication_layer()
+            game.deal_initial_cards()
+            for _ in range(4):
+                game.turn_manager.play_turn()
+            return stand_in.requests
+        finally:
+            set_llm_client_manager(previous)
+
+    def test_one_reply_covers_action_and_table_talk(self):
+        legacy = self.count_requests(False, "The best action is to income")
+        structured = self.count_requests(True, '{"action": "income", "target": null, "challenge": false, "block": false, "message": "Just income"}')
+        self.assertEqual(structured, 8)
+        self.assertGreaterEqual(legacy, 2 * structured)
+
+
+class TestPromptCompiler(unittest.TestCase):
+
+    def test_long_logs_are_trimmed_to_the_budget(self):
+        state = GameState()
+        state.add_player("AI_1")
+        state.add_player("AI_2")
+        for turn in range(200):
+            state.log_action("AI_1" if turn % 2 else "AI_2", 'income', f'success_{turn}')
+
+        compiler = PromptCompiler(budgets={'action_decision': (300, 32)})
+        prompt, max_tokens = compiler.compile(state.get_game_state(), 'action_decision')
+        self.assertLessEqual(compiler.count(prompt), 300)
+        self.assertEqual(max_tokens, 32)
+        self.assertIn('success_199', prompt)
+        self.assertNotIn('success_0;', prompt)
+        self.assertIn('The best action is to', prompt)
+
+    def test_table_talk_requests_are_budgeted(self):
+        previous = get_llm_client_manager()
+        stand_in = set_llm_client_manager(StandInClientManager("Nice hand you have there"))
+        try:
+            game = Game([], headless=True)
+            game.players = [AIAgent(f"AI_{seat}", None, game) for seat in (1, 2)]
+            game.initialize_communication_layer()
+            agent = game.players[0]
+            agent.interact_with_communication_layer(game.communication_layer, game.game_state.get_public_game_state())
+            agent.make_move(game.game_state.get_public_game_state())
+        finally:
+            set_llm_client_manager(previous)
+        budget = agent.prompt_compiler.budget('table_talk')[1]
+        self.assertEqual(stand_in.max_tokens, [budget] * 3)
+
+
+class StreamingStandIn(LLMClientManager):
+    """Streams a reply one word at a time and records how much of it was read."""
+
+    def __init__(self, reply):
+        super().__init__(api_key="local")
+        self.reply = reply
+        self.streamed = 0
+        self.closed = False
+
+    def stream_text(self, prompt, model, **params):
+        try:
+            for word in self.reply.split(' '):
+                self.streamed += 1
+                yield word + ' '
+        finally:
+            self.closed = True
+
+
+class TestStreamingDecisions(unittest.TestCase):
+
+    def test_generation_stops_at_the_decision(self):
+        previous = get_llm_client_manager()
+        stand_in = set_llm_client_manager(StreamingStandIn("The best action is to tax because " + "more " * 100))
+        try:
+            agent = AIAgent("AI_1", None, None, response_cache=ResponseCache(), streaming=True)
+            response = agent.query_gpt_streaming("prompt", 'action_decision')
+        finally:
+            set_llm_client_manager(previous)
+        self.assertEqual(agent.parse_response('action_decision', response), 'tax')
+        self.assertLessEqual(stand_in.streamed, 8)
+        self.assertTrue(stand_in.closed)
+
+    def test_negated_reactions(self):
+        self.assertEqual(scan_decision('challenge_decision', "no_challenge", AIAgent.valid_actions), 'no_challenge')
+        self.assertEqual(scan_decision('challenge_decision', "I will not challenge that.", AIAgent.valid_actions), 'no_challenge')
+        self.assertEqual(scan_decision('block_decision', "Block it!", AIAgent.valid_actions), 'block')
+        self.assertEqual(scan_decision('action_decision', "The best action is to take foreign aid", AIAgent.valid_actions), 'foreign_aid')
+
+
+class OfflineManager(LLMClientManager):
+    """Fails the test if anything reaches the model."""
+
+    def complete(self, prompt, model, **params):
+        raise AssertionError("Offline backends must not query the model")
+
+    def stream_text(self, prompt, model, **params):
+        raise AssertionError("Offline backends must not query the model")
+
+
+class TestDecisionBackends(unittest.TestCase):
+
+    def setUp(self):
+        self.previous = get_llm_client_manager()
+        set_llm_client_manager(OfflineManager(api_key="local"))
+
+    def tearDown(self):
+        set_llm_client_manager(self.previous)
+
+    def test_mixed_backends_play_without_the_api(self):
+        policies = [POLICIES['ai-heuristic'], POLICIES['ai-scripted'], RandomBot]
+        results = simulate(10, policies, seed=3)
+        for result in results:
+            self.assertTrue(result['completed'])
+        self.assertEqual(results[0]['players'], ['AIAgent-heuristic_1', 'AIAgent-scripted_2', 'RandomBot_3'])
+
+    def test_scripted_backend_is_deterministic(self):
+        agent = AIAgent("AI_1", None, None, backend=ScriptedBackend(script=['tax', 'assassinate'], challenge=True))
+        agent.cards = ['Duke', 'Contessa']
+        self.assertEqual(agent.choose_action({}), 'tax')
+        self.assertEqual(agent.choose_action({}), 'income')  # Assassinate is unaffordable with 2 coins
+        self.assertTrue(agent.wants_to_challenge(None, 'tax'))
+        self.assertFalse(agent.wants_to_block(None, 'steal'))
+        self.assertEqual(agent.choose_exchange_cards(1), ['Duke'])
+        self.assertEqual(agent.make_decision({}, 'challenge_decision', {'action': 'tax'}), 'challenge')
+
+    def test_offline_decisions_are_fast(self):
+        agent = AIAgent("AI_1", None, None, backend='heuristic')
+        agent.cards = ['Captain', 'Contessa']
+        start = time.perf_counter()
+        for _ in range(1000):
+            agent.choose_action({})
+            agent.wants_to_block(None, 'assassinate')
+        self.assertLess((time.perf_counter() - start) / 2000, 0.001)
+
+
+class TestISMCTS(unittest.TestCase):
+
+    def test_model_follows_engine_challenge_rules(self):
+        rng = random.Random(0)
+        game = FastGame([[DUKE], [CAPTAIN, CONTESSA]], [2, 2], [CONTESSA, CAPTAIN])
+        game.apply(TAX, rng)
+        self.assertEqual(game.apply(REACT, rng), OUTCOME_TRUTH)
+        # The challenger loses its last card; the one-card actor swaps the Duke and draws one more
+        self.assertEqual(game.hands[1], [CAPTAIN])
+        self.assertEqual(len(game.hands[0]), 2)
+        self.assertEqual(game.coins[0], 5)
+        self.assertEqual(game.turn, 1)
+
+    def test_takes_the_winning_coup(self):
+        game = Game([], headless=True)
+        agent = ISMCTSAgent("AI_1", None, game, iterations=300, seed=1)
+        opponent = RandomBot("Player2", None, game)
+        game.players = [agent, opponent]
+        game.deal_initial_cards()
+        agent.coins = 7
+        opponent.cards = opponent.cards[:1]
+        self.assertEqual(agent.choose_action(game.game_state), 'coup')
+        self.assertIs(agent.choose_target(game), opponent)
+
+    def test_beats_random_play_and_reuses_its_tree(self):
+        results = simulate(10, [RandomBot, functools.partial(ISMCTSAgent, iterations=200)], seed=5)
+        self.assertGreaterEqual(sum(result['winner_seat'] == 1 for result in results), 7)
+
+        random.seed(5)
+        game = Game([], headless=True, compact_state=True)
+        agent = ISMCTSAgent("AI_1", None, game, iterations=200)
+        game.players = [RandomBot("Player1", None, game), agent]
+        game.deal_initial_cards()
+        while not game.is_game_over():
+            game.turn_manager.play_turn()
+        self.assertGreater(agent.backend.stats()['reuse_rate'], 0)
+
+    def test_agents_with_the_same_name_keep_separate_trees(self):
+        games = [Game([], headless=True) for _ in range(2)]
+        agents = [ISMCTSAgent("AI_1", None, game, iterations=50, seed=3) for game in games]
+        for game, agent in zip(games, agents):
+            game.players = [agent, RandomBot("Player2", None, game)]
+            game.deal_initial_cards()
+        agents[0].choose_action(games[0].game_state)
+        self.assertIn("AI_1", agents[0].backend.trees)
+        self.assertEqual(agents[1].backend.trees, {})
+        agents[1].choose_action(games[1].game_state)
+        self.assertEqual(agents[1].backend.stats()['reuse_rate'], 0)
+
+
+class TestCFRStrategy(unittest.TestCase):
+
+    def test_abstraction_indexes_are_dense(self):
+        last = infoset_index((PHASE_BLOCK_CHALLENGE, ASSASSINATE), 12, 12, [CONTESSA, CONTESSA], 2, NO_CLAIM)
+        self.assertEqual(last, NUM_INFOSETS - 1)
+        self.assertEqual(infoset_index((PHASE_ACTION, None), 0, 0, [DUKE], 1, DUKE), 0)
+        self.assertEqual(len(HANDS), 20)
+
+    def test_table_round_trips_through_the_file(self):
+        probabilities = [0.0] * (NUM_INFOSETS * WIDTH)
+        index = infoset_index((PHASE_ACTION, None), 3, 2, [CAPTAIN, DUKE], 2, NO_CLAIM)
+        probabilities[index * WIDTH + TAX] = 1.0
+        with tempfile.TemporaryDirectory() as table_dir:
+            path = os.path.join(table_dir, 'table.bin')
+            StrategyTable.write(path, probabilities)
+            table = StrategyTable(path)
+            try:
+                self.assertEqual(table.weights(index)[TAX], 255)
+                self.assertEqual(table.sample(index, legal_slots((PHASE_ACTION, None), 3)), TAX)
+                self.assertIn(table.sample(index + 1, [0, 1]), [0, 1])  # Unreached sets play uniformly
+            finally:
+                table.close()
+
+    def test_solved_table_plays_complete_games(self):
+        solver = CFRSolver(seed=0)
+        solver.iterate(50)
+        self.assertGreater(solver.reached_infosets(), 0)
+        with tempfile.TemporaryDirectory() as table_dir:
+            path = os.path.join(table_dir, 'table.bin')
+            solver.save(path)
+            try:
+                results = simulate(5, [functools.partial(CFRBot, table_path=path), RandomBot], seed=2)
+            finally:
+                close_table(path)  # open_table shares one mapping per path for the whole process
+        self.assertTrue(all(result['completed'] for result in results))
+
+    def test_checkpoint_resumes_the_solve_exactly(self):
+        solver = CFRSolver(seed=4)
+        solver.iterate(20)
+        with tempfile.TemporaryDirectory() as checkpoint_dir:
+            path = os.path.join(checkpoint_dir, 'solver.ckpt')
+            solver.save_checkpoint(path)
+            resumed = CFRSolver.load_checkpoint(path)
+        solver.iterate(20)
+        resumed.iterate(20)
+        self.assertEqual(resumed.iterations, 40)
+        self.assertEqual(resumed.regrets, solver.regrets)
+        self.assertEqual(resumed.strategy_sums, solver.strategy_sums)
+
+
+class TestBeliefTracker(unittest.TestCase):
+
+    def setUp(self):
+        self.observer = Player("Alice", None)
+        self.observer.cards = ['Duke', 'Contessa']
+        self.tracker = BeliefTracker(self.observer)
+
+    def test_prior_excludes_the_observers_cards(self):
+        self.assertAlmostEqual(self.tracker.probability("Bob", 'Duke'), 2 / 13)
+        self.assertAlmostEqual(self.tracker.probability("Bob", 'Captain'), 3 / 13)
+        self.assertAlmostEqual(sum(self.tracker.distribution("Bob").values()), 1.0)
+
+    def test_claims_blocks_and_challenges_update_in_place(self):
+        for game_state in (GameState(), CompactGameState()):
+            tracker = BeliefTracker(self.observer).attach(game_state)
+            game_state.log_action("Bob", 'steal', 'success')
+            once = tracker.probability("Bob", 'Captain')
+            self.assertAlmostEqual(once, 3 / (3 + 0.3 * 10))
+            game_state.log_block("Carol", "Bob", 'foreign_aid', 'blocked', True)
+            self.assertEqual(tracker.most_likely("Carol"), ['Duke'])
+            game_state.log_challenge("Alice", "Bob", 'steal', 'bluff', True)
+            self.assertEqual(tracker.probability("Bob", 'Captain'), 0.0)
+            self.assertAlmostEqual(sum(tracker.distribution("Bob").values()), 1.0)
+
+    def test_observer_is_not_tracked(self):
+        self.tracker.on_action("Alice", 'tax', 'success')
+        self.assertNotIn("Alice", self.tracker.beliefs)
+
+    def test_agent_reads_beliefs_into_its_prompt(self):
+        game = Game([], headless=True)
+        agent = AIAgent("AI_1", None, game, response_cache=ResponseCache(max_memory_entries=0))
+        agent.cards = ['Duke', 'Contessa']
+        game.game_state.add_player("AI_1")
+        game.game_state.add_player("Bob")
+        game.game_state.log_action("Bob", 'tax', 'success')
+        prompt = agent.create_prompt(game.game_state.get_public_game_state(), 'challenge_decision')
+        self.assertIn("reads: Bob:Duke=", prompt)
+
+
+class TestEventLog(unittest.TestCase):
+
+    def test_ring_keeps_the_latest_events(self):
+        log = EventLog(capacity=4)
+        for turn in range(10):
+            log.append(EVENT_ACTION, f"P{turn % 2}", None, 'income', 'success')
+        self.assertEqual(len(log), 4)
+        self.assertEqual(log.total, 10)
+        self.assertEqual(len(log.records), 4 * 6)
+        self.assertEqual([entry['player'] for entry in log.recent(3)], ["P1", "P0", "P1"])
+        self.assertEqual(len(log.recent(50)), 4)
+
+    def test_spills_overwritten_events_in_order(self):
+        with tempfile.TemporaryDirectory() as spill_dir:
+            path = os.path.join(spill_dir, 'events.jsonl')
+            log = EventLog(capacity=3, spill_path=path)
+            for turn in range(7):
+                log.append(EVENT_ACTION, "P1", None, 'tax', f'success_{turn}')
+            log.append(EVENT_BLOCK, "P2", "P1", 'steal', 'blocked', True)
+            history = log.history()
+            log.close()
+            self.assertEqual([entry.get('outcome') for entry in history[:7]], [f'success_{turn}' for turn in range(7)])
+            self.assertEqual(history[-1], {"blocker": "P2", "blocked": "P1", "action": 'steal', "result": 'blocked', "success": True})
+            self.assertEqual(len(list(read_spill(path))), 5)
+
+            # A second game on the same path starts the file afresh
+            second = EventLog(capacity=1, spill_path=path)
+            second.append(EVENT_ACTION, "P3", None, 'income', 'success')
+            second.append(EVENT_ACTION, "P3", None, 'income', 'success')
+            second.close()
+            self.assertEqual([entry['player'] for entry in read_spill(path)], ["P3"])
+
+    def test_game_state_keeps_the_whole_game_without_a_spill_path(self):
+        for state_class in (GameState, CompactGameState):
+            state = state_class(log_capacity=4)
+            state.add_player("P1")
+            for turn in range(10):
+                state.log_action("P1", 'tax', f'success_{turn}')
+            self.assertEqual([entry['outcome'] for entry in state.actions_log], [f'success_{turn}' for turn in range(10)])
+            self.assertEqual(len(state.get_game_state()['actions_log']), 10)
+            self.assertEqual(len(state.get_public_game_state()['actions_log']), 4)
+            state.close()
+            self.assertEqual(len(state.actions_log), 4)
+
+
+class TestGameRecord(unittest.TestCase):
+
+    def test_record_round_trips(self):
+        record = GameRecord(-7, ["P1", "P2"], ["RandomBot", "HeuristicBot"], [
+            (0, "P1", None, 'tax', 'success', None),
+            (2, "P2", "P1", 'tax', 'truth', False),
+            (3, "Stranger", "P1", 'steal', 'an_unusual_result', True)
+        ], winner="P1", turns=3, states=[
+            (2, 2, None, None, 'Duke', ('Captain', 'Duke')),
+            (0, 1, 5, 2, 'Duke', ('Captain', 'Duke')),
+            (None, None, 3, 2, None, None)
+        ])
+        decoded = GameRecord.decode(record.encode())
+        self.assertEqual((decoded.seed, decoded.players, decoded.agent_types), (-7, ["P1", "P2"], ["RandomBot", "HeuristicBot"]))
+        self.assertEqual(decoded.events, record.events)
+        self.assertEqual(decoded.states, record.states)
+        self.assertEqual((decoded.winner, decoded.turns), ("P1", 3))
+
+    def test_archive_replays_games_into_a_game_state(self):
+        with tempfile.TemporaryDirectory() as archive_dir:
+            path = os.path.join(archive_dir, 'games.cgr')
+            with GameArchive(path, 'w', block_size=512) as archive:
+                results = simulate(6, [RandomBot, HeuristicBot], seed=11, compact_state=False, archive=archive)
+            with GameArchive(path, 'a') as archive:
+                simulate(2, [HeuristicBot, RandomBot], seed=40, archive=archive)
+            with GameArchive(path) as archive:
+                self.assertEqual(len(archive), 8)
+                record = archive[4]
+                self.assertEqual(record.seed, 15)
+                self.assertEqual(record.winner, results[4]['winner'])
+                self.assertEqual(archive[-1].agent_types, ["HeuristicBot", "RandomBot"])
+
+            random.seed(15)
+            replayed = record.replay()
+            game = Game([], headless=True)
+            game.players = [RandomBot("RandomBot_1", None, game), HeuristicBot("HeuristicBot_2", None, game)]
+            game.deal_initial_cards()
+            while not game.is_game_over():
+                game.turn_manager.play_turn()
+            self.assertEqual(replayed.actions_log, game.game_state.actions_log)
+
+    def test_append_that_never_closes_keeps_the_archive_readable(self):
+        with tempfile.TemporaryDirectory() as archive_dir:
+            path = os.path.join(archive_dir, 'games.cgr')
+            with GameArchive(path, 'w', block_size=512) as archive:
+                simulate(5, [RandomBot, HeuristicBot], seed=3, archive=archive)
+            with GameArchive(path) as archive:
+                before = [record.encode() for record in archive]
+
+            crashed = GameArchive(path, 'a', block_size=512)
+            simulate(4, [HeuristicBot, RandomBot], seed=60, archive=crashed)
+            crashed.flush_block()
+            crashed.file.close()  # Dies before writing its index and footer
+            with GameArchive(path) as archive:
+                self.assertEqual([record.encode() for record in archive], before)
+
+            with GameArchive(path, 'a') as archive:
+                simulate(2, [HeuristicBot, RandomBot], seed=80, archive=archive)
+            with GameArchive(path) as archive:
+                self.assertEqual(len(archive), 7)
+                self.assertEqual([archive.raw(position) for position in range(5)], before)
+                self.assertEqual(archive[5].seed, 80)
+
+
+class TestGameIndex(unittest.TestCase):
+
+    def test_queries_match_the_decoded_records(self):
+        with tempfile.TemporaryDirectory() as index_dir:
+            path = os.path.join(index_dir, 'games.cgr')
+            with GameArchive(path, 'w') as archive:
+                simulate(40, [RandomBot, HeuristicBot], seed=5, archive=archive)
+            index = build_index([path], os.path.join(index_dir, 'index'))
+            with GameArchive(path) as archive:
+                records = list(archive)
+
+            expected = sum(1 for record in records for event, state in zip(record.events, record.states)
+                           if event[0] == 3 and event[3] == 'steal' and state[1] == 1)
+            self.assertEqual(index.events(kind='block', action='steal', first_cards=1).count(), expected)
+            taxes = index.events(kind='action', action='tax', first_agent='HeuristicBot')
+            self.assertEqual(taxes.count(), sum(1 for record in records for event in record.events
+                                                if event[3] == 'tax' and event[0] == 0 and event[1] == "HeuristicBot_2"))
+            self.assertEqual(sum(index.events(kind='challenge').counts('result').values()), index.events(kind='challenge').count())
+            self.assertAlmostEqual(index.games().rate(winner=0), sum(1 for record in records if record.winner == "RandomBot_1") / 40)
+            rich = index.events(first_coins=(7, 99)).where(kind='action')
+            self.assertTrue(all(coins >= 7 for coins in rich.column('first_coins')))
+
+    def test_contessa_block_bluff_rate(self):
+        with tempfile.TemporaryDirectory() as index_dir:
+            path = os.path.join(index_dir, 'games.cgr')
+            with GameArchive(path, 'w') as archive:
+                simulate(100, [RandomBot, HeuristicBot, RandomBot], seed=9, archive=archive)
+            index = build_index([path], os.path.join(index_dir, 'index'))
+            with GameArchive(path) as archive:
+                records = list(archive)
+
+            # How often is a Contessa block a bluff when the blocker has one card left?
+            blocks = index.events(kind='block', claim='Contessa', hand_cards=1)
+            hands = [state[5] for record in records for event, state in zip(record.events, record.states)
+                     if event[0] == 3 and event[3] == 'assassinate' and len(state[5]) == 1]
+            self.assertGreater(len(hands), 0)
+            self.assertEqual(blocks.count(), len(hands))
+            self.assertAlmostEqual(blocks.rate(bluff=1), sum('Contessa' not in hand for hand in hands) / len(hands))
+
+            # The hands agree with what the engine found when it checked a challenged action's claim
+            actions = ['tax', 'steal', 'exchange', 'assassinate']
+            self.assertEqual(index.events(kind='challenge', result='bluff', action=actions).counts('bluff').keys(), {1})
+            self.assertEqual(index.events(kind='challenge', result='truth', action=actions).counts('bluff').keys(), {0})
+
+
+class TestGameSnapshot(unittest.TestCase):
+
+    def test_restore_replays_the_same_game(self):
+        random.seed(21)
+        game = Game([], headless=True, compact_state=True)
+        game.players = [RandomBot("Player1", None, game), HeuristicBot("Player2", None, game)]
+        game.deal_initial_cards()
+        for _ in range(3):
+            game.turn_manager.play_turn()
+        snapshot = game.snapshot()
+        hands = [player.cards for player in game.players]
+
+        random.seed(5)
+        while not game.is_game_over():
+            game.turn_manager.play_turn()
+        game.announce_winner()
+        first_winner = game.game_state.winner
+        first_turns = game.turn_manager.turns_played
+
+        game.restore(snapshot)
+        self.assertEqual(game.snapshot(), snapshot)
+        self.assertIsNone(game.game_state.winner)
+        self.assertTrue(all(player.cards is hand for player, hand in zip(game.players, hands)))  # Restored in place
+        random.seed(5)
+        while not game.is_game_over():
+            game.turn_manager.play_turn()
+        game.announce_winner()
+        self.assertEqual((game.game_state.winner, game.turn_manager.turns_played), (first_winner, first_turns))
+
+    def test_restore_puts_back_the_game_state_views(self):
+        for compact_state in (True, False):
+            random.seed(8)
+            game = Game([], headless=True, compact_state=compact_state)
+            game.players = [RandomBot("Player1", None, game), HeuristicBot("Player2", None, game)]
+            game.deal_initial_cards()
+            game.turn_manager.play_turn()
+            snapshot = game.snapshot()
+            before = copy.deepcopy(game.game_state.get_game_state())  # GameState hands out its live dicts
+
+            while not game.is_game_over():
+                game.turn_manager.play_turn()
+            self.assertNotEqual(game.game_state.get_game_state()['players_state'], before['players_state'])
+            game.restore(snapshot)
+            game.game_state.get_game_state()['players_state']["Player1"]['coins'] += 5
+            game.restore(snapshot)  # Undoes changes made to the views since the first restore
+            restored = game.game_state.get_game_state()
+            self.assertEqual(restored['players_state'], before['players_state'])
+            self.assertEqual((restored['deck_size'], restored['winner']), (before['deck_size'], before['winner']))
+
+    def test_snapshot_reuses_its_buffer(self):
+        random.seed(3)
+        game = Game([], headless=True)
+        game.players = [RandomBot("Player1", None, game), RandomBot("Player2", None, game)]
+        game.deal_initial_cards()
+        buffer = game.snapshot()
+        game.turn_manager.play_turn()
+        self.assertIs(game.snapshot(buffer), buffer)
+        self.assertEqual(buffer, game.snapshot())
+
+
+class TestMoveJournal(unittest.TestCase):
+
+    def test_undo_reverts_every_move_exactly(self):
+        for seed in range(5):
+            random.seed(seed)
+            game = Game([], headless=True, compact_state=True)
+            game.players = [RandomBot("Player1", None, game), HeuristicBot("Player2", None, game), RandomBot("Player3", None, game)]
+            game.deal_initial_cards()
+            snapshots = []
+            while not game.is_game_over() and len(snapshots) < 60:
+                snapshots.append(game.snapshot())
+                player = game.players[game.turn_manager.current_turn]
+                action = player.choose_action(game.game_state)
+                target = player.choose_target(game) if action in ('coup', 'assassinate', 'steal') else None
+                game.apply(action, target)
+            self.assertEqual(len(game.journal), len(snapshots))
+            while snapshots:
+                game.undo()
+                self.assertEqual(game.snapshot(), snapshots.pop())
+            self.assertEqual(game.game_state.players_state["Player1"]['influence'], 2)
+            self.assertRaises(ValueError, game.undo)
+
+    def test_only_applied_moves_are_recorded(self):
+        random.seed(4)
+        game = Game([], headless=True, log_level=DEBUG)
+        game.players = [RandomBot("Player1", None, game), HeuristicBot("Player2", None, game), RandomBot("Player3", None, game)]
+        game.deal_initial_cards()
+        recorder = GameRecorder(game=game).attach(game.game_state)
+        game.turn_manager.play_turn()
+        events, logs, log_size = len(recorder.events), game.logger.get_logs(), len(game.game_state.actions_log)
+        snapshot = game.snapshot()
+
+        game.apply('income')
+        self.assertEqual((len(recorder.events), game.logger.get_logs()), (events, logs))
+        self.assertEqual(len(game.game_state.actions_log), log_size)
+        self.assertIsNone(game.game_state.journal)
+        self.assertTrue(all(player.journal is None for player in game.players))
+        game.undo()
+        self.assertEqual(game.snapshot(), snapshot)
+        records = len(game.journal.records)
+        for _ in range(3):
+            game.turn_manager.play_turn()
+        self.assertEqual(len(game.journal.records), records)
+        self.assertRaises(ValueError, game.undo)
+
+
+class TestZobrist(unittest.TestCase):
+
+    def test_incremental_hash_matches_a_full_rebuild(self):
+        for seed in range(5):
+            random.seed(seed)
+            game = Game([], headless=True)
+            game.players = [RandomBot("Player1", None, game), HeuristicBot("Player2", None, game), RandomBot("Player3", None, game)]
+            game.deal_initial_cards()
+            hashes = [game.position_hash()]
+            while not game.is_game_over() and len(hashes) < 80:
+                player = game.players[game.turn_manager.current_turn]
+                action = player.choose_action(game.game_state)
+                target = player.choose_target(game) if action in ('coup', 'assassinate', 'steal') else None
+                game.apply(action, target)
+                self.assertEqual(game.position_hash(), ZobristHash(game).value)
+                hashes.append(game.position_hash())
+            while len(hashes) > 1:
+                game.undo()
+                hashes.pop()
+                self.assertEqual(game.position_hash(), hashes[-1])
+
+    def test_reset_game_starts_from_a_fresh_hash_and_journal(self):
+        random.seed(6)
+        game = Game([], headless=True)
+        game.players = [RandomBot("Player1", None, game), HeuristicBot("Player2", None, game)]
+        game.deal_initial_cards()
+        game.position_hash()
+        game.apply('income')
+
+        game.reset_game()
+        self.assertIsNone(game.journal)
+        self.assertRaises(ValueError, game.undo)
+        self.assertEqual(game.position_hash(), ZobristHash(game).value)
+        self.assertEqual(game.game_state.winner, next(player.name for player in game.players if player.has_cards()))
+
+    def test_replacement_policies(self):
+        depth_table = TranspositionTable(4, 'depth')
+        depth_table.store(1, 'deep', depth=5)
+        depth_table.store(5, 'shallow', depth=1)  # Same slot, shallower: kept out
+        self.assertEqual(depth_table.get(1), 'deep')
+        self.assertIsNone(depth_table.get(5))
+        self.assertIsNone(depth_table.get(1, min_depth=6))
+
+        always_table = TranspositionTable(4, 'always')
+        always_table.store(1, 'old', depth=5)
+        always_table.store(5, 'new', depth=1)
+        self.assertEqual((always_table.get(5), always_table.get(1)), ('new', None))
+
+        two_tier = TranspositionTable(4, 'two_tier')
+        two_tier.store(1, 'deep', depth=5)
+        two_tier.store(5, 'recent', depth=1)
+        two_tier.store(9, 'deeper', depth=7)
+        self.assertEqual((two_tier.get(9), two_tier.get(1), two_tier.get(5)), ('deeper', 'deep', None))
+        self.assertEqual(len(two_tier), 2)
+
+
+class TestGameLogger(unittest.TestCase):
+
+    def test_disabled_levels_are_dropped(self):
+        logger = GameLogger(echo=False, level=WARNING)
+        logger.debug("hidden")
+        logger.log("also hidden")
+        logger.warning("shown")
+        self.assertFalse(logger.enabled(INFO))
+        self.assertEqual(logger.get_logs(), ["shown"])
+
+    def test_history_is_bounded(self):
+        logger = GameLogger(echo=False, history=3)
+        for number in range(10):
+            logger.info(str(number))
+        self.assertEqual(logger.get_logs(), ["7", "8", "9"])
+
+    def test_file_sink_writes_json_lines_and_rotates(self):
+        import json
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'game-{game_id}.jsonl')
+            logger = GameLogger(echo=False, level=DEBUG, path=path, game_id=7, max_bytes=400, backups=2)
+            for number in range(20):
+                logger.debug(f"event {number}", turn=number)
+            logger.close()
+            file_path = os.path.join(directory, 'game-7.jsonl')
+            with open(file_path) as log_file:
+                records = [json.loads(line) for line in log_file]
+            self.assertEqual(records[-1]['message'], "event 19")
+            self.assertEqual((records[-1]['turn'], records[-1]['game'], records[-1]['level']), (19, 7, 'DEBUG'))
+            self.assertTrue(os.path.exists(file_path + '.1'))
+            self.assertFalse(os.path.exists(file_path + '.3'))
+
+    def test_simulate_writes_every_games_log_by_the_end_of_the_run(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'game-{game_id}.jsonl')
+            flushes = []
+            flush = LogWriter.flush
+            LogWriter.flush = lambda writer: (flushes.append(writer), flush(writer))
+            try:
+                simulate(3, [RandomBot, HeuristicBot], seed=2, log_path=path, log_level=INFO)
+            finally:
+                LogWriter.flush = flush
+            self.assertEqual(len(flushes), 1)  # Games never wait on the disk; the run does, once
+            files = sorted(os.listdir(directory))
+            self.assertEqual(len(files), 3)
+            for file_name in files:
+                with open(os.path.join(directory, file_name)) as log_file:
+                    lines = [json.loads(line) for line in log_file]
+                self.assertTrue(lines)
+                self.assertTrue(any(line['message'].startswith("Game over!") for line in lines))  # Written to the end
+
+    def test_headless_games_skip_narration(self):
+        random.seed(3)
+        game = Game([], headless=True)
+        game.players = [RandomBot("Player1", None, game), RandomBot("Player2", None, game)]
+        game.deal_initial_cards()
+        game.turn_manager.play_turn()
+        self.assertEqual(game.logger.get_logs(), [])
+
+
+class TestMetrics(unittest.TestCase):
+
+    def test_simulation_records_turns_and_actions(self):
+        metrics = Metrics()
+        with tempfile.TemporaryDirectory() as archive_dir:
+            path = os.path.join(archive_dir, 'games.cgr')
+            with GameArchive(path, 'w') as archive:
+                results = simulate(3, [RandomBot, HeuristicBot], seed=11, metrics=metrics, archive=archive)
+            with GameArchive(path) as archive:
+                records = list(archive)
+        snapshot = metrics.snapshot()
+        turns = snapshot['coup_turn_seconds']
+        self.assertGreaterEqual(sum(series['count'] for series in turns.values()), sum(result['turns'] for result in results))
+        self.assertTrue(all(sum(series['buckets']) == series['count'] for series in turns.values()))
+        self.assertIn(('income', 'success'), turns)
+        # Every block attempt is logged once, challenged or not
+        blocks = sum(1 for record in records for event in record.events if event[0] == 3)
+        self.assertEqual(sum(snapshot.get('coup_blocks_total', {}).values()), blocks)
+
+    def test_counters_add_up_across_threads(self):
+        metrics = Metrics()
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            for _ in range(4):
+                pool.submit(lambda: [metrics.inc('coup_blocks_total', labels=('steal',)) for _ in range(5000)])
+        self.assertEqual(metrics.snapshot()['coup_blocks_total'][('steal',)], 20000)
+
+    def test_prometheus_text(self):
+        metrics = Metrics(buckets=(0.001, 0.01))
+        metrics.observe('coup_turn_seconds', 0.005, ('tax', 'success'))
+        metrics.observe('coup_turn_seconds', 0.5, ('tax', 'success'))
+        metrics.inc('coup_llm_completion_tokens_total', 7)
+        text = metrics.prometheus()
+        self.assertIn('# TYPE coup_turn_seconds histogram', text)
+        self.assertIn('coup_turn_seconds_bucket{action="tax",reason="success",le="0.001"} 0', text)
+        self.assertIn('coup_turn_seconds_bucket{action="tax",reason="success",le="0.01"} 1', text)
+        self.assertIn('coup_turn_seconds_bucket{action="tax",reason="success",le="+Inf"} 2', text)
+        self.assertIn('coup_turn_seconds_count{action="tax",reason="success"} 2', text)
+        self.assertIn('coup_llm_completion_tokens_total 7', text)
+
+    def test_http_endpoint(self):
+        from urllib.request import urlopen
+        metrics = Metrics()
+        metrics.inc('coup_llm_prompt_tokens_total', 42)
+        server = metrics.serve(0)
+        try:
+            with urlopen(f"http://127.0.0.1:{server.server_address[1]}/metrics") as response:
+                self.assertIn('coup_llm_prompt_tokens_total 42', response.read().decode())
+        finally:
+            metrics.close()
+
+
+class TestProfiler(unittest.TestCase):
+
+    def test_run_directory_holds_per_phase_reports(self):
+        import json
+        with tempfile.TemporaryDirectory() as run_dir:
+            with Profiler(run_dir, ('cprofile', 'sampling', 'tracemalloc'), interval=0.001) as profiler:
+                simulate(20, [RandomBot, HeuristicBot], seed=5, profiler=profiler)
+            with open(os.path.join(run_dir, 'summary.json')) as summary_file:
+                summary = json.load(summary_file)
+            self.assertTrue({'engine', 'action', 'reaction'} <= set(summary['phases']))
+            self.assertGreater(summary['phases']['action']['entries'], 0)
+            for phase in ('engine', 'action', 'reaction'):
+                self.assertTrue(os.path.exists(os.path.join(run_dir, f'profile-{phase}.prof')))
+            with open(os.path.join(run_dir, 'profile-action.txt')) as report:
+                self.assertIn('choose_action', report.read())
+            self.assertTrue(os.path.exists(os.path.join(run_dir, 'allocations.txt')))
+
+    def test_unknown_mode_is_rejected(self):
+        with self.assertRaises(ValueError):
+            Profiler('unused', ('perf',))
+
+    def test_block_decisions_and_failed_choices_are_attributed(self):
+        class PhaseWatcher(RandomBot):
+            def wants_to_block(self, acting_player, action):
+                self.phases.append(self.game.profiler.stack[-1])
+                return False
+
+        class BrokenActor(RandomBot):
+            def choose_action(self, game_state):
+                raise RuntimeError("the model is down")
+
+        with tempfile.TemporaryDirectory() as run_dir:
+            with Profiler(run_dir, ()) as profiler:
+                game = Game([], headless=True, profiler=profiler)
+                actor, watcher = RandomBot("Actor", None, game), PhaseWatcher("Watcher", None, game)
+                watcher.phases = []
+                game.players = [actor, watcher]
+                game.deal_initial_cards()
+                game.action_handler.handle_action('foreign_aid', actor)
+                game.action_handler.handle_action('steal', actor, watcher)
+                self.assertEqual(watcher.phases, ['reaction', 'reaction'])
+
+                game.players[0] = BrokenActor("Broken", None, game)
+                game.deal_initial_cards()
+                with self.assertRaises(RuntimeError):
+                    game.turn_manager.play_turn()
+                self.assertEqual(profiler.stack, ['engine'])
+
+
+class TestBenchmark(unittest.TestCase):
+
+    def test_compare_flags_regressions_by_direction(self):
+        baseline = {'results': {'actions.income_us': Benchmark.metric(10.0, 'us'),
+                                'games.compact_games_per_s': Benchmark.metric(1000.0, 'games/s', 'higher'),
+                                'prompts.gone_us': Benchmark.metric(5.0, 'us')}}
+        current = {'results': {'actions.income_us': Benchmark.metric(12.0, 'us'),
+                               'games.compact_games_per_s': Benchmark.metric(950.0, 'games/s', 'higher'),
+                               'actions.new_us': Benchmark.metric(1.0, 'us')}}
+        rows = {row[0]: row[4] for row in Benchmark.compare(current, baseline, tolerance=0.1)}
+        self.assertEqual(rows, {'actions.income_us': True, 'games.compact_games_per_s': False})
+
+    def test_quick_run(self):
+        document = Benchmark.run(['reactions', 'public_state', 'llm'], scale=0.01)
+        results = document['results']
+        self.assertIn('reactions.challenge_us', results)
+        self.assertIn('public_state.CompactGameState_1024_events_us', results)
+        self.assertGreater(results['llm.choose_action_p50_ms']['value'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()